@@ -0,0 +1,34 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Task
+
+
+class TaskAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'name',
+        'status',
+        'attempts',
+        'run_after',
+        'locked_by',
+        'updated',
+    )
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'payload')
+    readonly_fields = ('last_error', 'created', 'updated')
+    actions = ('retry',)
+    empty_value_display = '-пусто-'
+
+    def retry(self, request, queryset):
+        updated = queryset.exclude(status=Task.RUNNING).update(
+            status=Task.QUEUED,
+            attempts=0,
+            run_after=timezone.now(),
+            locked_until=None,
+        )
+        self.message_user(request, f'Возвращено в очередь: {updated}.')
+    retry.short_description = 'Перезапустить выбранные задачи'
+
+
+admin.site.register(Task, TaskAdmin)
@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from .cache import clear_after_migrate
+        from .sqlite import configure
+        post_migrate.connect(clear_after_migrate, sender=self)
+        connection_created.connect(configure)
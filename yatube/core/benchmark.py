@@ -0,0 +1,225 @@
+"""Замеры страниц: задержка, запросы к базе, время SQL и размер ответа.
+
+Используется набором core/tests/test_benchmark.py; результаты пишутся
+в JSON и сравниваются с сохранённым эталоном.
+"""
+import gc
+import json
+import math
+import multiprocessing
+import platform
+import time
+
+import django
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.urls import URLPattern, URLResolver, get_resolver
+
+# Задержка считается выросшей, только если разница больше этого
+# значения: на страницах в пару миллисекунд шум измерений сравним
+# с самим временем.
+LATENCY_FLOOR_MS = 5.0
+
+
+def percentile(values, fraction):
+    """Процентиль по ближайшему рангу."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+def named_urls(*namespaces):
+    """(имя, pattern) для всех именованных адресов пространств имён."""
+    resolver = get_resolver()
+    for namespace in namespaces:
+        for namespace_resolver in resolver.url_patterns:
+            if (
+                isinstance(namespace_resolver, URLResolver)
+                and namespace_resolver.namespace == namespace
+            ):
+                for pattern in namespace_resolver.url_patterns:
+                    if isinstance(pattern, URLPattern) and pattern.name:
+                        yield f'{namespace}:{pattern.name}', pattern
+
+
+class QueryTimer:
+    """execute_wrapper: число запросов и их суммарное время.
+
+    Время из connection.queries округлено до миллисекунд, а запросы
+    страницы обычно быстрее.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+def measure(client, url, repeat, prepare=None, warmup=3):
+    """Прогоняет GET url repeat раз после warmup прогревочных запросов."""
+    for _ in range(warmup):
+        if prepare:
+            prepare()
+        client.get(url)
+    latencies, queries, sql_ms = [], [], []
+    # Паузы сборщика мусора попадали бы в случайные замеры.
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            if prepare:
+                prepare()
+            timer = QueryTimer()
+            with connection.execute_wrapper(timer):
+                started = time.perf_counter()
+                response = client.get(url)
+                latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(timer.count)
+            sql_ms.append(timer.seconds * 1000)
+    finally:
+        gc.enable()
+    return {
+        'status': response.status_code,
+        'p50_ms': round(percentile(latencies, 0.5), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'queries': max(queries),
+        'sql_ms': round(percentile(sql_ms, 0.5), 3),
+        'bytes': len(response.content),
+    }
+
+
+def measure_calls(func, repeat, warmup=3):
+    """p50 и p95 времени вызова func() в миллисекундах."""
+    for _ in range(warmup):
+        func()
+    latencies = []
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            latencies.append((time.perf_counter() - started) * 1000)
+    finally:
+        gc.enable()
+    return {
+        'p50_ms': round(percentile(latencies, 0.5), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+    }
+
+
+def measure_render(backend, name, context, request, repeat, warmup=3):
+    """Загрузка и рендеринг шаблона name, как при обработке запроса."""
+    return measure_calls(
+        lambda: backend.get_template(name).render(context, request),
+        repeat, warmup,
+    )
+
+
+def use_database(path):
+    """Переключает соединение default этого процесса на файл SQLite.
+
+    Для процессов стресс-теста: соединение с тестовой базой в памяти,
+    унаследованное после fork, не закрывается, а просто забывается.
+    """
+    database = connections[DEFAULT_DB_ALIAS]
+    database.connection = None
+    database.settings_dict['NAME'] = path
+
+
+def stress(worker, processes, seconds, *args):
+    """Запускает worker(deadline, *args) одновременно в processes процессах.
+
+    worker работает до deadline (time.time()) и возвращает пару: число
+    удачных записей и число ошибок блокировки базы.
+    """
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    deadline = time.time() + seconds
+
+    def run():
+        outcome = (0, 0)
+        try:
+            outcome = worker(deadline, *args)
+        finally:
+            results.put(outcome)
+
+    workers = [context.Process(target=run) for _ in range(processes)]
+    for process in workers:
+        process.start()
+    outcomes = [results.get() for _ in workers]
+    for process in workers:
+        process.join()
+    if any(process.exitcode for process in workers):
+        raise RuntimeError('Процесс стресс-теста завершился с ошибкой')
+    writes = sum(written for written, _ in outcomes)
+    return {
+        'processes': processes,
+        'seconds': seconds,
+        'writes': writes,
+        'writes_per_s': round(writes / seconds, 1),
+        'lock_errors': sum(errors for _, errors in outcomes),
+    }
+
+
+def compare(results, baseline, threshold, tail_threshold):
+    """Список регрессий относительно эталона.
+
+    Число запросов не должно расти вовсе, медиана задержки и размер
+    ответа — больше чем на threshold (доля), p95 — больше чем на
+    tail_threshold: хвост из нескольких десятков замеров шумит сильнее.
+    Адреса и размеры данных, которых нет в эталоне, не сравниваются.
+    """
+    regressions = []
+    for size, pages in results['results'].items():
+        for key, current in pages.items():
+            base = baseline['results'].get(size, {}).get(key)
+            if base is None:
+                continue
+            where = f'{key} на {size} постах'
+            if current['queries'] > base['queries']:
+                regressions.append(
+                    f'{where}: запросов {base["queries"]} → '
+                    f'{current["queries"]}'
+                )
+            for metric, allowed in (
+                ('p50_ms', threshold), ('p95_ms', tail_threshold)
+            ):
+                limit = max(
+                    base[metric] * (1 + allowed),
+                    base[metric] + LATENCY_FLOOR_MS,
+                )
+                if current[metric] > limit:
+                    regressions.append(
+                        f'{where}: {metric} {base[metric]} → '
+                        f'{current[metric]}'
+                    )
+            if current['bytes'] > base['bytes'] * (1 + threshold):
+                regressions.append(
+                    f'{where}: байт {base["bytes"]} → {current["bytes"]}'
+                )
+    return regressions
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'machine': platform.machine(),
+    }
+
+
+def load(path):
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def save(path, data):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(data, file, ensure_ascii=False, indent=2, sort_keys=True)
+        file.write('\n')
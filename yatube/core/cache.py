@@ -0,0 +1,330 @@
+"""Кэш в файле SQLite, общий для всех процессов на одной машине.
+
+LocMemCache у каждого воркера свой: фрагменты и страницы хранятся
+в нескольких копиях, а сброс версии в одном воркере не виден
+остальным. Здесь все процессы работают с одной базой в режиме WAL:
+читатели не ждут писателей, а запись идёт короткими транзакциями
+BEGIN IMMEDIATE.
+
+Целые числа хранятся как INTEGER, поэтому incr — один атомарный
+UPDATE. Остальные значения сериализуются pickle. Просроченные
+записи не отдаются и удаляются при чистке; когда записей больше
+MAX_ENTRIES, чистка удаляет давно не читавшиеся (LRU).
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.SQLiteCache',
+            'LOCATION': '/var/tmp/yatube-cache.sqlite3',
+            'OPTIONS': {'MAX_ENTRIES': 100_000},
+        }
+    }
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from itertools import islice
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires);
+'''
+# Сколько ключей передавать одним запросом: у SQLite есть предел на
+# число параметров.
+KEYS_PER_QUERY = 500
+ALIVE = '(expires IS NULL OR expires > ?)'
+
+
+def encode(value):
+    # bool — тоже int, но должен вернуться как bool.
+    if type(value) is int and -2 ** 63 <= value < 2 ** 63:
+        return value
+    return sqlite3.Binary(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+
+
+def decode(value):
+    if isinstance(value, int):
+        return value
+    return pickle.loads(value)
+
+
+def chunks(items, size=KEYS_PER_QUERY):
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class SQLiteCache(BaseCache):
+    """Общий кэш процессов одной машины в файле SQLite (LOCATION).
+
+    OPTIONS, кроме стандартных MAX_ENTRIES и CULL_FREQUENCY:
+    LRU_RESOLUTION — как часто, в секундах, обновлять время чтения
+    записи (чтения чаще не превращаются в запись), CULL_EVERY — через
+    сколько записей проверять размер кэша, BUSY_TIMEOUT — сколько
+    миллисекунд ждать блокировки базы.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.path = location
+        self.lru_resolution = float(options.get('LRU_RESOLUTION', 60))
+        self.cull_every = int(options.get('CULL_EVERY', 100))
+        self.busy_timeout = int(options.get('BUSY_TIMEOUT', 5000))
+        self._local = threading.local()
+        self._writes = 0
+
+    @property
+    def db(self):
+        local = self._local
+        # После fork соединение родителя использовать нельзя.
+        if getattr(local, 'pid', None) != os.getpid():
+            local.connection = self._connect()
+            local.pid = os.getpid()
+        return local.connection
+
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(
+            self.path, timeout=self.busy_timeout / 1000,
+            isolation_level=None,
+        )
+        connection.execute(f'PRAGMA busy_timeout = {self.busy_timeout}')
+        connection.execute('PRAGMA journal_mode = WAL')
+        connection.execute('PRAGMA synchronous = NORMAL')
+        connection.executescript(SCHEMA)
+        return connection
+
+    def atomic(self, func):
+        """func(db, now) в транзакции BEGIN IMMEDIATE."""
+        db = self.db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            result = func(db, time.time())
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+        return result
+
+    def write(self, func):
+        """atomic() с проверкой размера кэша через каждые CULL_EVERY."""
+        result = self.atomic(func)
+        self._writes += 1
+        if self._writes >= self.cull_every:
+            self._writes = 0
+            self.atomic(self._cull)
+        return result
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+
+        def add(db, now):
+            db.execute(
+                f'DELETE FROM cache WHERE key = ? AND NOT {ALIVE}',
+                (key, now),
+            )
+            return db.execute(
+                'INSERT OR IGNORE INTO cache VALUES (?, ?, ?, ?)',
+                (key, encode(value), self.get_backend_timeout(timeout), now),
+            ).rowcount == 1
+
+        return self.write(add)
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        found = self._get_many([key])
+        return found.get(key, default)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._set_many({key: value}, timeout)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self.write(lambda db, now: db.execute(
+            f'UPDATE cache SET expires = ? WHERE key = ? AND {ALIVE}',
+            (self.get_backend_timeout(timeout), key, now),
+        ).rowcount == 1)
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version=version)
+
+    def get_many(self, keys, version=None):
+        names = {}
+        for key in keys:
+            name = self.make_key(key, version=version)
+            self.validate_key(name)
+            names[name] = key
+        found = self._get_many(list(names))
+        return {names[name]: value for name, value in found.items()}
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        values = {}
+        for key, value in data.items():
+            name = self.make_key(key, version=version)
+            self.validate_key(name)
+            values[name] = value
+        self._set_many(values, timeout)
+        return []
+
+    def delete_many(self, keys, version=None):
+        names = [self.make_key(key, version=version) for key in keys]
+        for name in names:
+            self.validate_key(name)
+
+        def delete(db, now):
+            for chunk in chunks(names):
+                db.execute(
+                    'DELETE FROM cache WHERE key IN '
+                    f'({", ".join("?" * len(chunk))})',
+                    chunk,
+                )
+
+        self.write(delete)
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self.db.execute(
+            f'SELECT 1 FROM cache WHERE key = ? AND {ALIVE}',
+            (key, time.time()),
+        ).fetchone() is not None
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+
+        def incr(db, now):
+            row = db.execute(
+                f'SELECT typeof(value) FROM cache WHERE key = ? AND {ALIVE}',
+                (key, now),
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            if row[0] != 'integer':
+                raise TypeError(f"Key '{key}' does not hold an integer")
+            db.execute(
+                'UPDATE cache SET value = value + ?, accessed = ? '
+                'WHERE key = ?',
+                (delta, now, key),
+            )
+            return db.execute(
+                'SELECT value FROM cache WHERE key = ?', (key,)
+            ).fetchone()[0]
+
+        return self.write(incr)
+
+    def clear(self):
+        self.write(lambda db, now: db.execute('DELETE FROM cache'))
+
+    def close(self, **kwargs):
+        # Соединение живёт всё время жизни потока: открывать файл на
+        # каждый запрос дороже, чем держать его.
+        pass
+
+    def _get_many(self, names):
+        if not names:
+            return {}
+        now = time.time()
+        found, stale = {}, []
+        for chunk in chunks(names):
+            rows = self.db.execute(
+                'SELECT key, value, accessed FROM cache WHERE key IN '
+                f'({", ".join("?" * len(chunk))}) AND {ALIVE}',
+                (*chunk, now),
+            )
+            for name, value, accessed in rows:
+                found[name] = decode(value)
+                if now - accessed > self.lru_resolution:
+                    stale.append(name)
+        if stale:
+            self._mark_read(stale)
+        return found
+
+    def _mark_read(self, names):
+        """Время чтения для LRU; не чаще раза в lru_resolution."""
+        def mark(db, now):
+            for chunk in chunks(names):
+                db.execute(
+                    'UPDATE cache SET accessed = ? WHERE key IN '
+                    f'({", ".join("?" * len(chunk))})',
+                    (now, *chunk),
+                )
+
+        try:
+            self.write(mark)
+        except sqlite3.OperationalError:
+            # База занята: время чтения обновится при следующем чтении.
+            pass
+
+    def _set_many(self, values, timeout):
+        expires = self.get_backend_timeout(timeout)
+
+        def store(db, now):
+            db.executemany(
+                'INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)',
+                (
+                    (name, encode(value), expires, now)
+                    for name, value in values.items()
+                ),
+            )
+
+        self.write(store)
+
+    def _cull(self, db, now):
+        """Удаляет просроченные записи и давно не читавшиеся сверх лимита.
+
+        Как и в кэшах Django, при переполнении освобождается ещё
+        1/CULL_FREQUENCY от MAX_ENTRIES.
+        """
+        db.execute(
+            'DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?',
+            (now,),
+        )
+        count = db.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count <= self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            db.execute('DELETE FROM cache')
+            return
+        excess = count - self._max_entries
+        excess += self._max_entries // self._cull_frequency
+        db.execute(
+            'DELETE FROM cache WHERE key IN '
+            '(SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+            (excess,),
+        )
+
+
+def clear_after_migrate(sender, **kwargs):
+    """Сбрасывает общие кэши после migrate.
+
+    В отличие от LocMemCache, файл переживает перезапуск: сохранённые
+    объекты могут не подходить к новой схеме, а в тестах — к только
+    что созданной базе.
+    """
+    from django.conf import settings
+    from django.core.cache import caches
+
+    for alias in settings.CACHES:
+        if isinstance(caches[alias], SQLiteCache):
+            caches[alias].clear()
@@ -0,0 +1,16 @@
+from django.conf import settings
+
+from core import replicas
+
+
+def fragment_timeout(request):
+    """Срок {% cache %} для фрагментов страницы.
+
+    Фрагменты, собранные с реплики, живут не дольше
+    REPLICA_CACHE_TIMEOUT.
+    """
+    return {
+        'fragment_timeout': replicas.cache_timeout(
+            settings.FRAGMENT_CACHE_TIMEOUT
+        )
+    }
@@ -0,0 +1,53 @@
+from contextlib import contextmanager
+from itertools import islice
+
+
+@contextmanager
+def keep_auto_now(model, *field_names):
+    """Отключает auto_now/auto_now_add у полей модели внутри блока.
+
+    Нужно для массовой вставки, когда даты задаются явно: иначе
+    bulk_create заменит их текущим временем. Меняет поле на уровне
+    класса, поэтому годится только для команд, а не для вьюх.
+    """
+    fields = [model._meta.get_field(name) for name in field_names]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def bulk_insert(model, rows, chunk_size, **kwargs):
+    """bulk_create для длинных последовательностей строк.
+
+    Строки собираются в память пачками по chunk_size, а размер одного
+    INSERT Django подбирает сам: явный batch_size на SQLite упирается
+    в лимит на число частей составного SELECT.
+    """
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        model.objects.bulk_create(chunk, **kwargs)
+
+
+def last_id(model):
+    row = model.objects.order_by('-pk').values_list('pk', flat=True)[:1]
+    return next(iter(row), 0)
+
+
+def new_ids(model, last_id):
+    """id строк, вставленных bulk_create после last_id.
+
+    На SQLite bulk_create не возвращает первичные ключи. Годится,
+    пока в таблицу не пишет никто другой.
+    """
+    return list(
+        model.objects.filter(pk__gt=last_id).order_by('pk')
+        .values_list('pk', flat=True)
+    )
@@ -0,0 +1,56 @@
+import time
+from multiprocessing import Process
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import queue
+
+
+def work(poll_interval, once):
+    queue.load_tasks()
+    worker = queue.worker_name()
+    while True:
+        processed = queue.run_pending(worker)
+        if once:
+            return processed
+        if not processed:
+            time.sleep(poll_interval)
+
+
+class Command(BaseCommand):
+    help = 'Запускает обработчики фоновых задач из очереди в БД.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=1,
+            help='Число рабочих процессов.',
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help='Пауза в секундах, когда очередь пуста.',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить накопившиеся задачи и выйти.',
+        )
+
+    def handle(self, *args, **options):
+        if options['processes'] == 1:
+            processed = work(options['poll_interval'], options['once'])
+            self.stdout.write(f'Выполнено задач: {processed}.')
+            return
+        # Дочерние процессы не должны наследовать открытое соединение с БД.
+        connections.close_all()
+        workers = [
+            Process(
+                target=work,
+                args=(options['poll_interval'], options['once']),
+            )
+            for _ in range(options['processes'])
+        ]
+        for process in workers:
+            process.start()
+        for process in workers:
+            process.join()
+        self.stdout.write(f'Обработчиков завершено: {len(workers)}.')
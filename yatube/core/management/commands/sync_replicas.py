@@ -0,0 +1,54 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+def copy_database(source, target):
+    """Копирует SQLite-базу source в файл target через backup API.
+
+    Читатели реплики видят либо старую копию, либо новую целиком.
+    """
+    with sqlite3.connect(target) as replica:
+        source.backup(replica)
+    replica.close()
+
+
+class Command(BaseCommand):
+    help = (
+        'Замена репликации для разработки: копирует основную SQLite-базу '
+        'в файлы DATABASE_REPLICAS. С --interval копирует по кругу, '
+        'и реплики отстают от основной базы на этот интервал.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Пауза между копиями в секундах (0 — скопировать раз).',
+        )
+
+    def handle(self, *args, **options):
+        primary = connections['default']
+        aliases = settings.DATABASE_REPLICAS
+        for alias in ('default', *aliases):
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(f'База {alias} — не SQLite.')
+        if not aliases:
+            raise CommandError('DATABASE_REPLICAS пуст.')
+        while True:
+            started = time.monotonic()
+            primary.ensure_connection()
+            for alias in aliases:
+                copy_database(
+                    primary.connection,
+                    connections[alias].settings_dict['NAME'],
+                )
+            self.stdout.write(
+                f'Реплики {", ".join(aliases)} обновлены за '
+                f'{time.monotonic() - started:.2f} с.'
+            )
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
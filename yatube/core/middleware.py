@@ -0,0 +1,150 @@
+import gzip
+import json
+import logging
+import re
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import parse_http_date_safe
+
+from . import page_cache, timing
+
+re_accepts_gzip = re.compile(r'\bgzip\b')
+slow_logger = logging.getLogger('core.timing')
+
+
+class ServerTimingMiddleware:
+    """Заголовок Server-Timing и журнал медленных запросов.
+
+    Время делится на SQL, шаблоны, кэш и миниатюры (метрики могут
+    пересекаться: миниатюры строятся во время рендеринга). Запросы
+    дольше SERVER_TIMING_SLOW_MS пишутся в лог core.timing одной
+    JSON-записью.
+
+    Стоит первым в MIDDLEWARE, чтобы total включал остальные слои.
+    С выключенным SERVER_TIMING Django убирает его из цепочки.
+    """
+
+    def __init__(self, get_response):
+        if not settings.SERVER_TIMING:
+            raise MiddlewareNotUsed
+        timing.install()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = timing.Timings()
+        token = timing.current.set(timings)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(timings.execute_wrapper)
+                    )
+                response = self.get_response(request)
+        finally:
+            timing.current.reset(token)
+        total = time.perf_counter() - started
+        response['Server-Timing'] = timings.header(total)
+        if total * 1000 >= settings.SERVER_TIMING_SLOW_MS:
+            self.log_slow(request, response, timings, total)
+        return response
+
+    def log_slow(self, request, response, timings, total):
+        match = request.resolver_match
+        record = {
+            'method': request.method,
+            'path': request.get_full_path(),
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'user': getattr(getattr(request, 'user', None), 'pk', None),
+            'total_ms': round(total * 1000, 3),
+            **timings.as_dict(),
+        }
+        slow_logger.warning(
+            json.dumps(record, ensure_ascii=False), extra={'timing': record}
+        )
+
+
+class AnonymousPageCacheMiddleware:
+    """Кэш целых страниц для гостей.
+
+    Кэшируются только GET/HEAD-ответы, помеченные суррогатными ключами
+    через page_cache.tag(). Тело хранится сжатым gzip и отдаётся как
+    есть, если клиент его принимает. Страница сбрасывается вызовом
+    page_cache.purge() с любым из её ключей.
+
+    Гостем считается запрос без cookie сессии и сообщений: такой
+    запрос не может принадлежать вошедшему пользователю, и проверка
+    обходится без обращения к базе.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self.is_cacheable_request(request):
+            return self.get_response(request)
+        entry, generation = page_cache.begin(request)
+        if entry is not None:
+            return self.cached_response(request, entry)
+        response = self.get_response(request)
+        if self.is_cacheable_response(request, response):
+            if page_cache.store(request, response, generation):
+                response['X-Page-Cache'] = 'MISS'
+                patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+    def is_cacheable_request(self, request):
+        return (
+            settings.PAGE_CACHE_TIMEOUT > 0
+            and request.method in ('GET', 'HEAD')
+            and settings.SESSION_COOKIE_NAME not in request.COOKIES
+            and CookieStorage.cookie_name not in request.COOKIES
+        )
+
+    def is_cacheable_response(self, request, response):
+        return (
+            response.status_code == 200
+            and getattr(response, 'surrogate_keys', None)
+            and not response.streaming
+            and not response.cookies
+            and not request.META.get('CSRF_COOKIE_USED')
+        )
+
+    def cached_response(self, request, entry):
+        headers = dict(entry['headers'])
+        # Без content_type Django 2.2 читает DEFAULT_CONTENT_TYPE, а это
+        # свойство разбирает стек ради предупреждения об устаревании.
+        response = HttpResponse(
+            content_type=headers.pop('Content-Type', None),
+            status=entry['status'],
+        )
+        for header, value in headers.items():
+            response[header] = value
+        response['X-Page-Cache'] = 'HIT'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        not_modified = get_conditional_response(
+            request,
+            etag=response.get('ETag'),
+            last_modified=parse_http_date_safe(
+                response.get('Last-Modified', '')
+            ),
+            response=response,
+        )
+        if not_modified is not response:
+            return not_modified
+        accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if re_accepts_gzip.search(accept_encoding):
+            response.content = entry['body']
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response.content = gzip.decompress(entry['body'])
+        response['Content-Length'] = len(response.content)
+        return response
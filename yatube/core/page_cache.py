@@ -0,0 +1,96 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.text import compress_string
+
+from . import replicas
+
+PAGE_KEY = 'page_cache:page:{}'
+SURROGATE_KEY = 'page_cache:key:{}'
+# Версия, которую увеличивает любой purge(): по ней видно, что за время
+# рендеринга страницы что-то сбросили.
+ANY_KEY = '*'
+# Эти заголовки пересчитываются при каждой отдаче страницы.
+SKIP_HEADERS = {'content-length', 'content-encoding', 'set-cookie'}
+
+
+def tag(response, *keys):
+    """Помечает ответ суррогатными ключами; без ключей он не кэшируется."""
+    response.surrogate_keys = getattr(response, 'surrogate_keys', set())
+    response.surrogate_keys.update(keys)
+    response['Surrogate-Key'] = ' '.join(sorted(response.surrogate_keys))
+    return response
+
+
+def purge(*keys):
+    """Сбрасывает все страницы, помеченные любым из ключей."""
+    for key in (*keys, ANY_KEY):
+        try:
+            cache.incr(SURROGATE_KEY.format(key))
+        except ValueError:
+            # Версии нет — страниц с этим ключом в кэше тоже нет.
+            pass
+
+
+def get_versions(keys, create=False):
+    """Текущие версии ключей; None, если какой-то версии нет в кэше."""
+    names = {SURROGATE_KEY.format(key): key for key in keys}
+    found = cache.get_many(names)
+    if len(found) < len(names):
+        if not create:
+            return None
+        for name in names.keys() - found.keys():
+            # Первая версия от текущего времени, как у версий лент.
+            cache.add(name, int(time.time() * 1000), None)
+        found = cache.get_many(names)
+    return {names[name]: version for name, version in found.items()}
+
+
+def page_key(request):
+    path = f'{request.get_host()}{request.get_full_path()}'
+    return PAGE_KEY.format(hashlib.md5(path.encode()).hexdigest())
+
+
+def begin(request):
+    """Запись из кэша и снимок версий до рендеринга страницы.
+
+    Снимок передаётся в store(): версии ключей страницы известны только
+    после рендеринга, и прочитанные тогда они уже включали бы сброс,
+    случившийся во время рендеринга.
+    """
+    key = page_key(request)
+    found = cache.get_many([key, SURROGATE_KEY.format(ANY_KEY)])
+    generation = found.get(SURROGATE_KEY.format(ANY_KEY))
+    if generation is None:
+        generation = get_versions([ANY_KEY], create=True)[ANY_KEY]
+    entry = found.get(key)
+    if entry is not None and (
+        get_versions(entry['versions']) != entry['versions']
+    ):
+        entry = None
+    return entry, generation
+
+
+def store(request, response, generation):
+    """Сохраняет страницу, если с начала рендеринга ничего не сброшено.
+
+    Иначе страница могла быть собрана из старых данных, а записана бы
+    под новыми версиями. Возвращает True, если страница сохранена.
+    """
+    versions = get_versions({*response.surrogate_keys, ANY_KEY}, create=True)
+    if versions.pop(ANY_KEY) != generation:
+        return False
+    cache.set(page_key(request), {
+        'status': response.status_code,
+        'headers': [
+            (header, value) for header, value in response.items()
+            if header.lower() not in SKIP_HEADERS
+        ],
+        'body': compress_string(response.content),
+        'versions': versions,
+    }, replicas.cache_timeout(
+        settings.PAGE_CACHE_TIMEOUT, getattr(response, 'read_replica', None)
+    ))
+    return True
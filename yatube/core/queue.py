@@ -0,0 +1,172 @@
+import json
+import logging
+import os
+import socket
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+def task(name, on_failure=None):
+    """Регистрирует функцию как задачу очереди под именем name.
+
+    on_failure вызывается с теми же аргументами, когда попытки кончились.
+    """
+    def decorator(func):
+        func.on_failure = on_failure
+        registry[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, delay=0, max_attempts=None, **kwargs):
+    """Ставит задачу в очередь в текущей транзакции."""
+    return Task.objects.create(
+        name=name,
+        payload=json.dumps(kwargs),
+        run_after=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or settings.TASKS_MAX_ATTEMPTS,
+    )
+
+
+def load_tasks():
+    autodiscover_modules('tasks')
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def available(now):
+    """Задачи, готовые к запуску, и задачи с истёкшей блокировкой.
+
+    Задача с истёкшей блокировкой, у которой кончились попытки, сюда
+    не попадает: её исполнитель, видимо, падает на ней каждый раз.
+    """
+    return Q(status=Task.QUEUED, run_after__lte=now) | Q(
+        status=Task.RUNNING, locked_until__lt=now,
+        attempts__lt=F('max_attempts'),
+    )
+
+
+def abandoned(now):
+    return Q(
+        status=Task.RUNNING, locked_until__lt=now,
+        attempts__gte=F('max_attempts'),
+    )
+
+
+def call_on_failure(task_obj):
+    func = registry.get(task_obj.name)
+    if func is not None and func.on_failure is not None:
+        func.on_failure(**json.loads(task_obj.payload))
+
+
+def fail_abandoned(now, batch_size=10):
+    """Помечает FAILED задачи, исполнитель которых не дожил до конца.
+
+    Например, обработчик убит из-за нехватки памяти на огромной
+    картинке: без этого задача забиралась бы снова бесконечно.
+    """
+    for task_obj in Task.objects.filter(abandoned(now))[:batch_size]:
+        failed = Task.objects.filter(abandoned(now), pk=task_obj.pk).update(
+            status=Task.FAILED,
+            locked_until=None,
+            last_error=f'Исполнитель {task_obj.locked_by} не завершил '
+                       f'задачу за {task_obj.attempts} попыток',
+            updated=now,
+        )
+        if failed:
+            logger.error('Задача %s брошена исполнителем', task_obj)
+            try:
+                call_on_failure(task_obj)
+            except Exception:
+                logger.exception('on_failure задачи %s упал', task_obj)
+
+
+def claim(worker, batch_size=10):
+    """Забирает одну задачу: UPDATE с тем же условием, что и выборка.
+
+    Если другой процесс успел забрать задачу раньше, UPDATE не затронет
+    строк, и берётся следующий кандидат.
+    """
+    now = timezone.now()
+    fail_abandoned(now, batch_size)
+    candidates = (
+        Task.objects.filter(available(now))
+        .values_list('pk', flat=True)[:batch_size]
+    )
+    for pk in candidates:
+        claimed = Task.objects.filter(available(now), pk=pk).update(
+            status=Task.RUNNING,
+            locked_until=now + timedelta(
+                seconds=settings.TASKS_VISIBILITY_TIMEOUT
+            ),
+            locked_by=worker,
+            attempts=F('attempts') + 1,
+            updated=now,
+        )
+        if claimed:
+            return Task.objects.get(pk=pk)
+    return None
+
+
+def finish(task_obj, **fields):
+    """Записывает итог попытки, если задачу не забрал другой исполнитель.
+
+    После истечения блокировки задача могла уйти другому исполнителю:
+    итог старой попытки не должен затирать состояние новой.
+    """
+    return Task.objects.filter(
+        pk=task_obj.pk, status=Task.RUNNING, locked_by=task_obj.locked_by,
+        attempts=task_obj.attempts,
+    ).update(locked_until=None, updated=timezone.now(), **fields)
+
+
+def execute(task_obj):
+    """Выполняет задачу и записывает результат; True при успехе."""
+    func = registry.get(task_obj.name)
+    kwargs = json.loads(task_obj.payload)
+    try:
+        if func is None:
+            raise LookupError(f'Задача {task_obj.name} не зарегистрирована')
+        func(**kwargs)
+    except Exception:
+        logger.exception('Задача %s завершилась ошибкой', task_obj)
+        retry = task_obj.attempts < task_obj.max_attempts
+        finished = finish(
+            task_obj,
+            status=Task.QUEUED if retry else Task.FAILED,
+            run_after=timezone.now() + timedelta(
+                seconds=settings.TASKS_RETRY_DELAY * 2 ** task_obj.attempts
+            ),
+            last_error=traceback.format_exc(),
+        )
+        if finished and not retry:
+            call_on_failure(task_obj)
+        return False
+    finish(task_obj, status=Task.DONE, last_error='')
+    return True
+
+
+def run_pending(worker=None, limit=None):
+    """Выполняет задачи, пока очередь не опустеет; возвращает их число."""
+    worker = worker or worker_name()
+    processed = 0
+    while limit is None or processed < limit:
+        task_obj = claim(worker)
+        if task_obj is None:
+            break
+        execute(task_obj)
+        processed += 1
+    return processed
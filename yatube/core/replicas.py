@@ -0,0 +1,124 @@
+"""Чтение с реплик и чтение своих записей с основной базы.
+
+Вьюхи с read_from_replica читают с одной из DATABASE_REPLICAS,
+выбранной на весь запрос; запись всегда идёт в default. После записи
+во вьюхе с pin_to_primary пользователь получает cookie, и его чтения
+REPLICA_STICKY_SECONDS идут в основную базу: реплика могла ещё не
+получить только что сохранённое. Запись посреди читающего запроса
+тоже переключает его остаток на основную базу.
+
+С реплик читаются только модели posts: сессии и пользователи всегда
+берутся из default, иначе сразу после входа сессии на реплике ещё нет.
+Прочитанное с реплики кэшируется не дольше REPLICA_CACHE_TIMEOUT: под
+новой версией ленты могла оказаться отставшая копия. По той же причине
+страница с реплики уходит без ETag.
+
+Пока DATABASE_REPLICAS пуст, всё работает с default как раньше.
+"""
+import random
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+
+PIN_COOKIE = 'primary_until'
+REPLICATED_APPS = {'posts'}
+
+replica = ContextVar('replica', default=None)
+wrote = ContextVar('wrote', default=False)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label not in REPLICATED_APPS:
+            return 'default'
+        return replica.get() or 'default'
+
+    def db_for_write(self, model, **hints):
+        replica.set(None)
+        wrote.set(True)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # На репликах те же данные, что и в основной базе.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+def is_pinned(request):
+    try:
+        return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def choose_replica(request):
+    if (
+        not settings.DATABASE_REPLICAS
+        or request.method not in ('GET', 'HEAD')
+        or is_pinned(request)
+    ):
+        return None
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+def cache_timeout(timeout, using=None):
+    """Срок хранения в кэше того, что прочитано с базы using.
+
+    По умолчанию — с базы текущего запроса. Для реплики срок не больше
+    REPLICA_CACHE_TIMEOUT; timeout=None (навсегда) тоже ограничивается.
+    """
+    if (using or replica.get()) is None:
+        return timeout
+    if timeout is None:
+        return settings.REPLICA_CACHE_TIMEOUT
+    return min(timeout, settings.REPLICA_CACHE_TIMEOUT)
+
+
+def read_from_replica(view):
+    """Чтения вьюхи идут на реплику, если пользователь не закреплён.
+
+    Алиас реплики остаётся в response.read_replica, чтобы кэш страниц
+    знал, откуда она собрана. ETag такой страницы убирается: он собран
+    из уже новых версий в кэше, а реплика могла отстать, и клиент
+    хранил бы старую страницу под новым валидатором до следующей записи.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        alias = choose_replica(request)
+        token = replica.set(alias)
+        try:
+            response = view(request, *args, **kwargs)
+        finally:
+            replica.reset(token)
+        if alias is not None:
+            response.read_replica = alias
+            if response.status_code == 200 and response.has_header('ETag'):
+                del response['ETag']
+        return response
+    return wrapper
+
+
+def pin_to_primary(view):
+    """После записи во вьюхе закрепляет пользователя за основной базой."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        token = wrote.set(False)
+        try:
+            response = view(request, *args, **kwargs)
+            pinned = wrote.get()
+        finally:
+            wrote.reset(token)
+        if pinned and settings.DATABASE_REPLICAS:
+            sticky = settings.REPLICA_STICKY_SECONDS
+            response.set_cookie(
+                PIN_COOKIE, str(time.time() + sticky), max_age=sticky,
+                httponly=True, samesite='Lax',
+            )
+        return response
+    return wrapper
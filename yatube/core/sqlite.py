@@ -0,0 +1,131 @@
+"""SQLite под конкурентной записью нескольких воркеров.
+
+configure() при каждом новом соединении выполняет PRAGMA из
+SQLITE_PRAGMAS: WAL, чтобы читатели не ждали писателя, synchronous =
+NORMAL, mmap, размер кэша страниц и время ожидания блокировки.
+
+busy_timeout помогает не всегда. Обычный BEGIN берёт блокировку
+записи только на первом INSERT или UPDATE; если к этому моменту
+транзакция уже читала, а пишет другой процесс, SQLite сразу отвечает
+«database is locked», не дожидаясь таймаута. write_transaction
+открывает транзакцию через BEGIN IMMEDIATE — блокировка ждётся в
+самом начале — и повторяет её, если база так и не освободилась.
+Во вьюхах им оборачивается только сама запись, а не рендеринг формы:
+пока транзакция открыта, остальные писатели ждут.
+"""
+import random
+import time
+from contextlib import contextmanager
+from functools import wraps
+from itertools import count
+
+from django.conf import settings
+from django.db import (DEFAULT_DB_ALIAS, OperationalError, connections,
+                       transaction)
+from django.db.models import FileField
+
+
+def configure(sender, connection, **kwargs):
+    """Обработчик connection_created: PRAGMA из SQLITE_PRAGMAS."""
+    if connection.vendor != 'sqlite':
+        return
+    for name, value in settings.SQLITE_PRAGMAS.items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+def is_locked(error):
+    return 'locked' in str(error) or 'busy' in str(error)
+
+
+@contextmanager
+def immediate(using=DEFAULT_DB_ALIAS):
+    """transaction.atomic, который на SQLite сразу берёт блокировку записи.
+
+    Вложенный в другую транзакцию блок — обычная точка сохранения.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite' or connection.in_atomic_block:
+        with transaction.atomic(using):
+            yield
+        return
+
+    def begin():
+        connection.cursor().execute('BEGIN IMMEDIATE')
+
+    # Этим методом atomic() начинает транзакцию на SQLite.
+    connection._start_transaction_under_autocommit = begin
+    try:
+        with transaction.atomic(using):
+            yield
+    finally:
+        del connection._start_transaction_under_autocommit
+
+
+def backoff(attempt):
+    """Пауза перед повтором: случайная, с экспоненциально растущим пределом.
+
+    Разброс не даёт воркерам, столкнувшимся на блокировке, проснуться
+    одновременно и столкнуться снова.
+    """
+    limit = min(
+        settings.SQLITE_RETRY_DELAY * 2 ** attempt,
+        settings.SQLITE_RETRY_MAX_DELAY,
+    )
+    return random.uniform(0, limit)
+
+
+def write_transaction(func):
+    """Выполняет func в immediate() и повторяет, пока база занята.
+
+    Попыток не больше SQLITE_WRITE_RETRIES + 1. Внутри чужой транзакции
+    повторять нечего — откатится и она, поэтому ошибка пробрасывается.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in count():
+            try:
+                with immediate():
+                    return func(*args, **kwargs)
+            except OperationalError as error:
+                if (
+                    not is_locked(error)
+                    or attempt >= settings.SQLITE_WRITE_RETRIES
+                    or connections[DEFAULT_DB_ALIAS].in_atomic_block
+                ):
+                    raise
+            time.sleep(backoff(attempt))
+    return wrapper
+
+
+def save_with_retries(instance):
+    """Сохраняет модель в write_transaction, сначала записав её файлы.
+
+    Загруженный файл читается из запроса один раз, до транзакции: при
+    повторе его позиция уже была бы в конце, а копия из неудачной
+    попытки осталась бы в хранилище. Если сохранить модель так и не
+    удалось, записанные файлы удаляются.
+
+    Перед каждой попыткой возвращается исходный первичный ключ: после
+    отката новая запись иначе сохранилась бы как уже существующая, и
+    post_save получил бы created=False.
+    """
+    adding, pk = instance._state.adding, instance.pk
+
+    def save():
+        instance._state.adding, instance.pk = adding, pk
+        instance.save()
+
+    stored = []
+    for field in instance._meta.concrete_fields:
+        if isinstance(field, FileField):
+            file = getattr(instance, field.attname)
+            if file and not file._committed:
+                file.save(file.name, file.file, save=False)
+                stored.append(file)
+    try:
+        write_transaction(save)()
+    except Exception:
+        for file in stored:
+            file.storage.delete(file.name)
+        raise
+    return instance
@@ -0,0 +1,341 @@
+import multiprocessing
+import os
+import tempfile
+import time
+from io import StringIO
+from unittest import skipUnless
+
+from django.conf import settings
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.template.backends.django import DjangoTemplates
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core import benchmark
+from core.cache import SQLiteCache
+from core.management.commands.sync_replicas import copy_database
+from core.sqlite import is_locked, write_transaction
+from posts.models import Comment, Group, Post, User
+
+SIZES = [
+    int(size) for size in
+    os.environ.get('BENCHMARK_SIZES', '100,1000,10000').split(',')
+]
+REPEAT = int(os.environ.get('BENCHMARK_REPEAT', 50))
+THRESHOLD = float(os.environ.get('BENCHMARK_THRESHOLD', 0.75))
+P95_THRESHOLD = float(os.environ.get('BENCHMARK_P95_THRESHOLD', 1.5))
+BASELINE = os.environ.get('BENCHMARK_BASELINE', os.path.join(
+    os.path.dirname(__file__), 'benchmark_baseline.json'
+))
+OUTPUT = os.environ.get('BENCHMARK_OUTPUT', os.path.join(
+    tempfile.gettempdir(), 'yatube_benchmark.json'
+))
+TEMPLATE_OUTPUT = os.environ.get(
+    'BENCHMARK_TEMPLATE_OUTPUT',
+    os.path.join(tempfile.gettempdir(), 'yatube_template_benchmark.json'),
+)
+CACHE_OUTPUT = os.environ.get(
+    'BENCHMARK_CACHE_OUTPUT',
+    os.path.join(tempfile.gettempdir(), 'yatube_cache_benchmark.json'),
+)
+STRESS_OUTPUT = os.environ.get(
+    'BENCHMARK_STRESS_OUTPUT',
+    os.path.join(tempfile.gettempdir(), 'yatube_stress_benchmark.json'),
+)
+STRESS_PROCESSES = int(os.environ.get('BENCHMARK_STRESS_PROCESSES', 8))
+STRESS_SECONDS = float(os.environ.get('BENCHMARK_STRESS_SECONDS', 5))
+NAMESPACES = ('posts', 'users', 'about')
+
+
+@skipUnless(os.environ.get('BENCHMARK'), 'запуск: BENCHMARK=1')
+class ViewBenchmark(TestCase):
+    """Замеры всех именованных адресов posts, users и about.
+
+    BENCHMARK_SIZES — размеры базы в постах, BENCHMARK_REPEAT — число
+    запросов на адрес, BENCHMARK_THRESHOLD — допустимый рост медианы
+    задержки и размера ответа (доля), BENCHMARK_P95_THRESHOLD — рост
+    p95. Результаты пишутся в BENCHMARK_OUTPUT;
+    с BENCHMARK_UPDATE_BASELINE=1 они же становятся новым эталоном.
+    """
+
+    def seed(self, size):
+        missing = size - Post.objects.count()
+        if missing > 0:
+            call_command(
+                'seed_yatube', posts=missing, prefix=f'bench{size}_',
+                seed=size, stdout=StringIO(),
+            )
+        reader = User.objects.order_by(
+            '-stats__following_count', 'pk'
+        ).first()
+        author = User.objects.order_by('-stats__posts_count', 'pk').first()
+        own_post = Post.objects.create(author=reader, text='Пост читателя')
+        post = author.posts.order_by('-pub_date').first()
+        self.kwargs = {
+            'slug': Group.objects.order_by('pk').first().slug,
+            'username': author.username,
+            'post_id': post.pk,
+            'pk': own_post.pk,
+        }
+        self.query = {'posts:search': f'?q={post.text.split()[0]}'}
+        self.reader = reader
+
+    def clients(self):
+        user_client = Client()
+        user_client.force_login(self.reader)
+        return {
+            'guest': (Client(), None),
+            'user': (
+                user_client, lambda: user_client.force_login(self.reader)
+            ),
+        }
+
+    def run_size(self, size):
+        self.seed(size)
+        pages = {}
+        for name, pattern in benchmark.named_urls(*NAMESPACES):
+            kwargs = {
+                key: self.kwargs[key] for key in pattern.pattern.converters
+            }
+            url = reverse(name, kwargs=kwargs) + self.query.get(name, '')
+            for viewer, (client, login) in self.clients().items():
+                # После выхода пользователя нужно снова авторизовать.
+                prepare = login if name == 'users:logout' else None
+                pages[f'{name}|{viewer}'] = benchmark.measure(
+                    client, url, REPEAT, prepare
+                )
+        return pages
+
+    def test_views(self):
+        results = {
+            'environment': benchmark.environment(),
+            'repeat': REPEAT,
+            'results': {str(size): self.run_size(size) for size in SIZES},
+        }
+        benchmark.save(OUTPUT, results)
+        if os.environ.get('BENCHMARK_UPDATE_BASELINE'):
+            benchmark.save(BASELINE, results)
+            return
+        regressions = benchmark.compare(
+            results, benchmark.load(BASELINE), THRESHOLD, P95_THRESHOLD
+        )
+        self.assertEqual(
+            regressions, [],
+            f'Регрессии относительно {BASELINE}; результаты в {OUTPUT}'
+        )
+
+
+def template_backend(cached):
+    """Движок шаблонов проекта с cached loader или без него."""
+    config = settings.TEMPLATES[0]
+    loaders = settings.TEMPLATE_LOADERS
+    if cached:
+        loaders = [('django.template.loaders.cached.Loader', loaders)]
+    return DjangoTemplates({
+        'NAME': 'cached' if cached else 'plain',
+        'DIRS': config['DIRS'],
+        'APP_DIRS': False,
+        'OPTIONS': {**config['OPTIONS'], 'loaders': loaders},
+    })
+
+
+@skipUnless(os.environ.get('BENCHMARK'), 'запуск: BENCHMARK=1')
+@override_settings(PAGE_CACHE_TIMEOUT=0)
+class TemplateBenchmark(TestCase):
+    """Рендеринг index.html и post_detail.html с cached loader и без.
+
+    Контекст берётся из настоящего ответа страницы, замеряются
+    загрузка шаблона и рендеринг. Результаты пишутся в
+    BENCHMARK_TEMPLATE_OUTPUT.
+    """
+    templates = {
+        'posts/index.html': lambda post: reverse('posts:index'),
+        'posts/post_detail.html': lambda post: reverse(
+            'posts:post_detail', kwargs={'post_id': post.pk}
+        ),
+    }
+
+    def test_cached_loader_saves_render_time(self):
+        call_command(
+            'seed_yatube', posts=100, prefix='tpl_', stdout=StringIO()
+        )
+        post = Post.objects.order_by('-comments_count').first()
+        backends = {
+            'plain': template_backend(cached=False),
+            'cached': template_backend(cached=True),
+        }
+        results = {}
+        for name, url in self.templates.items():
+            response = Client().get(url(post))
+            context = response.context[0].flatten()
+            results[name] = {
+                mode: benchmark.measure_render(
+                    backend, name, context, response.wsgi_request, REPEAT
+                )
+                for mode, backend in backends.items()
+            }
+            results[name]['saved_ms'] = round(
+                results[name]['plain']['p50_ms']
+                - results[name]['cached']['p50_ms'], 3
+            )
+        benchmark.save(TEMPLATE_OUTPUT, {
+            'environment': benchmark.environment(),
+            'repeat': REPEAT,
+            'results': results,
+        })
+        for name, result in results.items():
+            with self.subTest(template=name):
+                self.assertGreater(result['saved_ms'], 0)
+
+
+@skipUnless(os.environ.get('BENCHMARK'), 'запуск: BENCHMARK=1')
+class CacheBenchmark(SimpleTestCase):
+    """Операции кэша: LocMemCache, FileBasedCache и core.cache.SQLiteCache.
+
+    Значение — страница в 10 КБ, get_many/set_many — по BATCH ключей,
+    как у версий суррогатных ключей. Результаты пишутся в
+    BENCHMARK_CACHE_OUTPUT.
+    """
+    BATCH = 50
+
+    def operations(self):
+        value = os.urandom(10 * 1024)
+        keys = [f'key:{number}' for number in range(self.BATCH)]
+        data = dict.fromkeys(keys, value)
+        return {
+            'set': lambda cache: cache.set('page', value),
+            'get': lambda cache: cache.get('page'),
+            'set_many': lambda cache: cache.set_many(data),
+            'get_many': lambda cache: cache.get_many(keys),
+            'get x BATCH': lambda cache: [cache.get(key) for key in keys],
+            'incr': lambda cache: cache.incr('counter'),
+        }
+
+    def test_backends(self):
+        with tempfile.TemporaryDirectory() as directory:
+            backends = {
+                'locmem': LocMemCache('benchmark', {}),
+                'filebased': FileBasedCache(
+                    os.path.join(directory, 'files'), {}
+                ),
+                'sqlite': SQLiteCache(
+                    os.path.join(directory, 'cache.sqlite3'), {}
+                ),
+            }
+            results = {}
+            for name, cache in backends.items():
+                cache.set('counter', 0, None)
+                results[name] = {
+                    operation: benchmark.measure_calls(
+                        lambda: func(cache), REPEAT
+                    )
+                    for operation, func in self.operations().items()
+                }
+        benchmark.save(CACHE_OUTPUT, {
+            'environment': benchmark.environment(),
+            'repeat': REPEAT,
+            'results': results,
+        })
+        sqlite = results['sqlite']
+        self.assertLess(
+            sqlite['get_many']['p50_ms'], sqlite['get x BATCH']['p50_ms']
+        )
+
+
+def add_comment(post_id, author):
+    """Запись как во вьюхе add_comment: пост, затем комментарий."""
+    post = Post.objects.get(pk=post_id)
+    Comment.objects.create(post=post, author=author, text='Комментарий')
+
+
+@write_transaction
+def create_author():
+    author = User.objects.create(username=f'stress{os.getpid()}')
+    return author, Post.objects.create(author=author, text='Пост')
+
+
+def add_comments(deadline, path, pragmas, wrap):
+    """Процесс стресс-теста: комментирует свой пост до deadline."""
+    benchmark.use_database(path)
+    writes = errors = 0
+    with override_settings(SQLITE_PRAGMAS=pragmas):
+        author, post = create_author()
+        comment = wrap(add_comment)
+        while time.time() < deadline:
+            try:
+                comment(post.pk, author)
+                writes += 1
+            except OperationalError as error:
+                if not is_locked(error):
+                    raise
+                errors += 1
+    return writes, errors
+
+
+@skipUnless(os.environ.get('BENCHMARK'), 'запуск: BENCHMARK=1')
+@skipUnless('fork' in multiprocessing.get_all_start_methods(), 'нужен fork')
+class WriteStressBenchmark(SimpleTestCase):
+    """Комментарии из нескольких процессов в один файл SQLite.
+
+    «before» — настройки SQLite по умолчанию и запись без транзакции,
+    как было во вьюхах, «after» — SQLITE_PRAGMAS и write_transaction.
+    BENCHMARK_STRESS_PROCESSES процессов пишут
+    BENCHMARK_STRESS_SECONDS секунд; пропускная способность и число
+    ошибок «database is locked» пишутся в BENCHMARK_STRESS_OUTPUT.
+    """
+    databases = {'default'}
+    modes = {
+        'before': ({'journal_mode': 'DELETE'}, lambda func: func),
+        'after': (settings.SQLITE_PRAGMAS, write_transaction),
+    }
+
+    def test_concurrent_writes(self):
+        connection.ensure_connection()
+        results = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for mode, (pragmas, wrap) in self.modes.items():
+                path = os.path.join(directory, f'{mode}.sqlite3')
+                copy_database(connection.connection, path)
+                results[mode] = benchmark.stress(
+                    add_comments, STRESS_PROCESSES, STRESS_SECONDS,
+                    path, pragmas, wrap,
+                )
+        benchmark.save(STRESS_OUTPUT, {
+            'environment': benchmark.environment(),
+            'results': results,
+        })
+        self.assertEqual(results['after']['lock_errors'], 0)
+
+
+class CompareTests(TestCase):
+    def results(self, **metrics):
+        page = {
+            'p50_ms': 10.0, 'p95_ms': 20.0, 'queries': 4, 'bytes': 1000,
+            **metrics,
+        }
+        return {'results': {'100': {'posts:index|guest': page}}}
+
+    def test_regressions_beyond_threshold_are_reported(self):
+        baseline = self.results()
+        cases = {
+            'запросов': self.results(queries=5),
+            'p50_ms': self.results(p50_ms=16.0),
+            'p95_ms': self.results(p95_ms=51.0),
+            'байт': self.results(bytes=1600),
+        }
+        for metric, results in cases.items():
+            with self.subTest(metric=metric):
+                regressions = benchmark.compare(results, baseline, 0.5, 1.5)
+                self.assertEqual(len(regressions), 1)
+                self.assertIn(metric, regressions[0])
+
+    def test_noise_and_new_pages_are_ignored(self):
+        baseline = self.results()
+        results = self.results(p50_ms=14.0, p95_ms=24.0, queries=3)
+        results['results']['1000'] = results['results']['100']
+        self.assertEqual(
+            benchmark.compare(results, baseline, 0.5, 1.5), []
+        )
@@ -0,0 +1,119 @@
+import multiprocessing
+import os
+import tempfile
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from core.cache import SQLiteCache, clear_after_migrate
+
+
+def increment(path, times):
+    cache = SQLiteCache(path, {})
+    for _ in range(times):
+        cache.incr('counter')
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.path, {'OPTIONS': options})
+
+    def test_values_round_trip(self):
+        values = {
+            'int': 42, 'big': 2 ** 70, 'bool': True, 'none': None,
+            'bytes': b'\x00gzip', 'dict': {'a': [1, 2]}, 'text': 'пост',
+        }
+        self.cache.set_many(values)
+        for key, value in values.items():
+            with self.subTest(key=key):
+                self.assertEqual(self.cache.get(key), value)
+                self.assertIs(type(self.cache.get(key)), type(value))
+        self.assertEqual(self.cache.get_many(['int', 'missing']), {'int': 42})
+        self.cache.delete_many(['int', 'bool'])
+        self.assertFalse(self.cache.has_key('int'))
+        self.assertEqual(self.cache.get('bool', 'default'), 'default')
+
+    def test_shared_between_instances(self):
+        self.cache.set('version', 1)
+        other = self.make_cache()
+        self.assertEqual(other.incr('version'), 2)
+        self.assertEqual(self.cache.get('version'), 2)
+        self.assertFalse(other.add('version', 10))
+        self.assertTrue(other.add('new', 10))
+        other.clear()
+        self.assertIsNone(self.cache.get('version'))
+
+    def test_incr(self):
+        self.cache.set('counter', 5, None)
+        self.assertEqual(self.cache.incr('counter', 10), 15)
+        self.assertEqual(self.cache.decr('counter', 3), 12)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        self.cache.set('text', 'abc')
+        with self.assertRaises(TypeError):
+            self.cache.incr('text')
+
+    @skipUnless(
+        'fork' in multiprocessing.get_all_start_methods(), 'нужен fork'
+    )
+    def test_incr_is_atomic_across_processes(self):
+        self.cache.set('counter', 0, None)
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(target=increment, args=(self.path, 100))
+            for _ in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        self.assertEqual(self.cache.get('counter'), 400)
+
+    def test_expired_entries_are_missing(self):
+        self.cache.set('short', 'value', 10)
+        self.cache.set('forever', 'value', None)
+        later = self.cache.get_backend_timeout(20)
+        with mock.patch('core.cache.time.time', return_value=later):
+            self.assertIsNone(self.cache.get('short'))
+            self.assertFalse(self.cache.has_key('short'))
+            self.assertFalse(self.cache.touch('short'))
+            self.assertTrue(self.cache.add('short', 'new'))
+            self.assertEqual(self.cache.get('forever'), 'value')
+
+    def test_cull_evicts_least_recently_read(self):
+        cache = self.make_cache(
+            MAX_ENTRIES=4, CULL_FREQUENCY=4, CULL_EVERY=1, LRU_RESOLUTION=0
+        )
+        now = 1_000_000.0
+        for number in range(4):
+            with mock.patch('core.cache.time.time', return_value=now):
+                cache.set(f'key{number}', number, None)
+            now += 1
+        with mock.patch('core.cache.time.time', return_value=now + 1):
+            cache.get('key0')
+        with mock.patch('core.cache.time.time', return_value=now + 2):
+            cache.set('key4', 4, None)
+        self.assertEqual(
+            sorted(cache.get_many([f'key{n}' for n in range(5)])),
+            ['key0', 'key3', 'key4'],
+        )
+
+    def test_cleared_after_migrate(self):
+        self.cache.set('page', 'stale')
+        with mock.patch('django.core.cache.caches', {'default': self.cache}):
+            clear_after_migrate(sender=None)
+        self.assertIsNone(self.cache.get('page'))
+
+    def test_tests_do_not_share_project_cache_file(self):
+        location = settings.CACHES['default']['LOCATION']
+        self.assertNotEqual(
+            os.path.dirname(location), settings.BASE_DIR
+        )
+        self.assertTrue(location.startswith(tempfile.gettempdir()))
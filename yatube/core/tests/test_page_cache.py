@@ -0,0 +1,142 @@
+import gzip
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from core import page_cache
+from core.middleware import AnonymousPageCacheMiddleware
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(username='Writer')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Тестовый пост'
+        )
+        cls.urls = {
+            'index': reverse('posts:index'),
+            'group_list': reverse(
+                'posts:group_list', kwargs={'slug': cls.group.slug}
+            ),
+            'profile': reverse(
+                'posts:profile', kwargs={'username': cls.author.username}
+            ),
+            'post_detail': reverse(
+                'posts:post_detail', kwargs={'post_id': cls.post.pk}
+            ),
+        }
+
+    def setUp(self):
+        cache.clear()
+
+    def fill(self):
+        for url in self.urls.values():
+            self.client.get(url)
+
+    def cached(self):
+        return {
+            name for name, url in self.urls.items()
+            if self.client.get(url)['X-Page-Cache'] == 'HIT'
+        }
+
+    def test_hit_serves_gzip_without_queries(self):
+        for name, url in self.urls.items():
+            with self.subTest(url=name):
+                rendered = self.client.get(url)
+                self.assertEqual(rendered['X-Page-Cache'], 'MISS')
+                with self.assertNumQueries(0):
+                    response = self.client.get(
+                        url, HTTP_ACCEPT_ENCODING='gzip, deflate'
+                    )
+                self.assertEqual(response['Content-Encoding'], 'gzip')
+                self.assertEqual(
+                    gzip.decompress(response.content), rendered.content
+                )
+                plain = self.client.get(url)
+                self.assertFalse(plain.has_header('Content-Encoding'))
+                self.assertEqual(plain.content, rendered.content)
+                self.assertEqual(
+                    plain['Content-Type'], rendered['Content-Type']
+                )
+
+    def test_hit_answers_conditional_requests(self):
+        url = self.urls['post_detail']
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_changes_purge_only_tagged_pages(self):
+        changes = {
+            'comment': (
+                lambda: Comment.objects.create(
+                    post=self.post, author=self.user, text='Комментарий'
+                ),
+                {'index', 'group_list', 'profile'},
+            ),
+            'follow': (
+                lambda: Follow.objects.create(
+                    user=self.user, author=self.author
+                ),
+                {'index', 'group_list'},
+            ),
+            # Лента автора ссылается на группу его поста.
+            'group': (
+                lambda: Group.objects.filter(pk=self.group.pk).first().save(),
+                set(),
+            ),
+            'post': (
+                lambda: Post.objects.create(author=self.user, text='Новый'),
+                {'group_list', 'profile', 'post_detail'},
+            ),
+        }
+        for name, (change, still_cached) in changes.items():
+            with self.subTest(change=name):
+                self.fill()
+                change()
+                self.assertEqual(self.cached(), still_cached)
+
+    def test_group_rename_is_not_served_from_stale_fragments(self):
+        self.fill()
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'renamed'
+        group.save()
+        new_link = reverse('posts:group_list', args=['renamed'])
+        for name in ('index', 'profile', 'post_detail'):
+            with self.subTest(url=name):
+                response = self.client.get(self.urls[name])
+                self.assertEqual(response['X-Page-Cache'], 'MISS')
+                self.assertContains(response, new_link)
+                self.assertNotContains(
+                    response, reverse('posts:group_list', args=['test_slug'])
+                )
+
+    def test_page_purged_during_render_is_not_stored(self):
+        url = self.urls['index']
+
+        def render(request):
+            response = page_cache.tag(HttpResponse('Старая лента'), 'index')
+            page_cache.purge('index')
+            return response
+
+        middleware = AnonymousPageCacheMiddleware(render)
+        response = middleware(RequestFactory().get(url))
+        self.assertFalse(response.has_header('X-Page-Cache'))
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'MISS')
+
+    def test_logged_in_users_bypass_cache(self):
+        client = Client()
+        client.force_login(self.user)
+        for url in self.urls.values():
+            client.get(url)
+            self.assertFalse(client.get(url).has_header('X-Page-Cache'))
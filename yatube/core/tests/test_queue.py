@@ -0,0 +1,91 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core import queue
+from core.models import Task
+
+calls = []
+
+
+@queue.task('core.tests.record')
+def record(value):
+    calls.append(value)
+
+
+def forget(value):
+    calls.append(f'failed {value}')
+
+
+@queue.task('core.tests.explode', on_failure=forget)
+def explode(value):
+    raise RuntimeError(value)
+
+
+@override_settings(TASKS_RETRY_DELAY=0)
+class QueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_task_runs_once(self):
+        task_obj = queue.enqueue('core.tests.record', value=1)
+        self.assertEqual(queue.run_pending(), 1)
+        self.assertEqual(queue.run_pending(), 0)
+        task_obj.refresh_from_db()
+        self.assertEqual(task_obj.status, Task.DONE)
+        self.assertEqual(calls, [1])
+
+    def test_failed_task_is_retried_then_given_up(self):
+        task_obj = queue.enqueue(
+            'core.tests.explode', max_attempts=2, value='boom'
+        )
+        with self.assertLogs('core.queue', 'ERROR'):
+            queue.run_pending()
+        task_obj.refresh_from_db()
+        self.assertEqual(task_obj.status, Task.FAILED)
+        self.assertEqual(task_obj.attempts, 2)
+        self.assertIn('RuntimeError: boom', task_obj.last_error)
+        self.assertEqual(calls, ['failed boom'])
+
+    def test_expired_lock_is_reclaimed(self):
+        task_obj = queue.enqueue('core.tests.record', value=2)
+        self.assertIsNotNone(queue.claim('first'))
+        self.assertIsNone(queue.claim('second'))
+        Task.objects.filter(pk=task_obj.pk).update(
+            locked_until=timezone.now() - timedelta(seconds=1)
+        )
+        reclaimed = queue.claim('second')
+        self.assertEqual(reclaimed.locked_by, 'second')
+        self.assertEqual(reclaimed.attempts, 2)
+
+    def expire_lock(self, task_obj):
+        Task.objects.filter(pk=task_obj.pk).update(
+            locked_until=timezone.now() - timedelta(seconds=1)
+        )
+
+    def test_abandoned_task_fails_after_last_attempt(self):
+        task_obj = queue.enqueue(
+            'core.tests.explode', max_attempts=1, value='oom'
+        )
+        queue.claim('killed')
+        self.expire_lock(task_obj)
+        with self.assertLogs('core.queue', 'ERROR'):
+            self.assertIsNone(queue.claim('second'))
+        task_obj.refresh_from_db()
+        self.assertEqual(task_obj.status, Task.FAILED)
+        self.assertIn('killed', task_obj.last_error)
+        self.assertEqual(calls, ['failed oom'])
+
+    def test_stale_worker_does_not_overwrite_new_attempt(self):
+        task_obj = queue.enqueue('core.tests.record', value=3)
+        stale = queue.claim('first')
+        self.expire_lock(task_obj)
+        current = queue.claim('second')
+        queue.execute(stale)
+        task_obj.refresh_from_db()
+        self.assertEqual(task_obj.status, Task.RUNNING)
+        self.assertEqual(task_obj.locked_by, 'second')
+        queue.execute(current)
+        task_obj.refresh_from_db()
+        self.assertEqual(task_obj.status, Task.DONE)
@@ -0,0 +1,181 @@
+import os
+import sqlite3
+import tempfile
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from core.management.commands.sync_replicas import copy_database
+from core.replicas import (PIN_COOKIE, ReplicaRouter, pin_to_primary,
+                           read_from_replica)
+from posts.models import Post, User
+
+PAGE_PREFIX = 'page_cache:page:'
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], PAGE_CACHE_TIMEOUT=0)
+class ReplicaRoutingTests(TestCase):
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpClass(cls):
+        # Зеркало тестовой базы в памяти — отдельное соединение, которое
+        # не видит транзакцию теста и упирается в её блокировки. Реплика
+        # работает через соединение default, а куда шли чтения, видно
+        # по решениям роутера.
+        cls.replica_connection = connections['replica']
+        connections['replica'] = connections['default']
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Writer')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+        cls.detail_url = reverse(
+            'posts:post_detail', kwargs={'post_id': cls.post.pk}
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'] = cls.replica_connection
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def get(self, url):
+        """Ответ и базы, которые роутер выбрал для чтений вьюхи."""
+        reads = []
+        db_for_read = ReplicaRouter.db_for_read
+
+        def record(router, model, **hints):
+            reads.append(db_for_read(router, model, **hints))
+            return reads[-1]
+
+        with mock.patch.object(ReplicaRouter, 'db_for_read', record):
+            response = self.client.get(url)
+        return response, set(reads)
+
+    def test_views_read_from_replica(self):
+        for url in (reverse('posts:index'), self.detail_url):
+            with self.subTest(url=url):
+                response, reads = self.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('replica', reads)
+
+    def test_replica_pages_have_no_etag(self):
+        response, reads = self.get(self.detail_url)
+        self.assertIn('replica', reads)
+        self.assertFalse(response.has_header('ETag'))
+        self.client.cookies[PIN_COOKIE] = str(time.time() + 10)
+        response, reads = self.get(self.detail_url)
+        self.assertEqual(reads, {'default'})
+        self.assertTrue(response.has_header('ETag'))
+
+    def test_writer_sticks_to_primary(self):
+        response = self.client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            {'text': 'Комментарий'},
+        )
+        self.assertIn(PIN_COOKIE, response.cookies)
+        response, reads = self.get(self.detail_url)
+        self.assertContains(response, 'Комментарий')
+        self.assertEqual(reads, {'default'})
+
+        self.client.cookies[PIN_COOKIE] = str(time.time() - 1)
+        _, reads = self.get(self.detail_url)
+        self.assertIn('replica', reads)
+
+    def test_form_without_write_does_not_pin(self):
+        response = self.client.get(reverse('posts:post_create'))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_write_inside_read_view_switches_to_primary(self):
+        used = []
+
+        @read_from_replica
+        @pin_to_primary
+        def view(request):
+            used.append(Post.objects.all().db)
+            Post.objects.filter(pk=self.post.pk).update(text='Новый текст')
+            used.append(Post.objects.all().db)
+            return HttpResponse()
+
+        response = view(RequestFactory().get('/'))
+        self.assertEqual(used, ['replica', 'default'])
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(Post.objects.all().db, 'default')
+
+    def test_only_posts_models_are_read_from_replica(self):
+        used = []
+
+        @read_from_replica
+        def view(request):
+            used.extend([Post.objects.all().db, User.objects.all().db])
+            return HttpResponse()
+
+        view(RequestFactory().get('/'))
+        self.assertEqual(used, ['replica', 'default'])
+
+    def test_login_keeps_session_and_pins(self):
+        User.objects.create_user(username='Reader', password='secret-pass')
+        client = Client()
+        response = client.post(
+            reverse('users:login'),
+            {'username': 'Reader', 'password': 'secret-pass'},
+        )
+        self.assertIn(PIN_COOKIE, response.cookies)
+        response = client.get(reverse('posts:index'))
+        self.assertEqual(response.context['user'].username, 'Reader')
+
+    @override_settings(PAGE_CACHE_TIMEOUT=600, REPLICA_CACHE_TIMEOUT=5)
+    def test_replica_pages_are_cached_briefly(self):
+        cache.clear()
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            response = Client().get(reverse('posts:index'))
+        self.assertEqual(response.context['fragment_timeout'], 5)
+        timeouts = {
+            call[0][2] for call in cache_set.call_args_list
+            if call[0][0].startswith(PAGE_PREFIX)
+        }
+        self.assertEqual(timeouts, {5})
+
+        self.client.cookies[PIN_COOKIE] = str(time.time() + 10)
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(
+            response.context['fragment_timeout'],
+            settings.FRAGMENT_CACHE_TIMEOUT,
+        )
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_everything_uses_default(self):
+        response = self.client.get(
+            reverse('posts:profile_follow', args=[self.user.username])
+        )
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        _, reads = self.get(self.detail_url)
+        self.assertEqual(reads, {'default'})
+
+
+class SyncReplicasTests(TestCase):
+    def test_copy_database(self):
+        with tempfile.TemporaryDirectory() as directory:
+            primary = sqlite3.connect(os.path.join(directory, 'primary'))
+            primary.execute('CREATE TABLE post (text TEXT)')
+            primary.execute("INSERT INTO post VALUES ('первый')")
+            primary.commit()
+            target = os.path.join(directory, 'replica')
+            copy_database(primary, target)
+            primary.execute("INSERT INTO post VALUES ('второй')")
+            primary.commit()
+            replica = sqlite3.connect(target)
+            self.assertEqual(
+                replica.execute('SELECT text FROM post').fetchall(),
+                [('первый',)],
+            )
+            replica.close()
+            primary.close()
@@ -0,0 +1,157 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError, connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import (Client, SimpleTestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.sqlite import backoff, save_with_retries, write_transaction
+from posts.models import Group, Post, User
+
+LOCKED = OperationalError('database is locked')
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+class ConfigureTests(SimpleTestCase):
+    def test_new_connections_get_pragmas(self):
+        with tempfile.TemporaryDirectory() as directory:
+            database = DatabaseWrapper({
+                **connection.settings_dict,
+                'NAME': os.path.join(directory, 'db.sqlite3'),
+            }, alias='pragmas')
+            database.ensure_connection()
+            try:
+                values = {
+                    name: database.connection.execute(
+                        f'PRAGMA {name}'
+                    ).fetchone()[0]
+                    for name in ('journal_mode', 'synchronous', 'cache_size')
+                }
+            finally:
+                database.close()
+        # synchronous = NORMAL — это 1.
+        self.assertEqual(
+            values,
+            {'journal_mode': 'wal', 'synchronous': 1, 'cache_size': -65536},
+        )
+
+    @override_settings(SQLITE_RETRY_DELAY=0.1, SQLITE_RETRY_MAX_DELAY=0.5)
+    def test_backoff_is_bounded(self):
+        for attempt, limit in ((0, 0.1), (2, 0.4), (10, 0.5)):
+            with self.subTest(attempt=attempt):
+                for _ in range(20):
+                    self.assertLessEqual(backoff(attempt), limit)
+
+
+@mock.patch('core.sqlite.time.sleep')
+class WriteTransactionTests(TransactionTestCase):
+    def test_begins_immediate_transaction(self, sleep):
+        @write_transaction
+        def create():
+            self.assertTrue(connection.in_atomic_block)
+            return Group.objects.create(title='Группа', slug='group')
+
+        with CaptureQueriesContext(connection) as queries:
+            create()
+        self.assertEqual(queries[0]['sql'], 'BEGIN IMMEDIATE')
+        self.assertNotIn(
+            '_start_transaction_under_autocommit', vars(connection)
+        )
+
+    def test_locked_attempts_are_rolled_back_and_retried(self, sleep):
+        outcomes = iter([LOCKED, LOCKED, None])
+
+        @write_transaction
+        def create():
+            Group.objects.create(title='Группа', slug=f'g{sleep.call_count}')
+            error = next(outcomes)
+            if error:
+                raise error
+            return 'ok'
+
+        self.assertEqual(create(), 'ok')
+        self.assertEqual(sleep.call_count, 2)
+        self.assertEqual(list(Group.objects.values_list('slug', flat=True)),
+                         ['g2'])
+
+    @override_settings(SQLITE_WRITE_RETRIES=1)
+    def test_gives_up_after_retries(self, sleep):
+        func = mock.Mock(side_effect=LOCKED)
+        with self.assertRaises(OperationalError):
+            write_transaction(func)()
+        self.assertEqual(func.call_count, 2)
+
+    def test_other_errors_are_not_retried(self, sleep):
+        func = mock.Mock(side_effect=OperationalError('no such table: x'))
+        with self.assertRaises(OperationalError):
+            write_transaction(func)()
+        self.assertEqual(func.call_count, 1)
+        sleep.assert_not_called()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@mock.patch('core.sqlite.time.sleep')
+class SaveWithRetriesTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='Writer')
+
+    def make_post(self, side_effects):
+        post = Post(
+            author=self.user, text='Пост',
+            image=SimpleUploadedFile('photo.gif', b'GIF89a'),
+        )
+        save = post.save
+        outcomes = iter(side_effects)
+
+        def flaky_save():
+            save()
+            error = next(outcomes)
+            if error:
+                raise error
+
+        post.save = flaky_save
+        return post
+
+    def stored(self):
+        directory = os.path.join(TEMP_MEDIA_ROOT, 'posts')
+        return os.listdir(directory) if os.path.isdir(directory) else []
+
+    def test_file_is_stored_once_and_survives_retry(self, sleep):
+        post = save_with_retries(self.make_post([LOCKED, None]))
+        self.assertEqual(sleep.call_count, 1)
+        self.assertEqual(self.stored(), [os.path.basename(post.image.name)])
+        with post.image.open('rb'):
+            self.assertEqual(post.image.read(), b'GIF89a')
+        self.assertEqual(Post.objects.get().image, post.image.name)
+        # Повтор сохраняет пост как новый: сработали сигналы создания.
+        self.user.stats.refresh_from_db()
+        self.assertEqual(self.user.stats.posts_count, 1)
+
+    @override_settings(SQLITE_WRITE_RETRIES=0)
+    def test_file_is_removed_when_save_fails(self, sleep):
+        with self.assertRaises(OperationalError):
+            save_with_retries(self.make_post([LOCKED]))
+        self.assertFalse(Post.objects.exists())
+        self.assertEqual(self.stored(), [])
+
+    def test_form_is_rendered_without_write_lock(self, sleep):
+        client = Client()
+        client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            client.get(reverse('posts:post_create'))
+        self.assertNotIn('BEGIN IMMEDIATE', [q['sql'] for q in queries])
+        with CaptureQueriesContext(connection) as queries:
+            client.post(reverse('posts:post_create'), {'text': 'Новый'})
+        self.assertIn('BEGIN IMMEDIATE', [q['sql'] for q in queries])
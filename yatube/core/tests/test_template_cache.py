@@ -0,0 +1,44 @@
+import os
+import tempfile
+
+from django.conf import settings
+from django.template import engines
+from django.test import TestCase, override_settings
+
+from core.template_cache import precompile, template_names
+
+CACHED_TEMPLATES = [{
+    **settings.TEMPLATES[0],
+    'OPTIONS': {
+        **settings.TEMPLATES[0]['OPTIONS'],
+        'loaders': [(
+            'django.template.loaders.cached.Loader', settings.TEMPLATE_LOADERS
+        )],
+    },
+}]
+
+
+@override_settings(TEMPLATES=CACHED_TEMPLATES)
+class PrecompileTests(TestCase):
+    def test_every_project_template_is_cached(self):
+        names = list(template_names(settings.TEMPLATES[0]['DIRS']))
+        self.assertIn('posts/index.html', names)
+        self.assertIn('posts/includes/post_image.html', names)
+        self.assertEqual(precompile(), len(names))
+        loader = engines['django'].engine.template_loaders[0]
+        self.assertLessEqual(set(names), set(loader.get_template_cache))
+
+    def test_broken_template_is_logged_and_skipped(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for name, source in (
+                ('good.html', '{% load thumbnail %}ok'),
+                ('broken.html', '{% if %}'),
+            ):
+                with open(os.path.join(directory, name), 'w') as template:
+                    template.write(source)
+            with override_settings(TEMPLATES=[
+                {**CACHED_TEMPLATES[0], 'DIRS': [directory]}
+            ]):
+                with self.assertLogs('core.template_cache', 'ERROR') as logs:
+                    self.assertEqual(precompile(), 1)
+        self.assertIn('broken.html', logs.output[0])
@@ -0,0 +1,91 @@
+import json
+import re
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import IMAGE_READY, Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def metrics(response):
+    return dict(
+        re.match(r'(\w+);dur=([\d.]+)', part).groups()
+        for part in response['Server-Timing'].split(', ')
+    )
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    SERVER_TIMING=True,
+    SERVER_TIMING_SLOW_MS=10_000,
+    PAGE_CACHE_TIMEOUT=0,
+)
+class ServerTimingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x02\x00'
+            b'\x01\x00\x80\x00\x00\x00\x00\x00'
+            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+            b'\x0A\x00\x3B'
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                name='small.gif', content=small_gif, content_type='image/gif'
+            ),
+        )
+        Post.objects.filter(pk=cls.post.pk).update(image_state=IMAGE_READY)
+        cls.url = reverse('posts:post_detail', kwargs={'post_id': cls.post.pk})
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_header_splits_request_time(self):
+        response = self.client.get(self.url)
+        timings = metrics(response)
+        self.assertTrue({'db', 'tpl', 'cache', 'thumb', 'total'} <= set(
+            timings
+        ))
+        self.assertGreaterEqual(
+            float(timings['total']), float(timings['tpl'])
+        )
+        self.assertIn('desc="SQL (', response['Server-Timing'])
+
+    def test_slow_request_is_logged(self):
+        with override_settings(SERVER_TIMING_SLOW_MS=0):
+            with self.assertLogs('core.timing', 'WARNING') as logs:
+                self.client.get(self.url)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'posts:post_detail')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['db']['count'], 0)
+        self.assertGreaterEqual(record['total_ms'], record['db']['ms'])
+
+    def test_fast_request_is_not_logged(self):
+        with self.assertRaises(AssertionError):
+            with self.assertLogs('core.timing', 'WARNING'):
+                self.client.get(self.url)
+
+    def test_disabled_middleware_adds_nothing(self):
+        with override_settings(SERVER_TIMING=False):
+            response = Client().get(self.url)
+        self.assertNotIn('Server-Timing', response)
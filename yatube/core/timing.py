@@ -0,0 +1,112 @@
+"""Замеры времени запроса по частям: база, шаблоны, кэш, миниатюры.
+
+Замеры собираются в Timings текущего запроса. Обёртки над шаблонами,
+кэшем и sorl ставятся один раз, при первом включении
+ServerTimingMiddleware; пока SERVER_TIMING выключен, код проекта
+работает без них.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.core.cache import caches
+from django.conf import settings
+
+current = ContextVar('request_timings', default=None)
+
+# Описания идут в заголовок, а в нём допустим только latin-1.
+METRICS = {
+    'db': 'SQL',
+    'tpl': 'Templates',
+    'cache': 'Cache',
+    'thumb': 'Thumbnails',
+}
+CACHE_METHODS = (
+    'get', 'set', 'add', 'delete', 'get_many', 'set_many', 'delete_many',
+    'incr', 'decr', 'has_key', 'touch',
+)
+
+
+class Timings:
+    """Суммарное время и число вызовов по каждой метрике.
+
+    Вложенные вызовы одной метрики (get_many внутри вызывает get)
+    считаются один раз.
+    """
+
+    def __init__(self):
+        self.seconds = dict.fromkeys(METRICS, 0.0)
+        self.counts = dict.fromkeys(METRICS, 0)
+        self.active = set()
+
+    @contextmanager
+    def measure(self, metric):
+        if metric in self.active:
+            yield
+            return
+        self.active.add(metric)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[metric] += time.perf_counter() - started
+            self.counts[metric] += 1
+            self.active.discard(metric)
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        with self.measure('db'):
+            return execute(sql, params, many, context)
+
+    def header(self, total):
+        parts = [
+            f'{metric};dur={self.seconds[metric] * 1000:.1f};'
+            f'desc="{METRICS[metric]} ({self.counts[metric]})"'
+            for metric in METRICS if self.counts[metric]
+        ]
+        parts.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(parts)
+
+    def as_dict(self):
+        return {
+            metric: {
+                'ms': round(self.seconds[metric] * 1000, 3),
+                'count': self.counts[metric],
+            }
+            for metric in METRICS
+        }
+
+
+def instrument(owner, name, metric):
+    """Оборачивает метод: его время уходит в метрику текущего запроса."""
+    original = getattr(owner, name, None)
+    if original is None or getattr(original, 'timing_metric', None):
+        return
+
+    @wraps(original)
+    def wrapper(*args, **kwargs):
+        timings = current.get()
+        if timings is None:
+            return original(*args, **kwargs)
+        with timings.measure(metric):
+            return original(*args, **kwargs)
+
+    wrapper.timing_metric = metric
+    setattr(owner, name, wrapper)
+
+
+def install():
+    """Ставит обёртки над рендерингом, кэшем и миниатюрами (один раз)."""
+    from django.template.backends.django import Template
+    from sorl.thumbnail.conf import settings as thumbnail_settings
+    from sorl.thumbnail.helpers import get_module_class
+
+    instrument(Template, 'render', 'tpl')
+    instrument(
+        get_module_class(thumbnail_settings.THUMBNAIL_BACKEND),
+        'get_thumbnail', 'thumb',
+    )
+    for alias in settings.CACHES:
+        backend = type(caches[alias])
+        for name in CACHE_METHODS:
+            instrument(backend, name, 'cache')
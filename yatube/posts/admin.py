@@ -1,9 +1,38 @@
 from django.contrib import admin
 
+from . import export, search
 from .models import Post, Group, Comment, Follow
 
 
-class PostAdmin(admin.ModelAdmin):
+class ExportMixin:
+    """Действия «Выгрузить в NDJSON/CSV» для выбранных записей.
+
+    Ответ отдаётся потоком: выгрузка всей таблицы через «Выбрать все»
+    не держит строки в памяти.
+    """
+    export_name = None
+    actions = ('export_ndjson', 'export_csv')
+
+    def stream_export(self, queryset, fmt):
+        return export.streaming_response(
+            export.EXPORTS[self.export_name], fmt, queryset,
+            filename=self.export_name,
+        )
+
+    def export_ndjson(self, request, queryset):
+        return self.stream_export(queryset, 'ndjson')
+
+    export_ndjson.short_description = 'Выгрузить в NDJSON'
+    export_ndjson.allowed_permissions = ('view',)
+
+    def export_csv(self, request, queryset):
+        return self.stream_export(queryset, 'csv')
+
+    export_csv.short_description = 'Выгрузить в CSV'
+    export_csv.allowed_permissions = ('view',)
+
+
+class PostAdmin(ExportMixin, admin.ModelAdmin):
     list_display = (
         'pk',
         'text',
@@ -13,8 +42,18 @@ class PostAdmin(admin.ModelAdmin):
     )
     list_editable = ('group',)
     search_fields = ('text',)
-    list_filter = ('pub_date',)
+    list_filter = ('pub_date', 'group')
     empty_value_display = '-пусто-'
+    export_name = 'posts'
+
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по тексту идёт через индекс FTS5 вместо LIKE '%…%'.
+        if not search_term:
+            return queryset, False
+        query = search.build_query(search_term)
+        if query is None:
+            return queryset.none(), False
+        return search.filter_posts(queryset, query), False
 
 
 class GroupAdmin(admin.ModelAdmin):
@@ -27,14 +66,15 @@ class GroupAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
-class CommentsAdmin(admin.ModelAdmin):
+class CommentsAdmin(ExportMixin, admin.ModelAdmin):
     list_display = (
         'created',
         'text',
         'author',
         'post',
     )
-    list_filter = ('author',)
+    list_filter = ('created', 'author')
+    export_name = 'comments'
 
 
 class FollowAdmin(admin.ModelAdmin):
@@ -0,0 +1,145 @@
+"""JSON-версии лент для мобильного клиента.
+
+Строки читаются через .values() только с теми колонками, которые
+запросил клиент (`?fields=id,text,author`), без моделей и шаблонов.
+Страницы листаются курсором `?after=` по ключу (pub_date, id), как
+CursorPaginator в HTML-лентах, но без подсчёта страниц.
+"""
+from django.conf import settings
+from django.db.models import Q
+from django.http import JsonResponse
+
+from .models import IMAGE_READY
+from .paginator import decode_cursor, encode_cursor
+from .thumbnails import thumbnail_urls
+
+MAX_LIMIT = 100
+
+# Поле ответа → колонки, которые нужно для него прочитать.
+FIELDS = {
+    'id': ('id',),
+    'text': ('text',),
+    'pub_date': ('pub_date',),
+    'author': ('author__username',),
+    'group': ('group__slug',),
+    'comments_count': ('comments_count',),
+    'image': ('image', 'image_state', 'thumbnails'),
+}
+
+
+class Feed:
+    """Источник строк ленты: ключ курсора и путь от строки до поста."""
+
+    def __init__(self, key=('pub_date', 'id'), prefix=''):
+        self.key = key
+        self.prefix = prefix
+
+    def column(self, name):
+        return self.prefix + name
+
+
+POSTS = Feed()
+TIMELINE = Feed(key=('pub_date', 'post_id'), prefix='post__')
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def parse_fields(value):
+    if not value:
+        return list(FIELDS)
+    fields = list(dict.fromkeys(
+        field.strip() for field in value.split(',') if field.strip()
+    ))
+    unknown = [field for field in fields if field not in FIELDS]
+    if unknown or not fields:
+        raise BadRequest(
+            f'Неизвестные поля: {", ".join(unknown)}. '
+            f'Доступны: {", ".join(FIELDS)}.'
+        )
+    return fields
+
+
+def parse_limit(value):
+    if not value:
+        return settings.LIMIT_POSTS
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= MAX_LIMIT:
+        raise BadRequest(f'limit должен быть от 1 до {MAX_LIMIT}.')
+    return limit
+
+
+def get_rows(queryset, feed, fields, limit, after=None):
+    """limit + 1 строк после курсора.
+
+    Лишняя строка показывает, что следующая страница есть.
+    """
+    date_field, id_field = feed.key
+    queryset = queryset.order_by(f'-{date_field}', f'-{id_field}')
+    if after is not None:
+        key = decode_cursor(after)
+        if key is None:
+            raise BadRequest('Некорректный курсор.')
+        pub_date, pk = key
+        queryset = queryset.filter(
+            Q(**{f'{date_field}__lt': pub_date})
+            | Q(**{date_field: pub_date, f'{id_field}__lt': pk})
+        )
+    columns = {
+        feed.column(column)
+        for field in fields for column in FIELDS[field]
+    }
+    return list(queryset.values(*feed.key, *columns)[:limit + 1])
+
+
+def serialize(rows, feed, fields):
+    image_column = feed.column('image')
+    state_column = feed.column('image_state')
+    names_column = feed.column('thumbnails')
+    thumbnails = {}
+    if 'image' in fields:
+        thumbnails = thumbnail_urls(
+            (row[feed.key[1]], row[image_column], row[names_column])
+            for row in rows
+            if row[image_column] and row[state_column] == IMAGE_READY
+        )
+    results = []
+    for row in rows:
+        item = {}
+        for field in fields:
+            if field == 'image':
+                item[field] = thumbnails.get(row[image_column])
+            else:
+                item[field] = row[feed.column(FIELDS[field][0])]
+        results.append(item)
+    return results
+
+
+def feed_response(request, queryset, feed=POSTS):
+    """Страница ленты в JSON: {"results": [...], "next": адрес или null}."""
+    try:
+        fields = parse_fields(request.GET.get('fields'))
+        limit = parse_limit(request.GET.get('limit'))
+        rows = get_rows(
+            queryset, feed, fields, limit, request.GET.get('after')
+        )
+    except BadRequest as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    next_url = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        query = request.GET.copy()
+        query['after'] = encode_cursor(
+            *(rows[-1][column] for column in feed.key)
+        )
+        next_url = request.build_absolute_uri(
+            f'{request.path}?{query.urlencode()}'
+        )
+    return JsonResponse({
+        'results': serialize(rows, feed, fields),
+        'next': next_url,
+    }, json_dumps_params={'ensure_ascii': False})
@@ -0,0 +1,88 @@
+import hashlib
+from functools import wraps
+
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from . import feed_cache, follows
+from .models import Group, Post, User
+
+
+def make_etag(request, *parts):
+    """ETag из версий лент, счётчиков и того, кто смотрит страницу.
+
+    Вошедший пользователь видит своё имя в шапке, формы и кнопки,
+    поэтому его страница отличается от страницы гостя.
+    """
+    viewer = request.user.pk if request.user.is_authenticated else 'anon'
+    value = '|'.join(str(part) for part in (viewer, *parts))
+    return hashlib.md5(value.encode()).hexdigest()
+
+
+def post_state(request, post_id):
+    row = Post.objects.filter(pk=post_id).values_list(
+        'author_id', 'group_id'
+    ).first()
+    if row is None:
+        return None
+    author_id, group_id = row
+    # На странице поста есть название группы и ссылка на неё.
+    return make_etag(
+        request,
+        feed_cache.get_version(f'post:{post_id}'),
+        feed_cache.get_version(f'author:{author_id}'),
+        feed_cache.get_version(f'group:{group_id}') if group_id else None,
+    )
+
+
+def profile_state(request, username):
+    row = User.objects.filter(username=username).values_list(
+        'pk', 'stats__followers_count', 'stats__following_count',
+    ).first()
+    if row is None:
+        return None
+    author_id, followers, following = row
+    # На своей странице пользователь видит рекомендации авторов.
+    own = request.user.pk == author_id
+    return make_etag(
+        request,
+        feed_cache.get_version(f'author:{author_id}'),
+        followers, following,
+        follows.is_following(request.user, author_id),
+        feed_cache.get_version('suggestions') if own else None,
+    )
+
+
+def group_state(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True
+    ).first()
+    if group_id is None:
+        return None
+    return make_etag(request, feed_cache.get_version(f'group:{group_id}'))
+
+
+def conditional_page(get_state):
+    """Conditional GET для страницы: 304 без основных запросов и шаблона.
+
+    get_state(request, *args, **kwargs) возвращает ETag или None, если
+    объекта нет, — тогда отвечает сама вьюха. Last-Modified не
+    отдаётся: дата свежей записи не меняется при правках, удалениях и
+    подписках, и клиент с одним If-Modified-Since получал бы
+    устаревший 304.
+    """
+    def decorator(view):
+        conditional_view = condition(etag_func=get_state)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            # Страница зависит от сессии: общий кэш не должен отдавать
+            # её другим посетителям.
+            patch_vary_headers(response, ('Cookie',))
+            if request.user.is_authenticated:
+                patch_cache_control(response, private=True)
+            patch_cache_control(response, no_cache=True)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,94 @@
+from django.db.models import Count, F
+
+from .models import Comment, Follow, Post, UserStats
+
+USER_COUNTERS = {
+    'posts_count': (Post, 'author_id'),
+    'followers_count': (Follow, 'author_id'),
+    'following_count': (Follow, 'user_id'),
+}
+
+
+def change(queryset, field, delta):
+    """Атомарно меняет счётчик на delta одним UPDATE."""
+    if delta < 0:
+        # Счётчик не уходит в минус, даже если успел разойтись с данными.
+        queryset = queryset.filter(**{f'{field}__gt': 0})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def change_user(user_id, field, delta):
+    updated = change(UserStats.objects.filter(user_id=user_id), field, delta)
+    if not updated and delta > 0:
+        # Строки счётчиков ещё нет — создаём её по фактическим данным.
+        recount_user(user_id)
+
+
+def change_post(post_id, delta):
+    change(Post.objects.filter(pk=post_id), 'comments_count', delta)
+
+
+def recount_user(user_id):
+    """Считает счётчики пользователя заново и сохраняет их."""
+    values = {
+        field: model.objects.filter(**{lookup: user_id}).count()
+        for field, (model, lookup) in USER_COUNTERS.items()
+    }
+    stats, _ = UserStats.objects.update_or_create(
+        user_id=user_id, defaults=values
+    )
+    return stats
+
+
+def get_stats(user):
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        return recount_user(user.pk)
+
+
+def grouped_counts(model, lookup, ids):
+    return dict(
+        model.objects.filter(**{f'{lookup}__in': ids})
+        .values_list(lookup)
+        .annotate(total=Count('pk'))
+        .order_by()
+    )
+
+
+def reconcile_users(user_ids):
+    """Сверяет счётчики пачки пользователей, возвращает число исправлений."""
+    actual = {
+        field: grouped_counts(model, lookup, user_ids)
+        for field, (model, lookup) in USER_COUNTERS.items()
+    }
+    stored = UserStats.objects.in_bulk(user_ids)
+    to_create, to_update = [], []
+    for user_id in user_ids:
+        values = {
+            field: counts.get(user_id, 0)
+            for field, counts in actual.items()
+        }
+        stats = stored.get(user_id)
+        if stats is None:
+            to_create.append(UserStats(user_id=user_id, **values))
+        elif any(getattr(stats, f) != v for f, v in values.items()):
+            for field, value in values.items():
+                setattr(stats, field, value)
+            to_update.append(stats)
+    UserStats.objects.bulk_create(to_create)
+    UserStats.objects.bulk_update(to_update, list(USER_COUNTERS))
+    return len(to_create) + len(to_update)
+
+
+def reconcile_posts(post_ids):
+    """Сверяет comments_count пачки постов, возвращает число исправлений."""
+    actual = grouped_counts(Comment, 'post_id', post_ids)
+    to_update = []
+    for post in Post.objects.filter(pk__in=post_ids).only('comments_count'):
+        value = actual.get(post.pk, 0)
+        if post.comments_count != value:
+            post.comments_count = value
+            to_update.append(post)
+    Post.objects.bulk_update(to_update, ['comments_count'])
+    return len(to_update)
@@ -0,0 +1,77 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+
+from core import replicas
+
+VERSION_KEY = 'feed_version:{}'
+COUNT_KEY = 'feed_count:{}:{}'
+
+
+def get_version(scope):
+    """Текущая версия ленты: часть ключа кэша её фрагментов.
+
+    Первая версия берётся от текущего времени, чтобы после вытеснения
+    ключа из кэша не совпасть с версией старых фрагментов.
+    """
+    key = VERSION_KEY.format(scope)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def bump(*scopes):
+    """Сбрасывает кэш лент: старые фрагменты просто перестают читаться."""
+    for scope in scopes:
+        try:
+            cache.incr(VERSION_KEY.format(scope))
+        except ValueError:
+            # Версии ещё нет — get_version создаст новую.
+            pass
+
+
+def post_scopes(post, old_group_id=None):
+    scopes = {'index', f'author:{post.author_id}', f'post:{post.pk}'}
+    for group_id in (post.group_id, old_group_id):
+        if group_id is not None:
+            scopes.add(f'group:{group_id}')
+    return scopes
+
+
+def get_count(scope, queryset):
+    """Число постов ленты, закэшированное до следующей смены версии."""
+    key = COUNT_KEY.format(scope, get_version(scope))
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(
+            key, count, replicas.cache_timeout(settings.FEED_COUNT_TIMEOUT)
+        )
+    return count
+
+
+def estimate_count(queryset):
+    """Приблизительный размер таблицы по максимальному id.
+
+    MAX(id) берётся одним поиском по первичному ключу вместо обхода
+    индекса; удалённые записи не вычитаются.
+    """
+    last_id = queryset.model.objects.aggregate(last_id=Max('pk'))['last_id']
+    return last_id or 0
+
+
+def get_index_count(queryset):
+    """Размер общей ленты и признак того, что это оценка.
+
+    Точный для небольших таблиц, иначе оценка по max(id): версия общей
+    ленты меняется с каждым новым постом, поэтому на большой таблице
+    точный COUNT(*) пересчитывался бы почти постоянно.
+    """
+    estimate = estimate_count(queryset)
+    if estimate > settings.FEED_COUNT_EXACT_LIMIT:
+        return estimate, True
+    return get_count('index', queryset), False
@@ -0,0 +1,74 @@
+"""Подписки пользователя: множество id авторов в общем кэше.
+
+Множество загружается одним запросом по индексу (user, author) и
+сбрасывается сигналами Follow после каждой подписки и отписки.
+Сбрасывать надёжнее, чем дописывать: два одновременных изменения
+не затрут друг друга в кэше.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, router, transaction
+from django.db.models.signals import post_save
+
+from core import replicas
+from .models import Follow
+
+KEY = 'following:{}'
+
+
+def following_ids(user_id):
+    """frozenset id авторов, на которых подписан пользователь."""
+    key = KEY.format(user_id)
+    ids = cache.get(key)
+    if ids is None:
+        ids = frozenset(
+            Follow.objects.filter(user_id=user_id)
+            .values_list('author_id', flat=True)
+        )
+        cache.set(
+            key, ids, replicas.cache_timeout(settings.FOLLOWING_TIMEOUT)
+        )
+    return ids
+
+
+def is_following(user, author_id):
+    return user.is_authenticated and author_id in following_ids(user.pk)
+
+
+def forget(user_id):
+    """Сбрасывает множество сразу и ещё раз после фиксации транзакции.
+
+    Пока транзакция не зафиксирована, другой запрос может прочитать
+    старые подписки и снова положить их в кэш.
+    """
+    key = KEY.format(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def follow(user_id, author_id):
+    """Подписка одним INSERT; повторная ничего не меняет.
+
+    Одновременные клики не создают дублей и не падают на уникальном
+    ограничении. Сигнал post_save отправляется, только если строка
+    действительно вставлена. Возвращает True для новой подписки.
+    """
+    using = router.db_for_write(Follow)
+    table = Follow._meta.db_table
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} (user_id, author_id) VALUES (%s, %s) '
+            'ON CONFLICT DO NOTHING',
+            [user_id, author_id],
+        )
+        if cursor.rowcount != 1:
+            return False
+        pk = cursor.lastrowid
+    instance = Follow(pk=pk, user_id=user_id, author_id=author_id)
+    instance._state.adding = False
+    instance._state.db = using
+    post_save.send(
+        sender=Follow, instance=instance, created=True,
+        update_fields=None, raw=False, using=using,
+    )
+    return True
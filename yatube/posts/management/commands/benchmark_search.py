@@ -0,0 +1,97 @@
+import random
+import time
+from statistics import median
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Post, User
+from posts.search import SearchResults
+
+WORDS = (
+    'пост', 'текст', 'новости', 'погода', 'город', 'кофе', 'книга', 'кино',
+    'музыка', 'работа', 'отпуск', 'море', 'горы', 'кошка', 'собака',
+    'python', 'django', 'sqlite', 'индекс', 'запрос', 'лента', 'друзья',
+    'выходные', 'утро', 'вечер', 'дождь', 'солнце', 'поезд', 'самолёт',
+    'рецепт', 'ужин', 'спорт', 'бег', 'велосипед', 'фото', 'картинка',
+)
+RARE_WORD = 'редкостьзапроса'
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает поиск через FTS5 с фильтром text__icontains. '
+        'Недостающие посты создаются внутри транзакции, которая в конце '
+        'откатывается, так что база остаётся прежней.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--posts', type=int, default=1_000_000,
+            help='Сколько постов должно быть в таблице во время замера.',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Сколько раз повторять каждый запрос.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Размер пачки bulk_create при генерации постов.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.fill(options['posts'], options['batch_size'],
+                      options['seed'])
+            for query in ('кофе', 'кофе море', RARE_WORD):
+                self.compare(query, options['repeat'])
+            transaction.set_rollback(True)
+
+    def fill(self, total, batch_size, seed):
+        missing = total - Post.objects.count()
+        if missing <= 0:
+            return
+        author, _ = User.objects.get_or_create(username='search_benchmark')
+        rnd = random.Random(seed)
+        started = time.perf_counter()
+        for offset in range(0, missing, batch_size):
+            size = min(batch_size, missing - offset)
+            posts = []
+            for number in range(offset, offset + size):
+                words = rnd.choices(WORDS, k=rnd.randint(5, 40))
+                if number % 10_000 == 0:
+                    words.append(RARE_WORD)
+                posts.append(Post(author=author, text=' '.join(words)))
+            Post.objects.bulk_create(posts)
+        self.stdout.write(
+            f'Создано постов: {missing} '
+            f'за {time.perf_counter() - started:.1f} с.'
+        )
+
+    def measure(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            timings.append((time.perf_counter() - started) * 1000)
+        return result, median(timings)
+
+    def compare(self, query, repeat):
+        def like_page():
+            posts = Post.objects.all()
+            for word in query.split():
+                posts = posts.filter(text__icontains=word)
+            return posts.count(), list(posts.order_by('-pub_date')[:10])
+
+        def fts_page():
+            results = SearchResults(query)
+            return results.count(), results[:10]
+
+        (like_total, _), like_ms = self.measure(like_page, repeat)
+        (fts_total, _), fts_ms = self.measure(fts_page, repeat)
+        self.stdout.write(
+            f'«{query}»: icontains {like_ms:.1f} мс '
+            f'({like_total} найдено), FTS5 {fts_ms:.1f} мс '
+            f'({fts_total} найдено), ускорение ×{like_ms / fts_ms:.1f}'
+        )
@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import export
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает посты или комментарии в NDJSON или CSV потоком, '
+        'без загрузки таблицы в память.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(export.EXPORTS))
+        parser.add_argument(
+            '--format', choices=sorted(export.FORMATS), default='ndjson'
+        )
+        parser.add_argument(
+            '--output', help='Файл для выгрузки (по умолчанию stdout).'
+        )
+        parser.add_argument(
+            '--since', help='Дата или дата со временем, включительно.'
+        )
+        parser.add_argument('--until', help='Дата, не включая.')
+        parser.add_argument('--group', help='slug группы.')
+        parser.add_argument('--author', help='Имя автора.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=export.CHUNK_SIZE
+        )
+
+    def handle(self, *args, **options):
+        target = export.EXPORTS[options['kind']]
+        try:
+            dates = {
+                name: export.parse_moment(options[name])
+                for name in ('since', 'until') if options[name]
+            }
+        except ValueError as error:
+            raise CommandError(error)
+        queryset = target.filter(
+            target.model.objects.all(),
+            group=options['group'],
+            author=options['author'],
+            **dates,
+        )
+        lines = export.render(
+            target, options['format'], queryset, options['chunk_size']
+        )
+        if not options['output']:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        with open(
+            options['output'], 'w', encoding='utf-8', newline=''
+        ) as output:
+            output.writelines(lines)
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгрузка записана в {options["output"]}.'
+        ))
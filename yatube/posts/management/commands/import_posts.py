@@ -0,0 +1,389 @@
+import json
+import sys
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.contrib.auth.hashers import make_password
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from core import page_cache, queue
+from core.db import bulk_insert, keep_auto_now, last_id, new_ids
+from posts import counters, feed_cache, timeline
+from posts.export import parse_moment
+from posts.models import (
+    IMAGE_PROCESSING, Comment, Follow, Group, Post, User,
+)
+
+# Сколько имён искать одним запросом: у SQLite есть предел на число
+# параметров.
+LOOKUP_CHUNK = 500
+
+
+class Lookup:
+    """Кэш «имя → id» для авторов или групп.
+
+    Каждое имя ищется в базе один раз за импорт, недостающие — одним
+    запросом на пачку строк. С make недостающие ещё и создаются.
+    """
+
+    def __init__(self, model, field, make=None):
+        self.model = model
+        self.field = field
+        self.make = make
+        self.ids = {}
+
+    def resolve(self, names):
+        missing = {name for name in names if name and name not in self.ids}
+        self.load(missing)
+        missing -= self.ids.keys()
+        if missing and self.make is not None:
+            self.model.objects.bulk_create(
+                self.make(name) for name in sorted(missing)
+            )
+            self.load(missing)
+
+    def load(self, names):
+        names = iter(names)
+        while True:
+            chunk = list(islice(names, LOOKUP_CHUNK))
+            if not chunk:
+                return
+            self.ids.update(
+                self.model.objects.filter(**{f'{self.field}__in': chunk})
+                .values_list(self.field, 'pk')
+            )
+
+    def get(self, name):
+        return self.ids.get(name)
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует посты с комментариями из NDJSON (формат export_posts '
+        'posts, комментарии — списком в поле comments) пачками через '
+        'bulk_create. Прерванный импорт продолжается с той же строки, '
+        'уже импортированные посты повторно не создаются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'source', help='Файл NDJSON или «-» для чтения из stdin.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько строк вставлять в одной транзакции.',
+        )
+        parser.add_argument(
+            '--images-dir',
+            help='Каталог, относительно которого указаны картинки постов.',
+        )
+        parser.add_argument(
+            '--create-missing', action='store_true',
+            help='Создавать неизвестных авторов и группы '
+                 '(иначе такие посты пропускаются).',
+        )
+        parser.add_argument(
+            '--state-file', default='.import_posts',
+            help='Файл с числом уже импортированных строк и авторами.',
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать с первой строки, игнорируя сохранённое состояние.',
+        )
+        parser.add_argument(
+            '--skip-timelines', action='store_true',
+            help='Не пересобирать ленты подписчиков после импорта.',
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        state_file = Path(options['state_file'])
+        done, self.author_ids = 0, set()
+        if state_file.exists() and not options['restart']:
+            done, self.author_ids = self.read_state(state_file)
+            self.stdout.write(f'Продолжение со строки {done + 1}.')
+        make_user = make_group = None
+        if options['create_missing']:
+            password = make_password(None)
+
+            def make_user(username):
+                return User(username=username, password=password)
+
+            def make_group(slug):
+                return Group(title=slug, slug=slug, description='')
+
+        self.users = Lookup(User, 'username', make_user)
+        self.groups = Lookup(Group, 'slug', make_group)
+        self.skipped = 0
+        imported = 0
+        started = time.monotonic()
+
+        source = self.open_source()
+        try:
+            lines = islice(source, done, None)
+            while True:
+                chunk = list(islice(lines, options['batch_size']))
+                if not chunk:
+                    break
+                rows = self.parse(chunk, done)
+                imported += self.import_chunk(rows)
+                done += len(chunk)
+                # Если команда упадёт до записи состояния, пачка будет
+                # прочитана снова, но её посты найдутся в базе.
+                state_file.write_text(json.dumps({
+                    'done': done, 'authors': sorted(self.author_ids),
+                }))
+                self.stdout.write(
+                    f'{done} строк, {imported} постов, '
+                    f'{self.rate(imported, started):.0f} постов/с'
+                )
+        finally:
+            if source is not sys.stdin:
+                source.close()
+
+        if not options['skip_timelines']:
+            self.rebuild_timelines()
+        if state_file.exists():
+            state_file.unlink()
+        self.stdout.write(self.style.SUCCESS(
+            f'Импортировано постов: {imported}, пропущено: {self.skipped} '
+            f'за {time.monotonic() - started:.1f} с '
+            f'({self.rate(imported, started):.0f} постов/с).'
+        ))
+
+    def read_state(self, state_file):
+        state = json.loads(state_file.read_text() or '0')
+        if isinstance(state, int):
+            # Состояние старых версий команды — только число строк.
+            return state, set()
+        return state['done'], set(state['authors'])
+
+    def rate(self, count, started):
+        return count / max(time.monotonic() - started, 1e-6)
+
+    def open_source(self):
+        if self.options['source'] == '-':
+            return sys.stdin
+        try:
+            return open(self.options['source'], encoding='utf-8')
+        except OSError as error:
+            raise CommandError(error)
+
+    def parse(self, chunk, offset):
+        rows = []
+        for number, line in enumerate(chunk, offset + 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as error:
+                raise CommandError(f'Строка {number}: {error}')
+            if not isinstance(row, dict) or 'text' not in row:
+                raise CommandError(f'Строка {number}: нет поля text.')
+            rows.append(row)
+        return rows
+
+    def import_chunk(self, rows):
+        """Вставляет посты пачки одной транзакцией, возвращает их число.
+
+        Посты, которые уже есть в базе (тот же автор, дата и текст, а
+        для строк без даты — автор и текст), пропускаются: так пачка,
+        прочитанная повторно после сбоя, не создаёт дублей. Картинки
+        копируются после фиксации транзакции, чтобы откат не оставлял в
+        хранилище лишних файлов.
+        """
+        self.users.resolve(
+            name for row in rows
+            for name in [row.get('author')] + [
+                comment.get('author') for comment in row.get('comments', ())
+            ]
+        )
+        self.groups.resolve(row.get('group') for row in rows)
+        posts, comments, images = [], [], []
+        for row in rows:
+            post = self.make_post(row)
+            if post is None:
+                self.skipped += 1
+                continue
+            posts.append(post)
+            comments.append(self.make_comments(row))
+            images.append(row.get('image') if post.image else None)
+            post.comments_count = len(comments[-1])
+        existing = self.find_existing(posts)
+        new = [
+            (post, post_comments, image)
+            for post, post_comments, image in zip(posts, comments, images)
+            if self.key(post) not in existing
+        ]
+        with transaction.atomic(), keep_auto_now(Post, 'pub_date'), \
+                keep_auto_now(Comment, 'created'):
+            first_id = last_id(Post)
+            Post.objects.bulk_create(post for post, _, _ in new)
+            post_ids = new_ids(Post, first_id)
+            bulk_insert(
+                Comment,
+                (
+                    comment
+                    for post_id, (_, post_comments, _) in zip(post_ids, new)
+                    for comment in self.attach(post_comments, post_id)
+                ),
+                self.options['batch_size'],
+            )
+            user_ids = {post.author_id for post, _, _ in new} | {
+                comment.author_id
+                for _, post_comments, _ in new for comment in post_comments
+            }
+            counters.reconcile_users(sorted(user_ids))
+        # Посты, вставленные прошлым запуском до сбоя, могли остаться
+        # без файлов картинок.
+        pending = [
+            (post_id, post.image.name, image)
+            for post_id, (post, _, image) in zip(post_ids, new) if image
+        ] + [
+            (existing[self.key(post)], post.image.name, image)
+            for post, image in zip(posts, images)
+            if image and post.image and self.key(post) in existing
+            and not default_storage.exists(post.image.name)
+        ]
+        for post_id, name, image in pending:
+            self.copy_image(post_id, name, image)
+        self.author_ids.update(post.author_id for post in posts)
+        self.invalidate(posts)
+        return len(new)
+
+    def key(self, post):
+        return post.import_key
+
+    def find_existing(self, posts):
+        """{ключ поста: id} для уже импортированных постов.
+
+        Ключ — (автор, дата, текст), у строк без даты — (автор, None,
+        текст): их дата берётся от времени вставки и при повторе другая.
+        У найденного поста в post.image подставляется имя его картинки.
+        """
+        dated = [post for post in posts if post.import_key[1] is not None]
+        undated = [post for post in posts if post.import_key[1] is None]
+        found = {}
+        if dated:
+            dates = [post.pub_date for post in dated]
+            author_ids = sorted({post.author_id for post in dated})
+            for start in range(0, len(author_ids), LOOKUP_CHUNK):
+                rows = Post.objects.filter(
+                    author_id__in=author_ids[start:start + LOOKUP_CHUNK],
+                    pub_date__range=(min(dates), max(dates)),
+                ).values_list(
+                    'pk', 'author_id', 'pub_date', 'text', 'image'
+                )
+                for pk, author_id, pub_date, text, image in rows:
+                    found[author_id, pub_date, text] = pk, image
+        if undated:
+            author_ids = {post.author_id for post in undated}
+            texts = sorted({post.text for post in undated})
+            for start in range(0, len(texts), LOOKUP_CHUNK):
+                rows = Post.objects.filter(
+                    text__in=texts[start:start + LOOKUP_CHUNK],
+                ).values_list('pk', 'author_id', 'text', 'image')
+                for pk, author_id, text, image in rows:
+                    if author_id in author_ids:
+                        found[author_id, None, text] = pk, image
+        existing = {}
+        for post in posts:
+            if self.key(post) in found:
+                existing[self.key(post)], post.image = found[self.key(post)]
+        return existing
+
+    def invalidate(self, posts):
+        """Сбрасывает кэш лент и страниц, куда попали посты пачки."""
+        scopes = {'index'}
+        for post in posts:
+            scopes.add(f'author:{post.author_id}')
+            if post.group_id is not None:
+                scopes.add(f'group:{post.group_id}')
+        feed_cache.bump(*scopes)
+        page_cache.purge(*scopes)
+
+    def make_post(self, row):
+        author_id = self.users.get(row.get('author'))
+        group_id = self.groups.get(row.get('group'))
+        if author_id is None or (row.get('group') and group_id is None):
+            return None
+        post = Post(
+            author_id=author_id,
+            group_id=group_id,
+            text=row['text'],
+            pub_date=self.moment(row.get('pub_date')),
+        )
+        post.import_key = (
+            author_id, post.pub_date if row.get('pub_date') else None,
+            post.text,
+        )
+        if row.get('image') and self.options['images_dir']:
+            # Файл копируется после вставки, а пока имя только занято.
+            post.image = default_storage.get_available_name(
+                f'posts/{self.image_path(row["image"]).name}'
+            )
+            post.image_state = IMAGE_PROCESSING
+        return post
+
+    def make_comments(self, row):
+        comments = []
+        for comment in row.get('comments', ()):
+            author_id = self.users.get(comment.get('author'))
+            if author_id is None:
+                continue
+            comments.append(Comment(
+                author_id=author_id,
+                text=comment.get('text', ''),
+                created=self.moment(comment.get('created')),
+            ))
+        return comments
+
+    def attach(self, comments, post_id):
+        for comment in comments:
+            comment.post_id = post_id
+            yield comment
+
+    def moment(self, value):
+        if not value:
+            return timezone.now()
+        try:
+            return parse_moment(value)
+        except ValueError as error:
+            raise CommandError(error)
+
+    def image_path(self, name):
+        path = Path(self.options['images_dir']) / name
+        if not path.is_file():
+            raise CommandError(f'Картинка {name}: файл не найден.')
+        return path
+
+    def copy_image(self, post_id, name, source):
+        """Копирует картинку поста и ставит её в очередь на обработку.
+
+        Если имя заняли после вставки поста, пост получает то имя, под
+        которым файл сохранило хранилище.
+        """
+        try:
+            with self.image_path(source).open('rb') as image:
+                saved = default_storage.save(name, File(image))
+        except OSError as error:
+            raise CommandError(f'Картинка {source}: {error}')
+        if saved != name:
+            Post.objects.filter(pk=post_id).update(image=saved)
+        queue.enqueue('posts.process_image', post_id=post_id)
+
+    def rebuild_timelines(self):
+        """Ленты подписчиков всех авторов, чьи посты импортированы."""
+        author_ids = sorted(self.author_ids)
+        user_ids = set()
+        for start in range(0, len(author_ids), LOOKUP_CHUNK):
+            user_ids.update(Follow.objects.filter(
+                author_id__in=author_ids[start:start + LOOKUP_CHUNK]
+            ).values_list('user_id', flat=True))
+        for user_id in sorted(user_ids):
+            timeline.rebuild(user_id)
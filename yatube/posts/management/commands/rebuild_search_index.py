@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересобирает полнотекстовый индекс постов (FTS5) по таблице '
+        'posts_post и восстанавливает триггеры синхронизации.'
+    )
+
+    def handle(self, *args, **options):
+        search.install(connection)
+        search.rebuild(connection)
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {search.FTS_TABLE}')
+            total = cursor.fetchone()[0]
+        self.stdout.write(self.style.SUCCESS(
+            f'Индекс пересобран, постов в индексе: {total}.'
+        ))
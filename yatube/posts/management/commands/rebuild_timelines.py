@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+from posts.models import FeedEntry, Follow, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересобирает ленты подписок: удаляет записи отписанных авторов '
+        'и добавляет недостающие посты.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames', nargs='*',
+            help='Читатели, чьи ленты нужно проверить (по умолчанию все).',
+        )
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Очистить ленту перед заполнением.',
+        )
+
+    def handle(self, *args, **options):
+        if options['usernames']:
+            user_ids = set(User.objects.filter(
+                username__in=options['usernames']
+            ).values_list('id', flat=True))
+        else:
+            user_ids = set(
+                Follow.objects.values_list('user_id', flat=True)
+            ) | set(FeedEntry.objects.values_list('user_id', flat=True))
+        removed = 0
+        for user_id in user_ids:
+            removed += timeline.rebuild(user_id, clear=options['clear'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Лент проверено: {len(user_ids)}, '
+            f'удалено записей: {removed}.'
+        ))
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+from posts.models import Post, User
+
+
+def id_chunks(queryset, size):
+    """Первичные ключи пачками по возрастанию, без OFFSET."""
+    last_id = 0
+    while True:
+        ids = list(
+            queryset.filter(pk__gt=last_id).order_by('pk')
+            .values_list('pk', flat=True)[:size]
+        )
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+class Command(BaseCommand):
+    help = 'Сверяет счётчики постов, комментариев и подписок с данными.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Сколько строк проверять за один проход.',
+        )
+
+    def handle(self, *args, **options):
+        size = options['chunk_size']
+        fixed_users = sum(
+            counters.reconcile_users(ids)
+            for ids in id_chunks(User.objects.all(), size)
+        )
+        fixed_posts = sum(
+            counters.reconcile_posts(ids)
+            for ids in id_chunks(Post.objects.all(), size)
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено счётчиков: пользователей {fixed_users}, '
+            f'постов {fixed_posts}.'
+        ))
@@ -0,0 +1,325 @@
+import random
+import time
+from datetime import datetime, timedelta
+from io import BytesIO
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from faker import Faker
+from PIL import Image, ImageDraw
+
+from core.db import bulk_insert, keep_auto_now, last_id, new_ids
+from posts import timeline
+from posts.models import (
+    Comment, FeedEntry, Follow, Group, Post, User, UserStats,
+)
+
+# Даты постов отсчитываются от фиксированного момента, чтобы один и тот
+# же seed давал одинаковые данные в любой день.
+DEFAULT_END = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+class Skewed:
+    """Выбор элементов с частотой по закону Ципфа: 1 / rank ** skew."""
+
+    def __init__(self, items, skew, rnd):
+        self.items = list(items)
+        rnd.shuffle(self.items)
+        self.cum_weights = list(accumulate(
+            1 / rank ** skew for rank in range(1, len(self.items) + 1)
+        ))
+        self.rnd = rnd
+
+    def pick(self, k=1):
+        return self.rnd.choices(self.items, cum_weights=self.cum_weights, k=k)
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими данными: пользователи, группы, '
+        'посты с неравномерным распределением авторов, комментарии, '
+        'степенной граф подписок и картинки. При одинаковом --seed '
+        'данные получаются одинаковыми.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10_000)
+        parser.add_argument(
+            '--users', type=int,
+            help='Число пользователей (по умолчанию posts / 100).',
+        )
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument(
+            '--comments', type=float, default=2.0,
+            help='Среднее число комментариев на пост.',
+        )
+        parser.add_argument(
+            '--follows', type=float, default=10.0,
+            help='Среднее число подписок у пользователя.',
+        )
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Показатель Ципфа для активности и популярности авторов.',
+        )
+        parser.add_argument(
+            '--images', type=float, default=0.0,
+            help='Доля постов с картинкой, от 0 до 1.',
+        )
+        parser.add_argument(
+            '--image-pool', type=int, default=20,
+            help='Сколько разных картинок сгенерировать.',
+        )
+        parser.add_argument('--days', type=int, default=730)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--prefix', default='seed',
+            help='Префикс имён пользователей и адресов групп.',
+        )
+        parser.add_argument(
+            '--password', default='password',
+            help='Пароль всех созданных пользователей.',
+        )
+        parser.add_argument(
+            '--skip-timelines', action='store_true',
+            help='Не заполнять ленты подписок (на больших графах долго).',
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.prefix = options['prefix']
+        if User.objects.filter(username__startswith=self.prefix).exists():
+            raise CommandError(
+                f'Пользователи с префиксом «{self.prefix}» уже есть, '
+                f'выберите другой --prefix.'
+            )
+        self.rnd = random.Random(options['seed'])
+        self.fake = Faker('ru_RU')
+        self.fake.seed_instance(options['seed'])
+        self.sentences = [self.fake.sentence() for _ in range(5000)]
+        self.batch_size = options['batch_size']
+        started = time.perf_counter()
+
+        user_ids = self.step('Пользователи', self.create_users)
+        self.authors = Skewed(user_ids, options['skew'], self.rnd)
+        self.group_ids = self.step('Группы', self.create_groups)
+        self.images = self.step('Картинки', self.create_images)
+        follows = self.step('Подписки', self.create_follows, user_ids)
+        posts_count = self.step('Посты и комментарии', self.create_posts)
+        self.step(
+            'Счётчики', self.create_stats, user_ids, posts_count, follows
+        )
+        if not options['skip_timelines']:
+            self.step('Ленты подписок', self.build_timelines, follows)
+        # Фрагменты и страницы в кэше не знают о вставленных данных.
+        cache.clear()
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.perf_counter() - started:.1f} с.'
+        ))
+
+    def step(self, title, func, *args):
+        started = time.perf_counter()
+        result = func(*args)
+        self.stdout.write(
+            f'{title}: {time.perf_counter() - started:.1f} с.'
+        )
+        return result
+
+    def text(self, low, high):
+        return ' '.join(self.rnd.choices(
+            self.sentences, k=self.rnd.randint(low, high)
+        ))
+
+    def create_users(self):
+        total = self.options['users'] or max(self.options['posts'] // 100, 10)
+        password = make_password(self.options['password'])
+        first_names = [self.fake.first_name() for _ in range(500)]
+        last_names = [self.fake.last_name() for _ in range(500)]
+        start = last_id(User)
+        with transaction.atomic():
+            bulk_insert(
+                User,
+                (
+                    User(
+                        username=f'{self.prefix}{number}',
+                        first_name=self.rnd.choice(first_names),
+                        last_name=self.rnd.choice(last_names),
+                        password=password,
+                    )
+                    for number in range(total)
+                ),
+                self.batch_size,
+            )
+        return new_ids(User, start)
+
+    def create_groups(self):
+        start = last_id(Group)
+        Group.objects.bulk_create(
+            Group(
+                title=self.fake.sentence(nb_words=2).rstrip('.'),
+                slug=f'{self.prefix}-{number}',
+                description=self.text(1, 3),
+            )
+            for number in range(self.options['groups'])
+        )
+        return new_ids(Group, start)
+
+    def create_images(self):
+        """Пул картинок: посты ссылаются на них, а не на свои копии."""
+        if not self.options['images']:
+            return []
+        names = []
+        for number in range(self.options['image_pool']):
+            image = Image.new('RGB', (960, 640), self.color())
+            draw = ImageDraw.Draw(image)
+            for _ in range(8):
+                x, y = self.rnd.randrange(960), self.rnd.randrange(640)
+                size = self.rnd.randint(40, 320)
+                draw.ellipse((x, y, x + size, y + size), fill=self.color())
+            content = BytesIO()
+            image.save(content, 'JPEG', quality=80)
+            name = f'posts/{self.prefix}_{number}.jpg'
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            names.append(default_storage.save(
+                name, ContentFile(content.getvalue())
+            ))
+        return names
+
+    def color(self):
+        return tuple(self.rnd.randrange(256) for _ in range(3))
+
+    def create_follows(self, user_ids):
+        """Степенной граф: число подписок — по Парето, на кого — по Ципфу.
+
+        Популярны те же авторы, что пишут больше всех.
+        """
+        average = self.options['follows']
+        follows = {}
+        for user_id in user_ids:
+            degree = int(self.rnd.paretovariate(1.5) * average / 3)
+            degree = min(degree, len(user_ids) - 1)
+            authors = set(self.authors.pick(degree)) if degree else set()
+            authors.discard(user_id)
+            if authors:
+                follows[user_id] = sorted(authors)
+        rows = (
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id, authors in follows.items()
+            for author_id in authors
+        )
+        with transaction.atomic():
+            bulk_insert(Follow, rows, self.batch_size)
+        return follows
+
+    def create_posts(self):
+        """Посты по возрастанию даты, комментарии — сразу за пачкой."""
+        total = self.options['posts']
+        end = DEFAULT_END
+        start = end - timedelta(days=self.options['days'])
+        step = (end - start) / total
+        posts_count = dict.fromkeys(self.authors.items, 0)
+        with keep_auto_now(Post, 'pub_date'), \
+                keep_auto_now(Comment, 'created'):
+            for offset in range(0, total, self.batch_size):
+                size = min(self.batch_size, total - offset)
+                posts = [
+                    self.make_post(start + step * number, posts_count)
+                    for number in range(offset, offset + size)
+                ]
+                with transaction.atomic():
+                    first_id = last_id(Post)
+                    Post.objects.bulk_create(posts)
+                    post_ids = new_ids(Post, first_id)
+                    bulk_insert(
+                        Comment,
+                        self.make_comments(posts, post_ids),
+                        self.batch_size,
+                    )
+                self.stdout.write(f'  постов: {offset + size}/{total}')
+        return posts_count
+
+    def make_post(self, pub_date, posts_count):
+        author_id = self.authors.pick()[0]
+        posts_count[author_id] += 1
+        group_id = None
+        if self.group_ids and self.rnd.random() < 0.4:
+            group_id = self.rnd.choice(self.group_ids)
+        image = ''
+        if self.images and self.rnd.random() < self.options['images']:
+            image = self.rnd.choice(self.images)
+        average = self.options['comments']
+        return Post(
+            author_id=author_id,
+            group_id=group_id,
+            text=self.text(1, 6),
+            image=image,
+            pub_date=pub_date + timedelta(seconds=self.rnd.random()),
+            comments_count=(
+                int(self.rnd.expovariate(1 / average)) if average else 0
+            ),
+        )
+
+    def make_comments(self, posts, post_ids):
+        for post, post_id in zip(posts, post_ids):
+            created = post.pub_date
+            for author_id in self.authors.pick(post.comments_count):
+                created += timedelta(minutes=self.rnd.randint(1, 600))
+                yield Comment(
+                    post_id=post_id,
+                    author_id=author_id,
+                    text=self.text(1, 2),
+                    created=created,
+                )
+
+    def create_stats(self, user_ids, posts_count, follows):
+        followers = dict.fromkeys(user_ids, 0)
+        for authors in follows.values():
+            for author_id in authors:
+                followers[author_id] += 1
+        bulk_insert(
+            UserStats,
+            (
+                UserStats(
+                    user_id=user_id,
+                    posts_count=posts_count[user_id],
+                    followers_count=followers[user_id],
+                    following_count=len(follows.get(user_id, ())),
+                )
+                for user_id in user_ids
+            ),
+            self.batch_size,
+        )
+
+    def build_timelines(self, follows):
+        """Ленты как после подписки: последние посты каждого автора.
+
+        Посты автора читаются один раз на всех его подписчиков.
+        """
+        recent = {}
+
+        def entries(user_id, author_id):
+            if author_id not in recent:
+                recent[author_id] = list(timeline.recent_posts(author_id))
+            for post_id, pub_date in recent[author_id]:
+                yield FeedEntry(
+                    user_id=user_id,
+                    post_id=post_id,
+                    author_id=author_id,
+                    pub_date=pub_date,
+                )
+
+        rows = (
+            entry
+            for user_id, authors in follows.items()
+            for author_id in authors
+            for entry in entries(user_id, author_id)
+        )
+        with transaction.atomic():
+            bulk_insert(FeedEntry, rows, self.batch_size)
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import suggestions
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рекомендации авторов по совместным подпискам: '
+        'по умолчанию только для читателей, чьи подписки изменились.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true', dest='everyone',
+            help='Пересчитать рекомендации всех читателей.',
+        )
+        parser.add_argument(
+            '--processes', type=int, default=1,
+            help='Число процессов для расчёта.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько читателей считать и записывать за раз.',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        saved = suggestions.refresh(
+            everyone=options['everyone'],
+            processes=options['processes'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Рекомендации пересчитаны для {saved} читателей '
+            f'за {time.monotonic() - started:.1f} с.'
+        ))
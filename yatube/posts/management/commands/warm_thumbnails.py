@@ -0,0 +1,90 @@
+import time
+from multiprocessing import Pool
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import thumbnails
+from posts.models import Post
+
+
+def warm(post):
+    pk, image_name = post
+    return Post(pk=pk, thumbnails=thumbnails.encode(
+        thumbnails.generate(image_name)
+    ))
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт миниатюры для уже загруженных картинок постов '
+        'в нескольких процессах и записывает их имена в посты.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=4,
+            help='Число рабочих процессов.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Сколько постов обрабатывать за один проход.',
+        )
+        parser.add_argument(
+            '--max-rate', type=float, default=0,
+            help='Не больше стольких постов в секунду (0 — без ограничения).',
+        )
+        parser.add_argument(
+            '--state-file', default='.warm_thumbnails',
+            help='Файл с id последнего обработанного поста для продолжения.',
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать с первого поста, игнорируя сохранённое состояние.',
+        )
+
+    def handle(self, *args, **options):
+        state_file = Path(options['state_file'])
+        last_id = 0
+        if state_file.exists() and not options['restart']:
+            last_id = int(state_file.read_text() or 0)
+        posts = Post.objects.exclude(image='').order_by('pk')
+        total = posts.filter(pk__gt=last_id).count()
+        done = 0
+        started = time.monotonic()
+        # Дочерние процессы не должны наследовать открытое соединение с БД.
+        connections.close_all()
+        with Pool(options['processes']) as pool:
+            while True:
+                batch = list(
+                    posts.filter(pk__gt=last_id)
+                    .values_list('pk', 'image')[:options['batch_size']]
+                )
+                if not batch:
+                    break
+                batch_started = time.monotonic()
+                Post.objects.bulk_update(
+                    pool.map(warm, batch), ['thumbnails']
+                )
+                done += len(batch)
+                last_id = batch[-1][0]
+                state_file.write_text(str(last_id))
+                self.throttle(len(batch), batch_started, options['max_rate'])
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f'{done}/{total} постов, '
+                    f'{done / elapsed:.1f} постов/с, последний id {last_id}'
+                )
+        if state_file.exists():
+            state_file.unlink()
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: {done} постов за {time.monotonic() - started:.1f} с.'
+        ))
+
+    def throttle(self, processed, started, max_rate):
+        if not max_rate:
+            return
+        pause = processed / max_rate - (time.monotonic() - started)
+        if pause > 0:
+            time.sleep(pause)
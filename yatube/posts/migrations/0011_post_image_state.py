@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_state',
+            field=models.CharField(choices=[('processing', 'Обрабатывается'), ('ready', 'Готова'), ('failed', 'Ошибка')], default='ready', editable=False, max_length=10, verbose_name='Обработка картинки'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:38
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0012_post_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Suggestions',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='suggestions', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Читатель')),
+                ('authors', models.TextField(blank=True, verbose_name='id авторов через запятую')),
+                ('stale', models.BooleanField(default=True, verbose_name='Нужно пересчитать')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Пересчитано')),
+            ],
+            options={
+                'verbose_name': 'Рекомендации авторов',
+                'verbose_name_plural': 'Рекомендации авторов',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='suggestions',
+            index=models.Index(fields=['stale'], name='suggestions_stale_idx'),
+        ),
+    ]
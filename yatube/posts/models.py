@@ -17,6 +17,16 @@ class Group(models.Model):
         return self.title
 
 
+IMAGE_PROCESSING = 'processing'
+IMAGE_READY = 'ready'
+IMAGE_FAILED = 'failed'
+IMAGE_STATE_CHOICES = (
+    (IMAGE_PROCESSING, 'Обрабатывается'),
+    (IMAGE_READY, 'Готова'),
+    (IMAGE_FAILED, 'Ошибка'),
+)
+
+
 class Post(models.Model):
     text = models.TextField(
         'Текст поста',
@@ -46,11 +56,43 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    comments_count = models.PositiveIntegerField(
+        'Комментариев',
+        default=0,
+        editable=False
+    )
+    image_state = models.CharField(
+        'Обработка картинки',
+        max_length=10,
+        choices=IMAGE_STATE_CHOICES,
+        default=IMAGE_READY,
+        editable=False
+    )
+    # JSON {миниатюра: имя файла}, записывает фоновая обработка.
+    thumbnails = models.TextField(
+        'Миниатюры',
+        blank=True,
+        default='',
+        editable=False
+    )
 
     class Meta:
         ordering = ['-pub_date']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'], name='post_feed_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_feed_idx',
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_feed_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -79,6 +121,13 @@ class Comment(models.Model):
         auto_now_add=True,
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', 'created', 'id'], name='comment_post_idx'
+            ),
+        ]
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -91,3 +140,104 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
         related_name='following',
     )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'], name='unique_follow'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'], name='follow_author_idx'
+            ),
+        ]
+
+
+class FeedEntry(models.Model):
+    """Пост в ленте подписок читателя (fan-out on write)."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed',
+        verbose_name='Читатель',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Пост',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор',
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        ordering = ['-pub_date']
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_feed_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='feed_user_idx',
+            ),
+            models.Index(
+                fields=['user', 'author'], name='feed_user_author_idx'
+            ),
+        ]
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, обновляются сигналами Post и Follow."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь',
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+
+class Suggestions(models.Model):
+    """Авторы, которых стоит предложить читателю, по убыванию оценки.
+
+    Заполняется командой suggest_authors; stale ставят сигналы Follow,
+    когда подписки читателя меняются.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='suggestions',
+        verbose_name='Читатель',
+    )
+    authors = models.TextField('id авторов через запятую', blank=True)
+    stale = models.BooleanField('Нужно пересчитать', default=True)
+    updated = models.DateTimeField('Пересчитано', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Рекомендации авторов'
+        verbose_name_plural = 'Рекомендации авторов'
+        indexes = [
+            models.Index(fields=['stale'], name='suggestions_stale_idx'),
+        ]
+
+    @property
+    def author_ids(self):
+        return [int(pk) for pk in self.authors.split(',') if pk]
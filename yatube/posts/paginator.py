@@ -0,0 +1,291 @@
+from math import ceil
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.encoding import force_bytes, force_str
+from django.utils.http import (urlencode, urlsafe_base64_decode,
+                               urlsafe_base64_encode)
+
+LAST_PAGE = 'last'
+
+
+def encode_cursor(pub_date, pk):
+    """Курсор позиции в ленте: пара (pub_date, id) в base64."""
+    value = f'{pub_date.isoformat()}|{pk}'
+    return urlsafe_base64_encode(force_bytes(value))
+
+
+def decode_cursor(cursor):
+    """Возвращает (pub_date, id) или None для битого курсора."""
+    try:
+        pub_date, pk = force_str(urlsafe_base64_decode(cursor)).split('|')
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (TypeError, ValueError):
+        return None
+    if pub_date is None:
+        return None
+    return pub_date, pk
+
+
+class CursorPaginator(Paginator):
+    """Пагинатор по ключу (pub_date, id) без COUNT(*) и OFFSET.
+
+    Следующая страница запрашивается по курсору последнего поста
+    (`?after=`), предыдущая — по курсору первого (`?before=`); номер
+    страницы (`?page=`) передаётся рядом с курсором только для
+    отображения. Соседние страницы окна открываются от тех же курсоров
+    с пропуском `?skip=` страниц, так что OFFSET не больше нескольких
+    страниц. Ссылки без курсора (`?page=N`) открываются через OFFSET не
+    дальше max_offset_pages, `?page=last` — чтением хвоста ленты в
+    обратном порядке.
+
+    Если передан count (сохранённый или приблизительный), страница
+    получает окно номеров page_window и ссылки window_links для
+    навигации. С estimated=True число страниц — оценка: последняя
+    страница тогда всегда полная.
+    """
+    ordering = ('-pub_date', '-id')
+    ELLIPSIS = '…'
+    on_each_side = 2
+    on_ends = 1
+    max_offset_pages = 10
+
+    def __init__(self, object_list, per_page, count=None, estimated=False,
+                 **kwargs):
+        super().__init__(
+            object_list.order_by(*self.ordering), per_page, **kwargs
+        )
+        self.total_pages = None
+        self.estimated = estimated
+        if count is not None:
+            self.count = count
+            self.total_pages = max(ceil(count / per_page), 1)
+
+    @property
+    def max_skip(self):
+        """Самый дальний пропуск от курсора для ссылок окна."""
+        return self.on_each_side + self.on_ends + 1
+
+    def get_page(self, number=None, after=None, before=None, skip=None):
+        if number == LAST_PAGE:
+            return self._last_page()
+        try:
+            number = self.validate_number(number)
+        except (TypeError, ValueError):
+            number = None
+        try:
+            skip = min(max(int(skip), 0), self.max_skip)
+        except (TypeError, ValueError):
+            skip = 0
+        if after is not None:
+            key = decode_cursor(after)
+            if key is not None:
+                return self._page_after(key, number or 2, skip)
+        if before is not None:
+            key = decode_cursor(before)
+            if key is not None:
+                return self._page_before(key, number or 2, skip)
+        return self._page_by_number(min(number or 1, self.max_offset_pages))
+
+    def validate_number(self, number):
+        # Номер страницы проверяется без подсчёта общего числа записей.
+        number = int(number)
+        if number < 1:
+            raise ValueError
+        return number
+
+    def get_elided_page_range(self, number=1, on_each_side=None,
+                              on_ends=None):
+        """Окно номеров: края и ±on_each_side вокруг текущей страницы."""
+        if self.total_pages is None:
+            return
+        if on_each_side is None:
+            on_each_side = self.on_each_side
+        if on_ends is None:
+            on_ends = self.on_ends
+        total = max(self.total_pages, number)
+        if total <= (on_each_side + on_ends) * 2:
+            yield from range(1, total + 1)
+            return
+        if number > 1 + on_each_side + on_ends + 1:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < total - on_each_side - on_ends - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(total - on_ends + 1, total + 1)
+        else:
+            yield from range(number + 1, total + 1)
+
+    def _correct_count(self, number, rows, has_next):
+        # Сохранённый счётчик мог отстать от данных: выборка страницы
+        # точно показывает, есть ли записи дальше.
+        seen = (number - 1) * self.per_page + rows
+        if not has_next:
+            self.count = seen
+        elif self.count <= seen:
+            self.count = seen + 1
+        self.total_pages = max(ceil(self.count / self.per_page), 1)
+
+    @property
+    def key_fields(self):
+        return [field.lstrip('-') for field in self.ordering]
+
+    def get_key(self, obj):
+        return tuple(getattr(obj, field) for field in self.key_fields)
+
+    def _page_by_number(self, number):
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            return self._page_by_number(1)
+        has_next = len(rows) > self.per_page
+        return self._make_page(rows[:self.per_page], number, has_next)
+
+    def _last_page(self):
+        if self.total_pages is None or self.total_pages == 1:
+            return self._page_by_number(1)
+        tail = self.count - (self.total_pages - 1) * self.per_page
+        if self.estimated:
+            # По оценке размер хвоста неизвестен: показываем последние
+            # per_page постов целиком.
+            tail = self.per_page
+        rows = list(self.object_list.reverse()[:tail or self.per_page])
+        if not rows:
+            return self._page_by_number(1)
+        return self._make_page(rows[::-1], self.total_pages, False)
+
+    def _page_after(self, key, number, skip=0):
+        date_field, id_field = self.key_fields
+        pub_date, pk = key
+        bottom = skip * self.per_page
+        rows = list(self.object_list.filter(
+            Q(**{f'{date_field}__lt': pub_date})
+            | Q(**{date_field: pub_date, f'{id_field}__lt': pk})
+        )[bottom:bottom + self.per_page + 1])
+        if not rows:
+            return self._page_by_number(1)
+        has_next = len(rows) > self.per_page
+        return self._make_page(rows[:self.per_page], number, has_next)
+
+    def _page_before(self, key, number, skip=0):
+        date_field, id_field = self.key_fields
+        pub_date, pk = key
+        bottom = skip * self.per_page
+        rows = list(self.object_list.filter(
+            Q(**{f'{date_field}__gt': pub_date})
+            | Q(**{date_field: pub_date, f'{id_field}__gt': pk})
+        ).reverse()[bottom:bottom + self.per_page + 1])
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        if not has_previous:
+            # Дошли до начала ленты — отдаём полную первую страницу.
+            return self._page_by_number(1)
+        return self._make_page(rows, max(number, 2), True)
+
+    def _make_page(self, object_list, number, has_next):
+        # Page считает has_next/has_previous через number и num_pages,
+        # поэтому num_pages выставляется по факту наличия следующей
+        # страницы, а не по COUNT(*).
+        self.num_pages = number + 1 if has_next else number
+        if self.total_pages is not None:
+            self._correct_count(number, len(object_list), has_next)
+        page = self._get_page(object_list, number, self)
+        page.next_cursor = (
+            encode_cursor(*self.get_key(object_list[-1]))
+            if has_next else None
+        )
+        page.previous_cursor = (
+            encode_cursor(*self.get_key(object_list[0]))
+            if number > 1 else None
+        )
+        page.page_window = list(self.get_elided_page_range(number))
+        page.window_links = [
+            (item, self.window_query(page, item))
+            for item in page.page_window
+        ]
+        return page
+
+    def window_query(self, page, number):
+        """Строка запроса для номера окна или None, если ссылки нет.
+
+        Страницы рядом с текущей открываются от её курсоров, первая —
+        без OFFSET, последняя — через `?page=last`.
+        """
+        if number == self.ELLIPSIS or number == page.number:
+            return None
+        if number == 1:
+            return urlencode({'page': 1})
+        if number == self.total_pages:
+            return urlencode({'page': LAST_PAGE})
+        if number > page.number and page.next_cursor:
+            return urlencode({
+                'page': number, 'after': page.next_cursor,
+                'skip': number - page.number - 1,
+            })
+        if number < page.number and page.previous_cursor:
+            return urlencode({
+                'page': number, 'before': page.previous_cursor,
+                'skip': page.number - number - 1,
+            })
+        return None
+
+
+class TimelinePaginator(CursorPaginator):
+    """Пагинатор ленты подписок по записям FeedEntry.
+
+    Страница строится по индексу (user, pub_date, post), а в шаблон
+    уходят сами посты.
+    """
+    ordering = ('-pub_date', '-post_id')
+
+    def _make_page(self, object_list, number, has_next):
+        page = super()._make_page(object_list, number, has_next)
+        page.object_list = [entry.post for entry in object_list]
+        return page
+
+
+def get_page_obj(request, post_list, paginator_class=CursorPaginator,
+                 count=None, estimated=False):
+    """Страница ленты постов для текущего запроса."""
+    paginator = paginator_class(
+        post_list, settings.LIMIT_POSTS, count=count, estimated=estimated
+    )
+    return paginator.get_page(
+        request.GET.get('page'),
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        skip=request.GET.get('skip'),
+    )
+
+
+def get_comments_page(comments, after=None, per_page=None):
+    """Пачка комментариев по возрастанию (created, id) после курсора.
+
+    Авторы приходят в том же запросе через JOIN. Возвращает список
+    комментариев и курсор следующей пачки (None, если пачка последняя).
+    """
+    per_page = per_page or settings.LIMIT_COMMENTS
+    comments = comments.order_by('created', 'id')
+    key = decode_cursor(after) if after else None
+    if key is not None:
+        created, pk = key
+        comments = comments.filter(
+            Q(created__gt=created) | Q(created=created, id__gt=pk)
+        )
+    rows = list(
+        comments.select_related('author')
+        .only('post_id', 'text', 'created', 'author__username')
+        [:per_page + 1]
+    )
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(rows[-1].created, rows[-1].pk)
+    return rows, next_cursor
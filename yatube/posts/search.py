@@ -0,0 +1,175 @@
+import re
+
+from django.db import connection, connections
+from django.db.models import BooleanField
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post
+
+FTS_TABLE = 'posts_post_fts'
+# Границы совпадений в выдаче highlight(): управляющие символы не
+# встречаются в тексте постов и переживают экранирование HTML.
+MATCH_START = '\x02'
+MATCH_END = '\x03'
+
+CREATE_TABLE = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"text, content='posts_post', content_rowid='id', "
+    f"tokenize='unicode61 remove_diacritics 2')"
+)
+# Индекс хранит только токены, сам текст читается из posts_post,
+# поэтому при удалении и правке в индекс передаётся старое значение.
+TRIGGERS = (
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai "
+    f"AFTER INSERT ON posts_post BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text); "
+    f"END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad "
+    f"AFTER DELETE ON posts_post BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) "
+    f"VALUES ('delete', old.id, old.text); "
+    f"END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au "
+    f"AFTER UPDATE OF text ON posts_post BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) "
+    f"VALUES ('delete', old.id, old.text); "
+    f"INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text); "
+    f"END",
+)
+DROP = (
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+)
+
+
+def install(using=connection):
+    """Создаёт индекс и триггеры, если их нет.
+
+    SQLite пересоздаёт таблицу при изменении её полей в миграциях и
+    теряет триггеры, поэтому установка повторяется после каждой
+    миграции.
+    """
+    if using.vendor != 'sqlite':
+        return
+    with using.cursor() as cursor:
+        cursor.execute(CREATE_TABLE)
+        for sql in TRIGGERS:
+            cursor.execute(sql)
+
+
+def install_after_migrate(using='default', **kwargs):
+    """Обработчик post_migrate: возвращает потерянные триггеры."""
+    using = connections[using]
+    if FTS_TABLE in using.introspection.table_names():
+        install(using)
+
+
+def uninstall(using=connection):
+    if using.vendor != 'sqlite':
+        return
+    with using.cursor() as cursor:
+        for sql in DROP:
+            cursor.execute(sql)
+
+
+def rebuild(using=connection):
+    """Заново строит индекс по posts_post и сжимает его."""
+    with using.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+        )
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')"
+        )
+
+
+def build_query(text):
+    """Запрос FTS5 из пользовательской строки или None.
+
+    Каждое слово берётся в кавычки, поэтому операторы и скобки из
+    ввода не ломают синтаксис MATCH; слова ищутся по префиксу, чтобы
+    «пост» находил и «посты».
+    """
+    words = re.findall(r'\w+', text)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def filter_posts(queryset, query):
+    """Оставляет в выборке постов только подходящие под запрос FTS5."""
+    # RawSQL внутри __in получает лишние скобки, и SQLite читает
+    # IN ((SELECT …)) как скалярный подзапрос с одной строкой, поэтому
+    # условие вычисляется как логическое поле.
+    matches = RawSQL(
+        f'"posts_post"."id" IN (SELECT rowid FROM {FTS_TABLE} '
+        f'WHERE {FTS_TABLE} MATCH %s)',
+        [query],
+        output_field=BooleanField(),
+    )
+    return queryset.annotate(search_match=matches).filter(search_match=True)
+
+
+def highlight(markup):
+    """Экранирует текст и превращает границы совпадений в <mark>."""
+    return mark_safe(
+        escape(markup)
+        .replace(MATCH_START, '<mark>')
+        .replace(MATCH_END, '</mark>')
+    )
+
+
+class SearchResults:
+    """Результаты поиска для Paginator: по релевантности, лениво.
+
+    count() и срезы выполняются запросами к индексу, а посты текущей
+    страницы загружаются одним запросом вместе с авторами и группами.
+    """
+
+    def __init__(self, text, queryset=None):
+        self.query = build_query(text)
+        if queryset is None:
+            queryset = Post.objects.select_related('author', 'group')
+        self.queryset = queryset
+
+    def count(self):
+        if self.query is None:
+            return 0
+        with connections[self.queryset.db].cursor() as cursor:
+            cursor.execute(
+                f'SELECT count(*) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s',
+                (self.query,),
+            )
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            raise TypeError('SearchResults supports only slicing.')
+        start = index.start or 0
+        if self.query is None or index.stop is None or index.stop <= start:
+            return []
+        with connections[self.queryset.db].cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid, highlight({FTS_TABLE}, 0, %s, %s) '
+                f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY rank LIMIT %s OFFSET %s',
+                (MATCH_START, MATCH_END, self.query,
+                 index.stop - start, start),
+            )
+            rows = cursor.fetchall()
+        posts = self.queryset.in_bulk([pk for pk, _ in rows])
+        results = []
+        for pk, markup in rows:
+            post = posts.get(pk)
+            if post is not None:
+                post.highlighted = highlight(markup)
+                results.append(post)
+        return results
@@ -0,0 +1,151 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core import page_cache, queue
+from . import counters, feed_cache, follows, suggestions, timeline
+from .models import (
+    IMAGE_PROCESSING, Comment, Follow, Group, Post, User, UserStats,
+)
+
+
+def invalidate(*scopes):
+    """Новые версии фрагментов и сброс страниц с теми же ключами.
+
+    Одного сброса страниц мало: заново собранная страница взяла бы
+    из кэша старые фрагменты.
+    """
+    feed_cache.bump(*scopes)
+    page_cache.purge(*scopes)
+
+
+# Поля пользователя, которые выводятся в лентах рядом с постами.
+USER_DISPLAY_FIELDS = ('username', 'first_name', 'last_name')
+
+
+def author_scopes(author_id):
+    """Ленты, в чьих фрагментах выводится имя автора."""
+    group_ids = Post.objects.filter(
+        author_id=author_id, group__isnull=False
+    ).values_list('group_id', flat=True).distinct()
+    return {
+        'index', f'author:{author_id}',
+        *(f'group:{group_id}' for group_id in group_ids),
+    }
+
+
+def group_scopes(group_id):
+    """Ленты, в чьих фрагментах выводятся название и slug группы."""
+    author_ids = Post.objects.filter(group_id=group_id).values_list(
+        'author_id', flat=True
+    ).distinct()
+    return {
+        'index', f'group:{group_id}',
+        *(f'author:{author_id}' for author_id in author_ids),
+    }
+
+
+@receiver(pre_save, sender=User)
+def remember_old_name(sender, instance, raw=False, update_fields=None,
+                      **kwargs):
+    instance._name_changed = False
+    if raw or not instance.pk:
+        return
+    if update_fields is not None and not (
+        set(update_fields) & set(USER_DISPLAY_FIELDS)
+    ):
+        # Например, last_login при каждом входе.
+        return
+    old = User.objects.filter(pk=instance.pk).values_list(
+        *USER_DISPLAY_FIELDS
+    ).first()
+    new = tuple(getattr(instance, name) for name in USER_DISPLAY_FIELDS)
+    instance._name_changed = old is not None and old != new
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=User)
+def user_renamed(sender, instance, **kwargs):
+    if getattr(instance, '_name_changed', False):
+        invalidate(*author_scopes(instance.pk))
+
+
+@receiver(pre_save, sender=Post)
+def remember_old_values(sender, instance, raw=False, update_fields=None,
+                        **kwargs):
+    instance._old_group_id = None
+    instance._image_changed = False
+    if raw or update_fields is not None:
+        return
+    old_image = ''
+    if instance.pk:
+        instance._old_group_id, old_image = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', 'image').first() or (None, '')
+    instance._image_changed = bool(instance.image) and (
+        instance.image.name != old_image
+    )
+    if instance._image_changed:
+        # Картинка будет обработана в фоне, пока вместо неё — заглушка.
+        instance.image_state = IMAGE_PROCESSING
+        instance.thumbnails = ''
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    invalidate(*feed_cache.post_scopes(instance, instance._old_group_id))
+    if created and not raw:
+        counters.change_user(instance.author_id, 'posts_count', 1)
+        timeline.fan_out(instance)
+    if instance._image_changed:
+        queue.enqueue('posts.process_image', post_id=instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    invalidate(*feed_cache.post_scopes(instance))
+    counters.change_user(instance.author_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, **kwargs):
+    # Страницы постов группы помечены в кэше страниц её ключом.
+    invalidate(*group_scopes(instance.pk))
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, raw=False, **kwargs):
+    invalidate(f'post:{instance.post_id}')
+    if created and not raw:
+        counters.change_post(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    invalidate(f'post:{instance.post_id}')
+    counters.change_post(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    invalidate(f'author:{instance.author_id}', f'author:{instance.user_id}')
+    if created and not raw:
+        follows.forget(instance.user_id)
+        suggestions.mark_stale(instance.user_id)
+        counters.change_user(instance.author_id, 'followers_count', 1)
+        counters.change_user(instance.user_id, 'following_count', 1)
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    invalidate(f'author:{instance.author_id}', f'author:{instance.user_id}')
+    follows.forget(instance.user_id)
+    suggestions.mark_stale(instance.user_id, create=False)
+    counters.change_user(instance.author_id, 'followers_count', -1)
+    counters.change_user(instance.user_id, 'following_count', -1)
+    timeline.remove(instance.user_id, instance.author_id)
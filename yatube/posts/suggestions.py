@@ -0,0 +1,267 @@
+"""Рекомендации «кого почитать» по совместным подпискам.
+
+Команда suggest_authors загружает таблицу Follow в граф из двух
+матриц смежности в формате CSR: подписки и подписчики каждого
+пользователя — отрезки общих массивов. Кандидаты для читателя — авторы,
+на которых подписаны другие подписчики его авторов, оценка — число
+таких совместных подписок. Читатели делятся между процессами, лучшие
+кандидаты каждого сохраняются одной строкой Suggestions, и страница
+читает их по первичному ключу. Прочитанная строка кэшируется до
+следующего пересчёта: он меняет версию 'suggestions' в feed_cache.
+
+Сигналы Follow помечают строку читателя устаревшей; без --all команда
+пересчитывает только такие строки.
+"""
+import heapq
+import multiprocessing
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from core import replicas
+from . import feed_cache, follows
+from .models import Follow, Suggestions, User
+from .timeline import chunked
+
+KEY = 'suggestions:{}:{}'
+
+# Граф для процессов пула: после fork он достаётся им без копирования.
+_graph = None
+
+
+def zeros(size):
+    return array('q', bytes(8 * size))
+
+
+class CSR:
+    """Разреженная матрица смежности: соседи вершины i —
+    indices[indptr[i]:indptr[i + 1]].
+
+    Массивы array('q') поддерживают буферный протокол, так что их можно
+    без копирования обернуть numpy.frombuffer.
+    """
+
+    def __init__(self, indptr, indices):
+        self.indptr = indptr
+        self.indices = indices
+
+    @classmethod
+    def from_edges(cls, rows, cols, size):
+        """Матрица из рёбер rows[k] → cols[k] сортировкой подсчётом."""
+        indptr = zeros(size + 1)
+        for row in rows:
+            indptr[row + 1] += 1
+        for node in range(size):
+            indptr[node + 1] += indptr[node]
+        indices = zeros(len(rows))
+        position = array('q', indptr)
+        for row, col in zip(rows, cols):
+            indices[position[row]] = col
+            position[row] += 1
+        return cls(indptr, indices)
+
+    def neighbours(self, node):
+        return memoryview(self.indices)[
+            self.indptr[node]:self.indptr[node + 1]
+        ]
+
+
+class FollowGraph:
+    """Подписки и подписчики всех пользователей в двух матрицах CSR.
+
+    Вершины — номера пользователей в отсортированном массиве ids.
+    """
+
+    def __init__(self, edges):
+        users, authors = array('q'), array('q')
+        for user_id, author_id in edges:
+            users.append(user_id)
+            authors.append(author_id)
+        self.ids = array('q', sorted(set(users) | set(authors)))
+        rows = array('q', map(self.node, users))
+        cols = array('q', map(self.node, authors))
+        self.following = CSR.from_edges(rows, cols, len(self.ids))
+        self.followers = CSR.from_edges(cols, rows, len(self.ids))
+
+    @classmethod
+    def load(cls):
+        return cls(
+            Follow.objects.values_list('user_id', 'author_id').iterator()
+        )
+
+    def node(self, pk):
+        """Номер вершины пользователя или None, если его нет в графе."""
+        node = bisect_left(self.ids, pk)
+        if node < len(self.ids) and self.ids[node] == pk:
+            return node
+        return None
+
+    def followers_of_followed(self, node):
+        """Номера пользователей, подписанных на тех же авторов."""
+        limit = settings.SUGGESTIONS_FOLLOWERS_LIMIT
+        for author in self.following.neighbours(node):
+            # У популярного автора берётся только часть подписчиков.
+            yield from self.followers.neighbours(author)[:limit]
+
+    def candidates(self, user_id, limit):
+        """id лучших limit авторов для читателя по совместным подпискам.
+
+        При равной оценке первыми идут авторы с меньшим id.
+        """
+        node = self.node(user_id)
+        if node is None:
+            return []
+        scores = Counter()
+        for other in self.followers_of_followed(node):
+            if other != node:
+                scores.update(self.following.neighbours(other))
+        for author in (node, *self.following.neighbours(node)):
+            scores.pop(author, None)
+        best = heapq.nlargest(
+            limit, scores.items(), key=lambda item: (item[1], -item[0])
+        )
+        return [self.ids[author] for author, _ in best]
+
+
+def compute_chunk(user_ids):
+    limit = settings.SUGGESTIONS_STORED
+    return [(pk, _graph.candidates(pk, limit)) for pk in user_ids]
+
+
+def compute(graph, user_ids, processes=1, chunk_size=500):
+    """(user_id, [id авторов]) для всех user_ids, в processes процессах."""
+    global _graph
+    chunks = list(chunked(list(user_ids), chunk_size))
+    _graph = graph
+    try:
+        if processes == 1:
+            for chunk in chunks:
+                yield from compute_chunk(chunk)
+            return
+        context = multiprocessing.get_context('fork')
+        with context.Pool(processes) as pool:
+            for results in pool.imap_unordered(compute_chunk, chunks):
+                yield from results
+    finally:
+        _graph = None
+
+
+def save(results, batch_size=500):
+    """Записывает рекомендации пачками, не трогая флаг stale."""
+    results, saved = iter(results), 0
+    while True:
+        batch = list(islice(results, batch_size))
+        if not batch:
+            return saved
+        now = timezone.now()
+        rows = [
+            Suggestions(
+                user_id=user_id, authors=','.join(map(str, author_ids)),
+                stale=False, updated=now,
+            )
+            for user_id, author_ids in batch
+        ]
+        with transaction.atomic():
+            existing = set(Suggestions.objects.filter(
+                user_id__in=[row.user_id for row in rows]
+            ).values_list('user_id', flat=True))
+            Suggestions.objects.bulk_create(
+                [row for row in rows if row.user_id not in existing],
+                ignore_conflicts=True,
+            )
+            Suggestions.objects.bulk_update(
+                [row for row in rows if row.user_id in existing],
+                ['authors', 'updated'],
+            )
+        saved += len(rows)
+
+
+def claim(everyone=False, batch_size=500):
+    """id читателей для пересчёта; снимает с их строк флаг stale.
+
+    Флаг снимается до расчёта: подписка, сделанная во время расчёта,
+    снова пометит строку, и её пересчитает следующий запуск.
+    """
+    if everyone:
+        Suggestions.objects.update(stale=False)
+        return set(Suggestions.objects.values_list('user_id', flat=True))
+    user_ids = list(
+        Suggestions.objects.filter(stale=True)
+        .values_list('user_id', flat=True)
+    )
+    for batch in chunked(user_ids, batch_size):
+        Suggestions.objects.filter(user_id__in=batch).update(stale=False)
+    return set(user_ids)
+
+
+def refresh(everyone=False, processes=1, batch_size=500):
+    """Пересчитывает устаревшие рекомендации (все — с everyone=True)."""
+    user_ids = claim(everyone, batch_size)
+    if not everyone and not user_ids:
+        return 0
+    graph = FollowGraph.load()
+    if everyone:
+        user_ids.update(
+            graph.ids[node] for node in range(len(graph.ids))
+            if graph.following.neighbours(node)
+        )
+    saved = save(
+        compute(graph, sorted(user_ids), processes, batch_size), batch_size
+    )
+    feed_cache.bump('suggestions')
+    return saved
+
+
+def mark_stale(user_id, create=True):
+    """Помечает рекомендации читателя устаревшими.
+
+    Строку, которой ещё нет, создаёт только create=True: при удалении
+    пользователя подписки удаляются каскадом, и новая строка ссылалась
+    бы на удаляемого пользователя.
+    """
+    updated = Suggestions.objects.filter(user_id=user_id).update(stale=True)
+    if not updated and create:
+        Suggestions.objects.bulk_create(
+            [Suggestions(user_id=user_id)], ignore_conflicts=True
+        )
+
+
+def stored_ids(user_id):
+    """id рекомендованных авторов из строки читателя, через кэш.
+
+    Флаг stale содержимое строки не меняет, поэтому ключ зависит только
+    от версии, которую меняет refresh().
+    """
+    key = KEY.format(feed_cache.get_version('suggestions'), user_id)
+    ids = cache.get(key)
+    if ids is None:
+        row = Suggestions.objects.filter(user_id=user_id).first()
+        ids = row.author_ids if row is not None else []
+        cache.set(
+            key, ids, replicas.cache_timeout(settings.SUGGESTIONS_TIMEOUT)
+        )
+    return ids
+
+
+def for_user(user):
+    """Пользователи-рекомендации для страницы: одна строка по ключу.
+
+    Авторы, на которых читатель подписался после расчёта, пропускаются;
+    показывается не больше SUGGESTIONS_SHOWN.
+    """
+    if not user.is_authenticated:
+        return []
+    ids = stored_ids(user.pk)
+    if not ids:
+        return []
+    skip = follows.following_ids(user.pk) | {user.pk}
+    ids = [pk for pk in ids if pk not in skip]
+    ids = ids[:settings.SUGGESTIONS_SHOWN]
+    users = User.objects.select_related('stats').in_bulk(ids)
+    return [users[pk] for pk in ids if pk in users]
@@ -0,0 +1,75 @@
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+from sorl.thumbnail import delete
+
+from core.queue import task
+from . import feed_cache, thumbnails
+from .models import IMAGE_FAILED, IMAGE_READY, Post
+from .signals import invalidate
+
+EXIF_ORIENTATION = 0x0112
+
+
+def normalize(image_file):
+    """Поворачивает картинку по EXIF и уменьшает слишком большие.
+
+    Картинка декодируется целиком, так что битый файл приводит к ошибке
+    задачи. Возвращает новое содержимое файла или None, если менять
+    нечего.
+    """
+    with image_file.open('rb'):
+        image = Image.open(image_file)
+        image.load()
+        animated = getattr(image, 'n_frames', 1) > 1
+    if animated:
+        return None
+    rotated = image.getexif().get(EXIF_ORIENTATION, 1) != 1
+    max_width, max_height = settings.POST_IMAGE_MAX_SIZE
+    too_big = image.width > max_width or image.height > max_height
+    if not rotated and not too_big:
+        return None
+    normalized = ImageOps.exif_transpose(image)
+    normalized.thumbnail(settings.POST_IMAGE_MAX_SIZE)
+    content = BytesIO()
+    normalized.save(content, format=image.format)
+    return content.getvalue()
+
+
+def mark_failed(post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None:
+        post.image_state = IMAGE_FAILED
+        post.save(update_fields=['image_state'])
+
+
+@task('posts.process_image', on_failure=mark_failed)
+def process_image(post_id):
+    """Проверяет, нормализует картинку поста и готовит миниатюры."""
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None or not post.image:
+        return
+    old_name = post.image.name
+    content = normalize(post.image)
+    if content is not None:
+        # Старый файл удаляется, только когда пост уже ссылается на новый.
+        post.image.name = post.image.storage.save(
+            old_name, ContentFile(content)
+        )
+    names = thumbnails.generate(post.image)
+    # Пока задача работала, автор мог загрузить другую картинку: её
+    # обработает своя задача, а этот результат уже не нужен.
+    updated = Post.objects.filter(pk=post.pk, image=old_name).update(
+        image=post.image.name,
+        image_state=IMAGE_READY,
+        thumbnails=thumbnails.encode(names),
+    )
+    if not updated:
+        if post.image.name != old_name:
+            delete(post.image)
+        return
+    invalidate(*feed_cache.post_scopes(post))
+    if post.image.name != old_name:
+        post.image.storage.delete(old_name)
@@ -0,0 +1,10 @@
+from django import template
+
+from posts.thumbnails import POST_THUMBNAILS
+
+register = template.Library()
+
+
+@register.simple_tag
+def thumbnail_spec(name):
+    return POST_THUMBNAILS[name]
@@ -0,0 +1,173 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from sorl.thumbnail import get_thumbnail
+
+from core.models import Task
+from posts import thumbnails
+from posts.models import Follow, Group, IMAGE_READY, Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, LIMIT_POSTS=3)
+class FeedApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(username='Writer')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x02\x00'
+            b'\x01\x00\x80\x00\x00\x00\x00\x00'
+            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+            b'\x0A\x00\x3B'
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author,
+                group=cls.group if number % 2 else None,
+                text=f'Пост {number}',
+            )
+            for number in range(5)
+        ]
+        cls.image_post = Post.objects.create(
+            author=cls.author,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                name='small.gif', content=small_gif, content_type='image/gif'
+            ),
+        )
+        Post.objects.filter(pk=cls.image_post.pk).update(
+            image_state=IMAGE_READY,
+            thumbnails=thumbnails.encode(
+                thumbnails.generate(cls.image_post.image)
+            ),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def collect(self, client, url):
+        """id всех постов ленты, пройденной по ссылкам next."""
+        ids = []
+        url = f'{url}?fields=id'
+        while url:
+            data = client.get(url).json()
+            ids.extend(item['id'] for item in data['results'])
+            url = data['next']
+        return ids
+
+    def test_feeds_are_walked_by_cursor(self):
+        expected = [post.pk for post in [self.image_post, *self.posts[::-1]]]
+        feeds = {
+            'api_index': (Client(), reverse('posts:api_index'), expected),
+            'api_group': (
+                Client(),
+                reverse('posts:api_group', args=[self.group.slug]),
+                [pk for pk in expected if pk in (
+                    self.posts[1].pk, self.posts[3].pk
+                )],
+            ),
+            'api_profile': (
+                Client(),
+                reverse('posts:api_profile', args=[self.author.username]),
+                expected,
+            ),
+            'api_follow': (
+                self.authorized_client, reverse('posts:api_follow'), expected
+            ),
+        }
+        for name, (client, url, ids) in feeds.items():
+            with self.subTest(feed=name):
+                self.assertEqual(self.collect(client, url), ids)
+
+    def test_sparse_fieldset(self):
+        response = Client().get(
+            reverse('posts:api_index'), {'fields': 'text,author', 'limit': 1}
+        )
+        self.assertEqual(response.json()['results'], [
+            {'text': self.image_post.text, 'author': self.author.username},
+        ])
+
+    def test_page_is_one_query(self):
+        url = reverse('posts:api_index')
+        with self.assertNumQueries(1):
+            Client().get(url, {'fields': 'id,text,author,group,image'})
+
+    def image_urls(self):
+        response = Client().get(
+            reverse('posts:api_index'), {'fields': 'id,image'}
+        )
+        return {
+            item['id']: item['image'] for item in response.json()['results']
+        }
+
+    def test_thumbnail_urls_match_sorl(self):
+        spec = thumbnails.POST_THUMBNAILS['card']
+        thumbnail = get_thumbnail(
+            self.image_post.image, spec['geometry'], **spec['options']
+        )
+        images = self.image_urls()
+        self.assertEqual(images[self.image_post.pk], thumbnail.url)
+        self.assertIsNone(images[self.posts[-1].pk])
+
+    @override_settings(PAGE_CACHE_TIMEOUT=0)
+    def test_unprocessed_images_are_queued_once(self):
+        # Посты из seed_posts и import_posts не проходили обработку.
+        Post.objects.filter(pk=self.image_post.pk).update(thumbnails='')
+        Task.objects.all().delete()
+        for _ in range(2):
+            self.assertIsNone(self.image_urls()[self.image_post.pk])
+        self.assertEqual(
+            list(Task.objects.values_list('name', 'payload')),
+            [('posts.process_image', f'{{"post_id": {self.image_post.pk}}}')],
+        )
+        call_command('run_workers', once=True, stdout=StringIO())
+        spec = thumbnails.POST_THUMBNAILS['card']
+        thumbnail = get_thumbnail(
+            self.image_post.image, spec['geometry'], **spec['options']
+        )
+        self.assertEqual(self.image_urls()[self.image_post.pk], thumbnail.url)
+
+    def test_bad_requests(self):
+        url = reverse('posts:api_index')
+        for params in (
+            {'fields': 'id,password'},
+            {'limit': 0},
+            {'limit': 'много'},
+            {'after': 'не курсор'},
+        ):
+            with self.subTest(params=params):
+                self.assertEqual(Client().get(url, params).status_code, 400)
+        self.assertEqual(
+            Client().get(reverse('posts:api_follow')).status_code, 401
+        )
+        self.assertEqual(
+            Client().get(
+                reverse('posts:api_group', args=['no_group'])
+            ).status_code,
+            404,
+        )
@@ -0,0 +1,84 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Comment, Post, User
+
+
+@override_settings(LIMIT_COMMENTS=4, PAGE_CACHE_TIMEOUT=0)
+class CommentsPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Writer')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        readers = [
+            User.objects.create_user(username=f'Reader{number}')
+            for number in range(3)
+        ]
+        start = timezone.now() - timedelta(days=1)
+        # Пары комментариев с одинаковым временем проверяют, что курсор
+        # различает их по id.
+        Comment.objects.bulk_create(
+            Comment(
+                post=cls.post,
+                author=readers[number % 3],
+                text=f'Комментарий {number}',
+            )
+            for number in range(10)
+        )
+        for number, comment in enumerate(cls.post.comments.order_by('pk')):
+            Comment.objects.filter(pk=comment.pk).update(
+                created=start + timedelta(minutes=number // 2)
+            )
+        cls.comments = list(cls.post.comments.order_by('created', 'id'))
+        cls.url = reverse('posts:comments', kwargs={'post_id': cls.post.pk})
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_detail_page_shows_first_batch(self):
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        self.assertEqual(response.context['comments'], self.comments[:4])
+        self.assertTrue(
+            response.context['comments_next'].startswith(self.url)
+        )
+        self.assertContains(response, 'Показать ещё комментарии')
+
+    def test_json_batches_follow_cursor(self):
+        url, ids = f'{self.url}?format=json', []
+        while url:
+            data = self.client.get(url).json()
+            self.assertLessEqual(len(data['results']), 4)
+            ids.extend(comment['id'] for comment in data['results'])
+            url = data['next']
+        self.assertEqual(ids, [comment.pk for comment in self.comments])
+        last = data['results'][-1]
+        self.assertEqual(
+            (last['author'], last['text']),
+            (self.comments[-1].author.username, self.comments[-1].text),
+        )
+        self.assertIn('created', last)
+
+    def test_html_fragment_loads_authors_in_one_query(self):
+        first = self.client.get(self.url)
+        with self.assertNumQueries(2):
+            response = self.client.get(first.context['comments_next'])
+        self.assertEqual(response.context['comments'], self.comments[4:8])
+        self.assertContains(response, self.comments[4].author.username)
+        self.assertNotContains(response, '<html')
+        last = self.client.get(response.context['comments_next'])
+        self.assertEqual(last.context['comments'], self.comments[8:])
+        self.assertNotContains(last, 'Показать ещё комментарии')
+
+    def test_unknown_post_is_404(self):
+        response = self.client.get(
+            reverse('posts:comments', kwargs={'post_id': 10 ** 6})
+        )
+        self.assertEqual(response.status_code, 404)
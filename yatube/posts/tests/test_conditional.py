@@ -0,0 +1,126 @@
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import feed_cache
+from posts.models import Comment, Follow, Group, Post, User
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=0)
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(username='Writer')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Тестовый пост'
+        )
+        cls.urls = {
+            'post_detail': reverse(
+                'posts:post_detail', kwargs={'post_id': cls.post.pk}
+            ),
+            'profile': reverse(
+                'posts:profile', kwargs={'username': cls.author.username}
+            ),
+            'group_list': reverse(
+                'posts:group_list', kwargs={'slug': cls.group.slug}
+            ),
+        }
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_unchanged_page_is_not_rendered(self):
+        # Одна выборка валидаторов; вошедшему ещё сессия и пользователь.
+        clients = {'guest': (Client(), 1), 'user': (self.authorized_client, 3)}
+        for name, url in self.urls.items():
+            for viewer, (client, queries) in clients.items():
+                with self.subTest(url=name, viewer=viewer):
+                    response = client.get(url)
+                    with self.assertNumQueries(queries):
+                        not_modified = client.get(
+                            url, HTTP_IF_NONE_MATCH=response['ETag']
+                        )
+                    self.assertEqual(not_modified.status_code, 304)
+                    self.assertEqual(not_modified.templates, [])
+
+    def test_changes_invalidate_validators(self):
+        changes = {
+            'post_detail': lambda: Comment.objects.create(
+                post=self.post, author=self.user, text='Комментарий'
+            ),
+            'profile': lambda: Follow.objects.create(
+                user=self.user, author=self.author
+            ),
+            'group_list': lambda: Post.objects.filter(
+                pk=self.post.pk
+            ).first().save(),
+        }
+        for name, change in changes.items():
+            with self.subTest(url=name):
+                url = self.urls[name]
+                etag = self.authorized_client.get(url)['ETag']
+                change()
+                response = self.authorized_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_group_changes_invalidate_post_etag(self):
+        def rename():
+            group = Group.objects.get(pk=self.group.pk)
+            group.slug = 'renamed'
+            group.save()
+
+        changes = {
+            'rename': rename,
+            'group version': lambda: feed_cache.bump(
+                f'group:{self.group.pk}'
+            ),
+        }
+        url = self.urls['post_detail']
+        for name, change in changes.items():
+            with self.subTest(change=name):
+                etag = self.authorized_client.get(url)['ETag']
+                change()
+                response = self.authorized_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_if_modified_since_alone_does_not_give_304(self):
+        for name, url in self.urls.items():
+            with self.subTest(url=name):
+                response = self.authorized_client.get(url)
+                self.assertFalse(response.has_header('Last-Modified'))
+                response = self.authorized_client.get(
+                    url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT'
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_guest_and_user_pages_have_different_etags(self):
+        for name, url in self.urls.items():
+            with self.subTest(url=name):
+                guest = Client().get(url)
+                user = self.authorized_client.get(url)
+                self.assertNotEqual(guest['ETag'], user['ETag'])
+                self.assertEqual(
+                    Client().get(
+                        url, HTTP_IF_NONE_MATCH=user['ETag']
+                    ).status_code,
+                    200,
+                )
+                self.assertIn('Cookie', user['Vary'])
+                self.assertIn('private', user['Cache-Control'])
+
+    def test_missing_objects_still_return_404(self):
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': 10 ** 6})
+        )
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,48 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.models import Comment, Follow, Post, User, UserStats
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(username='Writer')
+
+    def get_stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_counters_follow_creates_and_deletes(self):
+        post = Post.objects.create(author=self.author, text='Пост')
+        comment = Comment.objects.create(
+            post=post, author=self.user, text='Комментарий'
+        )
+        follow = Follow.objects.create(user=self.user, author=self.author)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(self.get_stats(self.author).posts_count, 1)
+        self.assertEqual(self.get_stats(self.author).followers_count, 1)
+        self.assertEqual(self.get_stats(self.user).following_count, 1)
+
+        comment.delete()
+        follow.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        self.assertEqual(self.get_stats(self.author).followers_count, 0)
+        self.assertEqual(self.get_stats(self.user).following_count, 0)
+        post.delete()
+        self.assertEqual(self.get_stats(self.author).posts_count, 0)
+
+    def test_reconcile_fixes_drift(self):
+        Post.objects.bulk_create([
+            Post(author=self.author, text='Пост без сигналов')
+            for _ in range(3)
+        ])
+        UserStats.objects.filter(user=self.user).delete()
+        call_command('reconcile_counters', chunk_size=1, stdout=StringIO())
+        self.assertEqual(self.get_stats(self.author).posts_count, 3)
+        self.assertTrue(UserStats.objects.filter(user=self.user).exists())
@@ -0,0 +1,136 @@
+import csv
+import json
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Comment, Group, Post, User
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Writer')
+        cls.other = User.objects.create_user(username='Other')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author if number % 2 else cls.other,
+                group=cls.group if number < 3 else None,
+                text=f'Пост "{number}",\nв две строки',
+            )
+            for number in range(5)
+        ]
+        cls.old_post = cls.posts[0]
+        Post.objects.filter(pk=cls.old_post.pk).update(
+            pub_date=timezone.now() - timedelta(days=30)
+        )
+        cls.comment = Comment.objects.create(
+            post=cls.posts[1], author=cls.other, text='Комментарий'
+        )
+
+    def export(self, *args, **options):
+        out = StringIO()
+        call_command('export_posts', *args, stdout=out, **options)
+        return out.getvalue()
+
+    def ndjson(self, *args, **options):
+        return [
+            json.loads(line)
+            for line in self.export(*args, **options).splitlines()
+        ]
+
+    def test_ndjson_rows_are_flat(self):
+        rows = self.ndjson('posts', chunk_size=2)
+        self.assertEqual(
+            [row['id'] for row in rows], [post.pk for post in self.posts]
+        )
+        self.assertEqual(rows[1], {
+            'id': self.posts[1].pk,
+            'pub_date': self.posts[1].pub_date.isoformat(),
+            'author': self.author.username,
+            'group': self.group.slug,
+            'text': self.posts[1].text,
+            'image': '',
+            'comments_count': 1,
+        })
+        self.assertEqual(self.ndjson('comments'), [{
+            'id': self.comment.pk,
+            'post_id': self.posts[1].pk,
+            'created': self.comment.created.isoformat(),
+            'author': self.other.username,
+            'text': self.comment.text,
+        }])
+
+    def test_filters(self):
+        since = (timezone.now() - timedelta(days=1)).date().isoformat()
+        cases = {
+            'group': ({'group': self.group.slug}, self.posts[:3]),
+            'author': ({'author': self.author.username}, self.posts[1::2]),
+            'since': ({'since': since}, self.posts[1:]),
+            'until': ({'until': since}, self.posts[:1]),
+            'все сразу': (
+                {'since': since, 'group': self.group.slug, 'author': 'Other'},
+                self.posts[2:3],
+            ),
+        }
+        for name, (options, posts) in cases.items():
+            with self.subTest(filter=name):
+                self.assertEqual(
+                    [row['id'] for row in self.ndjson('posts', **options)],
+                    [post.pk for post in posts],
+                )
+        self.assertEqual(
+            len(self.ndjson('comments', group=self.group.slug)), 1
+        )
+
+    def test_csv_keeps_multiline_text(self):
+        rows = list(csv.reader(StringIO(
+            self.export('posts', format='csv', author=self.author.username)
+        )))
+        self.assertEqual(rows[0][:3], ['id', 'pub_date', 'author'])
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[1][4], self.posts[1].text)
+
+    def test_admin_action_streams_selection(self):
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        client = Client()
+        client.force_login(admin)
+        response = client.post(reverse('admin:posts_post_changelist'), {
+            'action': 'export_csv',
+            '_selected_action': [self.posts[1].pk, self.posts[2].pk],
+        })
+        self.assertTrue(response.streaming)
+        self.assertEqual(
+            response['Content-Disposition'],
+            'attachment; filename="posts.csv"',
+        )
+        rows = list(csv.reader(StringIO(
+            b''.join(response.streaming_content).decode()
+        )))
+        self.assertEqual(
+            [row[0] for row in rows[1:]],
+            [str(self.posts[1].pk), str(self.posts[2].pk)],
+        )
+
+    def test_admin_action_needs_staff(self):
+        user = User.objects.create_user(username='NotStaff')
+        client = Client()
+        client.force_login(user)
+        response = client.post(reverse('admin:posts_comment_changelist'), {
+            'action': 'export_ndjson',
+            '_selected_action': [self.comment.pk],
+        })
+        self.assertFalse(response.streaming)
+        self.assertEqual(response.status_code, 302)
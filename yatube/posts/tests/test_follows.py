@@ -0,0 +1,67 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import follows
+from posts.models import Follow, Post, User, UserStats
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=0)
+class FollowsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(username='Writer')
+        cls.other = User.objects.create_user(username='Other')
+        Post.objects.create(author=cls.author, text='Пост автора')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_following_ids_are_cached(self):
+        Follow.objects.create(user=self.reader, author=self.other)
+        with self.assertNumQueries(1):
+            ids = follows.following_ids(self.reader.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(follows.following_ids(self.reader.pk), ids)
+        self.assertEqual(ids, {self.other.pk})
+
+    def test_follow_is_idempotent(self):
+        self.assertTrue(follows.follow(self.reader.pk, self.author.pk))
+        self.assertFalse(follows.follow(self.reader.pk, self.author.pk))
+        self.assertEqual(
+            Follow.objects.filter(user=self.reader, author=self.author)
+            .count(), 1,
+        )
+        stats = UserStats.objects.get(user=self.author)
+        self.assertEqual(stats.followers_count, 1)
+        self.assertTrue(self.reader.feed.exists())
+
+    def test_set_follows_follow_and_unfollow(self):
+        follow_url = reverse('posts:profile_follow', args=[self.author])
+        profile_url = reverse('posts:profile', args=[self.author])
+        self.assertFalse(self.client.get(profile_url).context['following'])
+        for _ in range(2):
+            self.client.get(follow_url)
+        self.assertIn(self.author.pk, follows.following_ids(self.reader.pk))
+        self.assertTrue(self.client.get(profile_url).context['following'])
+        self.client.get(
+            reverse('posts:profile_unfollow', args=[self.author])
+        )
+        self.assertEqual(follows.following_ids(self.reader.pk), set())
+        self.assertFalse(self.client.get(profile_url).context['following'])
+
+    def test_repeated_clicks_do_not_open_transaction(self):
+        follows.follow(self.reader.pk, self.author.pk)
+        # Сессия, пользователь, автор и проверка подписки.
+        with self.assertNumQueries(4):
+            self.client.get(
+                reverse('posts:profile_follow', args=[self.author])
+            )
+        with self.assertNumQueries(4):
+            self.client.get(
+                reverse('posts:profile_unfollow', args=[self.other])
+            )
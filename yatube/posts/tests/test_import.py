@@ -0,0 +1,208 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.models import Task
+from posts.models import (
+    IMAGE_PROCESSING, FeedEntry, Follow, Group, Post, User,
+)
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+PUB_DATE = datetime(2015, 3, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImportPostsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Writer')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.images_dir = os.path.join(TEMP_MEDIA_ROOT, 'source')
+        os.makedirs(cls.images_dir)
+        with open(os.path.join(cls.images_dir, 'small.gif'), 'wb') as gif:
+            gif.write(
+                b'\x47\x49\x46\x38\x39\x61\x02\x00'
+                b'\x01\x00\x80\x00\x00\x00\x00\x00'
+                b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+                b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+                b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+                b'\x0A\x00\x3B'
+            )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.state_file = os.path.join(TEMP_MEDIA_ROOT, 'state')
+        self.source = os.path.join(TEMP_MEDIA_ROOT, 'posts.ndjson')
+
+    def write_source(self, rows):
+        with open(self.source, 'w', encoding='utf-8') as source:
+            for row in rows:
+                source.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+    def run_import(self, **options):
+        out = StringIO()
+        call_command(
+            'import_posts', self.source, state_file=self.state_file,
+            batch_size=2, stdout=out, **options
+        )
+        return out.getvalue()
+
+    def stored_images(self):
+        directory = os.path.join(TEMP_MEDIA_ROOT, 'posts')
+        if not os.path.isdir(directory):
+            return []
+        return sorted(os.listdir(directory))
+
+    def test_posts_keep_source_dates_and_comments(self):
+        self.write_source([
+            {
+                'pub_date': PUB_DATE.isoformat(),
+                'author': self.author.username,
+                'group': self.group.slug,
+                'text': 'Старый пост',
+                'image': 'small.gif',
+                'comments': [
+                    {'author': 'Newcomer', 'text': 'Первый',
+                     'created': '2015-03-02T10:00:00+00:00'},
+                    {'author': self.reader.username, 'text': 'Второй'},
+                ],
+            },
+            {'author': 'Newcomer', 'group': 'new_group', 'text': 'Пост 2'},
+            {'author': self.author.username, 'text': 'Пост 3'},
+        ])
+        output = self.run_import(
+            create_missing=True, images_dir=self.images_dir
+        )
+        self.assertIn('постов/с', output)
+        post = Post.objects.get(text='Старый пост')
+        self.assertEqual(post.pub_date, PUB_DATE)
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(post.comments_count, 2)
+        self.assertEqual(post.image_state, IMAGE_PROCESSING)
+        self.assertTrue(post.image.storage.exists(post.image.name))
+        self.assertTrue(Task.objects.filter(
+            name='posts.process_image', payload=f'{{"post_id": {post.pk}}}'
+        ).exists())
+        self.assertEqual(
+            list(post.comments.order_by('created').values_list(
+                'author__username', flat=True
+            )),
+            ['Newcomer', self.reader.username],
+        )
+        newcomer = User.objects.get(username='Newcomer')
+        self.assertFalse(newcomer.has_usable_password())
+        self.assertEqual(newcomer.stats.posts_count, 1)
+        self.assertTrue(Group.objects.filter(slug='new_group').exists())
+        self.author.stats.refresh_from_db()
+        self.assertEqual(self.author.stats.posts_count, 2)
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.reader).count(), 2
+        )
+        self.assertFalse(os.path.exists(self.state_file))
+
+    def test_unknown_authors_are_skipped(self):
+        self.write_source([
+            {'author': 'Stranger', 'text': 'Чужой пост'},
+            {'author': self.author.username, 'group': 'nope', 'text': 'Нет'},
+            {'author': self.author.username, 'text': 'Свой пост'},
+        ])
+        output = self.run_import()
+        self.assertIn('пропущено: 2', output)
+        self.assertEqual(
+            list(Post.objects.values_list('text', flat=True)), ['Свой пост']
+        )
+        self.assertFalse(User.objects.filter(username='Stranger').exists())
+
+    def test_resumes_after_saved_line(self):
+        self.write_source([
+            {'author': self.author.username, 'text': f'Пост {number}'}
+            for number in range(5)
+        ])
+        with open(self.state_file, 'w') as state:
+            state.write('3')
+        output = self.run_import()
+        self.assertIn('Продолжение со строки 4', output)
+        self.assertEqual(
+            sorted(Post.objects.values_list('text', flat=True)),
+            ['Пост 3', 'Пост 4'],
+        )
+
+    def test_repeated_import_creates_no_duplicates(self):
+        self.write_source([
+            {'pub_date': PUB_DATE.isoformat(), 'author': self.author.username,
+             'text': 'С картинкой', 'image': 'small.gif',
+             'comments': [{'author': self.reader.username, 'text': 'Да'}]},
+            {'pub_date': PUB_DATE.isoformat(), 'author': self.author.username,
+             'text': 'Без картинки'},
+        ])
+        self.run_import(images_dir=self.images_dir)
+        files = self.stored_images()
+        output = self.run_import(images_dir=self.images_dir, restart=True)
+        self.assertIn('Импортировано постов: 0', output)
+        self.assertEqual(Post.objects.count(), 2)
+        post = Post.objects.get(text='С картинкой')
+        self.assertEqual(post.comments.count(), 1)
+        self.assertEqual(self.stored_images(), files)
+
+    def test_rows_without_date_are_not_imported_twice(self):
+        self.write_source([
+            {'author': self.author.username, 'text': f'Без даты {number}'}
+            for number in range(3)
+        ])
+        self.run_import()
+        output = self.run_import(restart=True)
+        self.assertIn('Импортировано постов: 0', output)
+        self.assertEqual(Post.objects.count(), 3)
+
+    def test_failed_chunk_leaves_no_images(self):
+        self.write_source([
+            {'author': self.author.username, 'text': 'Пост',
+             'image': 'small.gif'},
+        ])
+        files = self.stored_images()
+        with mock.patch(
+            'posts.counters.reconcile_users', side_effect=RuntimeError
+        ):
+            with self.assertRaises(RuntimeError):
+                self.run_import(images_dir=self.images_dir)
+        self.assertFalse(Post.objects.exists())
+        self.assertEqual(self.stored_images(), files)
+
+    def test_resume_rebuilds_timelines_of_earlier_chunks(self):
+        # Первая пачка вставлена прошлым запуском, ленты ещё не собраны.
+        Post.objects.bulk_create([
+            Post(author=self.author, text='Пост 0', pub_date=PUB_DATE)
+        ])
+        self.write_source([
+            {'pub_date': PUB_DATE.isoformat(), 'author': self.author.username,
+             'text': 'Пост 0'},
+            {'author': 'Newcomer', 'text': 'Пост 1'},
+        ])
+        with open(self.state_file, 'w') as state:
+            json.dump({'done': 1, 'authors': [self.author.pk]}, state)
+        self.run_import(create_missing=True)
+        self.assertEqual(
+            list(FeedEntry.objects.filter(user=self.reader)
+                 .values_list('post__text', flat=True)),
+            ['Пост 0'],
+        )
@@ -0,0 +1,82 @@
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import timeline
+from posts.models import Comment, Follow, Group, Post, User
+from .utils import QueryBudgetMixin
+
+DATASET_SIZES = (10, 1_000, 100_000)
+PAGE_SIZES = (5, 10)
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Reader')
+        cls.authors = [
+            User.objects.create_user(username=f'Writer{i}')
+            for i in range(3)
+        ]
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        for author in cls.authors:
+            Follow.objects.create(user=cls.user, author=author)
+        cls.post = Post.objects.create(
+            author=cls.authors[0],
+            group=cls.group,
+            text='Пост с комментариями',
+        )
+        cls.urls = {
+            'index': reverse('posts:index'),
+            'group_list': reverse(
+                'posts:group_list', kwargs={'slug': cls.group.slug}
+            ),
+            'profile': reverse(
+                'posts:profile',
+                kwargs={'username': cls.authors[0].username}
+            ),
+            'follow_index': reverse('posts:follow_index'),
+            'post_detail': reverse(
+                'posts:post_detail', kwargs={'post_id': cls.post.pk}
+            ),
+        }
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def fill_to(self, size):
+        missing = size - Post.objects.count()
+        Post.objects.bulk_create(
+            (
+                Post(
+                    author=self.authors[i % len(self.authors)],
+                    group=self.group if i % 2 else None,
+                    text=f'Пост номер {i}',
+                )
+                for i in range(missing)
+            )
+        )
+        timeline.rebuild(self.user.pk)
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=author, text='Комментарий')
+            for author in self.authors
+        )
+
+    def test_query_count_does_not_grow(self):
+        counts = {name: [] for name in self.urls}
+        for size in DATASET_SIZES:
+            self.fill_to(size)
+            for page_size in PAGE_SIZES:
+                with override_settings(LIMIT_POSTS=page_size):
+                    for name, url in self.urls.items():
+                        counts[name].append(self.count_queries(
+                            self.authorized_client, url
+                        ))
+        for name, view_counts in counts.items():
+            with self.subTest(view=name):
+                self.assertQueryBudget(view_counts, budget=10)
@@ -0,0 +1,76 @@
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+from posts.urls import urlpatterns
+
+# Выпадающий список групп в форме поста читает таблицу целиком.
+ALLOWED_SCANS = ('SCAN posts_group', 'SCAN TABLE posts_group')
+
+
+class QueryPlanTests(TestCase):
+    """Каждый запрос страниц posts должен идти по индексу."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(username='Writer')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author,
+            group=cls.group,
+            text='Пост для проверки планов запросов',
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.user, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        cls.url_kwargs = {
+            'slug': cls.group.slug,
+            'username': cls.author.username,
+            'post_id': cls.post.pk,
+            'pk': cls.post.pk,
+        }
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def get_urls(self):
+        for pattern in urlpatterns:
+            kwargs = {
+                name: self.url_kwargs[name]
+                for name in pattern.pattern.converters
+            }
+            yield reverse(f'posts:{pattern.name}', kwargs=kwargs)
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def test_views_do_not_scan_or_sort(self):
+        for url in self.get_urls():
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    self.authorized_client.get(url)
+                for query in queries:
+                    sql = query['sql']
+                    if not sql.startswith('SELECT'):
+                        continue
+                    for detail in self.explain(sql):
+                        full_scan = (
+                            detail.startswith('SCAN')
+                            and 'USING' not in detail
+                            and 'CONSTANT ROW' not in detail
+                            and not detail.startswith(ALLOWED_SCANS)
+                        )
+                        self.assertFalse(full_scan, f'{detail}: {sql}')
+                        self.assertNotIn('TEMP B-TREE', detail, sql)
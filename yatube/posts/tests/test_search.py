@@ -0,0 +1,91 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import search
+from posts.models import Post, User
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Searcher')
+        cls.exact = Post.objects.create(
+            author=cls.user, text='Кофе, кофе и ещё раз кофе'
+        )
+        cls.other = Post.objects.create(
+            author=cls.user, text='Утренний кофе <b>на балконе</b>'
+        )
+        cls.unrelated = Post.objects.create(
+            author=cls.user, text='Про погоду и дождь'
+        )
+
+    def search(self, query, **params):
+        response = Client().get(
+            reverse('posts:search'), {'q': query, **params}
+        )
+        return response, list(response.context['page_obj'])
+
+    def test_results_are_ranked_and_highlighted(self):
+        response, posts = self.search('КОФЕ')
+        self.assertEqual(posts, [self.exact, self.other])
+        self.assertContains(response, '<mark>Кофе</mark>, <mark>кофе</mark>')
+        self.assertContains(response, '&lt;b&gt;на балконе&lt;/b&gt;')
+
+    def test_index_follows_post_changes(self):
+        post = Post.objects.get(pk=self.unrelated.pk)
+        post.text = 'Теперь про кофе'
+        post.save()
+        self.assertIn(self.unrelated, self.search('кофе')[1])
+        Post.objects.filter(pk=self.other.pk).update(text='Чай')
+        Post.objects.get(pk=self.exact.pk).delete()
+        self.assertEqual(self.search('кофе')[1], [self.unrelated])
+
+    def test_query_syntax_is_escaped(self):
+        for query in ('"кофе', 'кофе OR', 'NEAR(', '***'):
+            with self.subTest(query=query):
+                response = Client().get(reverse('posts:search'), {'q': query})
+                self.assertEqual(response.status_code, 200)
+
+    def test_search_is_paginated(self):
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Кофе номер {i}') for i in range(12)
+        )
+        _, first = self.search('кофе')
+        _, second = self.search('кофе', page=2)
+        self.assertEqual(len(first), 10)
+        self.assertEqual(len(second), 4)
+
+    def test_admin_search_uses_index(self):
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        client = Client()
+        client.force_login(admin)
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'кофе'}
+        )
+        self.assertEqual(
+            set(response.context['cl'].result_list), {self.exact, self.other}
+        )
+
+    def test_filter_posts_combines_with_other_filters(self):
+        queryset = search.filter_posts(
+            Post.objects.exclude(pk=self.exact.pk), search.build_query('кофе')
+        )
+        self.assertEqual(list(queryset), [self.other])
+        self.assertEqual(queryset.count(), 1)
+
+    def test_rebuild_command_restores_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {search.FTS_TABLE}({search.FTS_TABLE}) "
+                f"VALUES ('delete-all')"
+            )
+        self.assertEqual(self.search('кофе')[1], [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.search('кофе')[1], [self.exact, self.other])
@@ -0,0 +1,75 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import F
+from django.conf import settings
+from django.test import TestCase, override_settings
+
+from posts import counters
+from posts.models import Comment, FeedEntry, Follow, Group, Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class SeedTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def seed(self, seed=7):
+        call_command(
+            'seed_yatube', posts=300, users=30, groups=3, follows=4,
+            images=0.2, image_pool=2, seed=seed, batch_size=120,
+            stdout=StringIO(),
+        )
+        return [
+            list(Post.objects.order_by('pk').values_list(
+                'author__username', 'group__slug', 'text', 'pub_date',
+                'comments_count', 'image',
+            )),
+            list(Follow.objects.order_by('pk').values_list(
+                'user__username', 'author__username'
+            )),
+            list(Comment.objects.order_by('pk').values_list(
+                'author__username', 'text', 'created'
+            )),
+        ]
+
+    def clear(self):
+        User.objects.filter(username__startswith='seed').delete()
+        Group.objects.filter(slug__startswith='seed').delete()
+
+    def test_same_seed_gives_same_data(self):
+        first = self.seed()
+        self.clear()
+        self.assertEqual(self.seed(), first)
+        self.clear()
+        self.assertNotEqual(self.seed(seed=8), first)
+
+    def test_seeded_data_is_consistent(self):
+        self.seed()
+        self.assertEqual(Post.objects.count(), 300)
+        self.assertEqual(User.objects.count(), 30)
+        self.assertFalse(Follow.objects.filter(
+            user_id=F('author_id')
+        ).exists())
+        user_ids = list(User.objects.values_list('pk', flat=True))
+        post_ids = list(Post.objects.values_list('pk', flat=True))
+        self.assertEqual(counters.reconcile_users(user_ids), 0)
+        self.assertEqual(counters.reconcile_posts(post_ids), 0)
+        follow = Follow.objects.first()
+        self.assertEqual(
+            FeedEntry.objects.filter(
+                user=follow.user, author=follow.author
+            ).count(),
+            min(follow.author.posts.count(), 200),
+        )
+        # Пишут неравномерно: самый активный автор заметно впереди.
+        busiest = max(
+            user.stats.posts_count for user in User.objects.all()
+        )
+        self.assertGreater(busiest, 300 / 30 * 2)
@@ -0,0 +1,115 @@
+import multiprocessing
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import suggestions
+from posts.models import Follow, Suggestions, User
+
+# Читатель → авторы. Подписчики b у reader — c и e: за d два голоса,
+# за f один, а b уже в подписках.
+GRAPH = {
+    'reader': ['b'],
+    'c': ['b', 'd'],
+    'e': ['b', 'd', 'f'],
+    'f': ['c'],
+}
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=0)
+class SuggestionsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        names = set(GRAPH) | {a for authors in GRAPH.values() for a in authors}
+        cls.users = {
+            name: User.objects.create_user(username=name)
+            for name in sorted(names)
+        }
+        for name, authors in GRAPH.items():
+            for author in authors:
+                Follow.objects.create(
+                    user=cls.users[name], author=cls.users[author]
+                )
+        cls.reader = cls.users['reader']
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def pks(self, *names):
+        return [self.users[name].pk for name in names]
+
+    def test_graph_and_candidates(self):
+        graph = suggestions.FollowGraph.load()
+        node = graph.node(self.users['b'].pk)
+        self.assertEqual(
+            sorted(graph.ids[n] for n in graph.followers.neighbours(node)),
+            sorted(self.pks('reader', 'c', 'e')),
+        )
+        self.assertEqual(
+            graph.candidates(self.reader.pk, 10), self.pks('d', 'f')
+        )
+        self.assertEqual(graph.candidates(self.reader.pk, 1), self.pks('d'))
+        self.assertEqual(graph.candidates(10 ** 6, 10), [])
+
+    @skipUnless(
+        'fork' in multiprocessing.get_all_start_methods(), 'нужен fork'
+    )
+    def test_parallel_results_match(self):
+        graph = suggestions.FollowGraph.load()
+        user_ids = list(graph.ids)
+        sequential = dict(suggestions.compute(graph, user_ids))
+        parallel = dict(suggestions.compute(
+            graph, user_ids, processes=2, chunk_size=2
+        ))
+        self.assertEqual(parallel, sequential)
+
+    def test_pages_read_stored_suggestions(self):
+        call_command('suggest_authors', '--all', stdout=StringIO())
+        self.assertFalse(Suggestions.objects.filter(stale=True).exists())
+        with self.assertNumQueries(3):
+            suggested = suggestions.for_user(self.reader)
+        self.assertEqual([user.pk for user in suggested], self.pks('d', 'f'))
+        # Строка и подписки уже в кэше: остаётся выборка пользователей.
+        with self.assertNumQueries(1):
+            self.assertEqual(suggestions.for_user(self.reader), suggested)
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['suggested'], suggested)
+        response = self.client.get(reverse('posts:profile', args=['reader']))
+        self.assertContains(response, 'Кого почитать')
+        response = self.client.get(reverse('posts:profile', args=['c']))
+        self.assertEqual(response.context['suggested'], [])
+
+    def test_incremental_refresh(self):
+        suggestions.refresh(everyone=True)
+        self.client.get(reverse('posts:profile_follow', args=['d']))
+        # Новый автор пропадает из рекомендаций сразу, до пересчёта.
+        self.assertEqual(
+            [user.pk for user in suggestions.for_user(self.reader)],
+            self.pks('f'),
+        )
+        self.assertEqual(
+            list(Suggestions.objects.filter(stale=True)
+                 .values_list('user_id', flat=True)),
+            [self.reader.pk],
+        )
+        self.assertEqual(suggestions.refresh(), 1)
+        self.assertEqual(
+            Suggestions.objects.get(user=self.reader).author_ids,
+            self.pks('f'),
+        )
+        self.assertEqual(suggestions.refresh(), 0)
+
+    def test_refresh_replaces_cached_row(self):
+        self.assertEqual(suggestions.for_user(self.reader), [])
+        suggestions.refresh(everyone=True)
+        self.assertEqual(
+            [user.pk for user in suggestions.for_user(self.reader)],
+            self.pks('d', 'f'),
+        )
@@ -0,0 +1,132 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts import tasks, thumbnails
+from posts.models import IMAGE_PROCESSING, IMAGE_READY, Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x02\x00'
+            b'\x01\x00\x80\x00\x00\x00\x00\x00'
+            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+            b'\x0A\x00\x3B'
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                name='small.gif', content=small_gif, content_type='image/gif'
+            ),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_generate_creates_every_geometry(self):
+        self.assertEqual(
+            set(thumbnails.generate(self.post.image)),
+            set(thumbnails.POST_THUMBNAILS),
+        )
+        self.assertEqual(thumbnails.generate(''), {})
+
+    def test_image_is_processed_in_background(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        response = Client().get(url)
+        self.assertContains(response, 'Картинка обрабатывается')
+        call_command('run_workers', once=True, stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.image_state, IMAGE_READY)
+        self.assertEqual(
+            thumbnails.decode(self.post.thumbnails),
+            thumbnails.generate(self.post.image),
+        )
+        response = Client().get(url)
+        self.assertContains(response, '<img class="card-img my-2"')
+
+    def test_warm_command_is_resumable(self):
+        state_file = os.path.join(TEMP_MEDIA_ROOT, 'state')
+        with open(state_file, 'w') as state:
+            state.write(str(self.post.pk))
+        out = StringIO()
+        call_command(
+            'warm_thumbnails', processes=1, state_file=state_file, stdout=out
+        )
+        self.assertIn('Готово: 0', out.getvalue())
+        self.assertFalse(os.path.exists(state_file))
+        call_command(
+            'warm_thumbnails', processes=1, state_file=state_file, stdout=out
+        )
+        self.assertIn('Готово: 1', out.getvalue())
+        self.post.refresh_from_db()
+        self.assertIn('card', thumbnails.decode(self.post.thumbnails))
+
+    @override_settings(POST_IMAGE_MAX_SIZE=(100, 100))
+    def test_large_image_is_downscaled(self):
+        content = BytesIO()
+        Image.new('RGB', (300, 30)).save(content, format='PNG')
+        post = Post.objects.create(
+            author=self.user,
+            text='Большая картинка',
+            image=SimpleUploadedFile(
+                name='large.png',
+                content=content.getvalue(),
+                content_type='image/png',
+            ),
+        )
+        original = post.image.name
+        call_command('run_workers', once=True, stdout=StringIO())
+        post.refresh_from_db()
+        self.assertNotEqual(post.image.name, original)
+        self.assertFalse(post.image.storage.exists(original))
+        with post.image.open('rb'):
+            self.assertEqual(Image.open(post.image).size, (100, 10))
+
+    @override_settings(POST_IMAGE_MAX_SIZE=(100, 100))
+    def test_newer_upload_is_not_overwritten(self):
+        content = BytesIO()
+        Image.new('RGB', (300, 30)).save(content, format='PNG')
+        post = Post.objects.create(
+            author=self.user,
+            text='Картинку заменили во время обработки',
+            image=SimpleUploadedFile(
+                name='first.png', content=content.getvalue(),
+                content_type='image/png',
+            ),
+        )
+        generate = thumbnails.generate
+        results = []
+
+        def replace_upload(image):
+            results.append(image.name)
+            Post.objects.filter(pk=post.pk).update(image='posts/second.png')
+            return generate(image)
+
+        with mock.patch.object(thumbnails, 'generate', replace_upload):
+            tasks.process_image(post.pk)
+        post.refresh_from_db()
+        self.assertEqual(post.image.name, 'posts/second.png')
+        self.assertEqual(post.image_state, IMAGE_PROCESSING)
+        self.assertEqual(post.thumbnails, '')
+        self.assertFalse(post.image.storage.exists(results[0]))
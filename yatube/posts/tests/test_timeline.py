@@ -0,0 +1,57 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import FeedEntry, Follow, Post, User
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(username='Writer')
+        cls.old_post = Post.objects.create(
+            author=cls.author, text='Пост до подписки'
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def get_feed(self):
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_follow_backfills_and_unfollow_removes(self):
+        self.authorized_client.get(
+            reverse('posts:profile_follow', args=[self.author.username])
+        )
+        self.assertEqual(self.get_feed(), [self.old_post])
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', args=[self.author.username])
+        )
+        self.assertEqual(self.get_feed(), [])
+        self.assertFalse(FeedEntry.objects.filter(user=self.user).exists())
+
+    def test_new_post_is_fanned_out(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        new_post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertEqual(self.get_feed(), [new_post, self.old_post])
+
+    def test_rebuild_command_repairs_feed(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        Post.objects.bulk_create([
+            Post(author=self.author, text='Пост без раздачи')
+        ])
+        own_post = Post.objects.create(author=self.user, text='Свой пост')
+        FeedEntry.objects.create(
+            user=self.user,
+            post=own_post,
+            author=self.user,
+            pub_date=own_post.pub_date,
+        )
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(self.get_feed(), list(self.author.posts.all()))
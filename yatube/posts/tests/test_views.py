@@ -8,11 +8,12 @@ from django.conf import settings
 from django.core.cache import cache
 
 from posts.models import Post, Group, User, Follow
+from posts.paginator import CursorPaginator
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
-@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, PAGE_CACHE_TIMEOUT=0)
 class PostsTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -146,6 +147,94 @@ class PostsTests(TestCase):
                     ).exists()
                 )
 
+    def test_cursor_pages_are_stable(self):
+        for url in self.url_names:
+            with self.subTest(url=url):
+                first_page = self.client.get(url).context['page_obj']
+                self.assertTrue(first_page.has_next())
+                self.assertFalse(first_page.has_previous())
+                second_page = self.client.get(
+                    url, {'after': first_page.next_cursor}
+                ).context['page_obj']
+                self.assertEqual(len(second_page), 3)
+                self.assertFalse(second_page.has_next())
+                self.assertTrue(second_page.has_previous())
+                self.assertEqual(
+                    set(first_page) & set(second_page), set()
+                )
+                back_page = self.client.get(
+                    url, {'before': second_page.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual(list(back_page), list(first_page))
+
+    def test_cursor_page_skips_count_query(self):
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        with self.assertNumQueries(1):
+            page_obj = paginator.get_page('2')
+        self.assertEqual(len(page_obj), 3)
+        self.assertFalse(page_obj.has_next())
+
+    def test_paginator_window_and_last_page(self):
+        paginator = CursorPaginator(Post.objects.all(), 1, count=13)
+        page_obj = paginator.get_page('7')
+        self.assertEqual(
+            page_obj.page_window, [1, '…', 5, 6, 7, 8, 9, '…', 13]
+        )
+        paginator = CursorPaginator(Post.objects.all(), 5, count=13)
+        with self.assertNumQueries(1):
+            last_page = paginator.get_page('last')
+        self.assertEqual(last_page.number, 3)
+        self.assertEqual(list(last_page), list(Post.objects.all()[10:]))
+        self.assertFalse(last_page.has_next())
+
+    def test_window_links_start_from_cursors(self):
+        paginator = CursorPaginator(Post.objects.all(), 1, count=13)
+        page_obj = paginator.get_page('7')
+        links = dict(
+            (number, query) for number, query in page_obj.window_links
+            if number != paginator.ELLIPSIS
+        )
+        self.assertEqual(links[1], 'page=1')
+        self.assertEqual(links[13], 'page=last')
+        self.assertIsNone(links[7])
+        self.assertIn(f'after={page_obj.next_cursor}', links[9])
+        self.assertIn('skip=1', links[9])
+        self.assertIn(f'before={page_obj.previous_cursor}', links[5])
+        posts = list(Post.objects.all())
+        for number in (5, 9):
+            with self.subTest(number=number), self.settings(LIMIT_POSTS=1):
+                response = self.client.get(
+                    reverse('posts:index') + '?' + links[number]
+                )
+                self.assertEqual(
+                    list(response.context['page_obj']),
+                    posts[number - 1:number],
+                )
+
+    def test_deep_offsets_are_bounded(self):
+        paginator = CursorPaginator(Post.objects.all(), 1, count=13)
+        self.assertEqual(paginator.get_page('12').number, 10)
+        page_obj = paginator.get_page('2', after=paginator.get_page(
+            '1'
+        ).next_cursor, skip='100')
+        self.assertEqual(
+            list(page_obj), list(Post.objects.all()[5:6])
+        )
+
+    def test_estimated_last_page_is_full(self):
+        paginator = CursorPaginator(
+            Post.objects.all(), 5, count=14, estimated=True
+        )
+        last_page = paginator.get_page('last')
+        self.assertEqual(last_page.number, 3)
+        self.assertEqual(list(last_page), list(Post.objects.all()[8:]))
+
+    def test_paginator_corrects_stale_count(self):
+        paginator = CursorPaginator(Post.objects.all(), 10, count=0)
+        page_obj = paginator.get_page('2')
+        self.assertEqual(page_obj.end_index(), 13)
+        self.assertEqual(page_obj.page_window, [1, 2])
+
     def test_cash_function(self):
         new_post = Post.objects.create(
             author=self.user,
@@ -153,12 +242,68 @@ class PostsTests(TestCase):
             text='Проверка кэша тестовая запись',
         )
         start_content = get_index_content(self)
-        new_post.delete()
-        content_after_del_post = get_index_content(self)
-        self.assertEqual(start_content, content_after_del_post)
+        Post.objects.filter(pk=new_post.pk).update(text='Без сигналов')
+        content_after_silent_edit = get_index_content(self)
+        self.assertEqual(start_content, content_after_silent_edit)
         cache.clear()
         content_after_clear_cash = get_index_content(self)
-        self.assertNotEqual(content_after_del_post, content_after_clear_cash)
+        self.assertNotEqual(
+            content_after_silent_edit, content_after_clear_cash
+        )
+
+    def test_cache_is_invalidated_by_post_changes(self):
+        new_post = Post.objects.create(
+            author=self.user,
+            group=self.group,
+            text='Проверка кэша тестовая запись',
+        )
+        for url in self.url_names:
+            with self.subTest(url=url):
+                self.assertContains(
+                    self.authorized_client.get(url), new_post.text
+                )
+        new_post.delete()
+        for url in self.url_names:
+            with self.subTest(url=url):
+                self.assertNotContains(
+                    self.authorized_client.get(url), new_post.text
+                )
+
+    def test_cache_is_invalidated_by_group_rename(self):
+        urls = [reverse('posts:index'), self.url_names[2]]
+        for url in urls:
+            self.authorized_client.get(url)
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'renamed_slug'
+        group.save()
+        new_link = reverse('posts:group_list', args=['renamed_slug'])
+        old_link = reverse('posts:group_list', args=[self.group.slug])
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertContains(response, new_link)
+                self.assertNotContains(response, old_link)
+
+    def test_cache_is_invalidated_by_author_rename(self):
+        for url in self.url_names:
+            self.authorized_client.get(url)
+        author = User.objects.get(pk=self.user.pk)
+        author.first_name, author.last_name = 'Новое', 'Имя'
+        author.save()
+        for url in self.url_names:
+            with self.subTest(url=url):
+                self.assertContains(
+                    self.authorized_client.get(url), 'Новое Имя'
+                )
+
+    def test_cache_depends_on_page(self):
+        for url in self.url_names:
+            with self.subTest(url=url):
+                first_page = self.authorized_client.get(url).content
+                second_page = self.authorized_client.get(
+                    url, {'page': 2}
+                ).content
+                self.assertNotEqual(first_page, second_page)
 
     def test_follow_mechanics(self):
         follow_count = Follow.objects.count()
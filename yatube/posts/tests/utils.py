@@ -0,0 +1,22 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """Проверка, что число запросов страницы не зависит от объёма данных."""
+
+    def count_queries(self, client, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            client.get(url)
+        return len(queries)
+
+    def assertQueryBudget(self, counts, budget=None):
+        """counts — число запросов одной страницы при разных замерах."""
+        self.assertEqual(
+            len(set(counts)), 1,
+            f'Число запросов растёт вместе с данными: {counts}'
+        )
+        if budget is not None:
+            self.assertLessEqual(counts[0], budget)
@@ -0,0 +1,80 @@
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from sorl.thumbnail import default, get_thumbnail
+
+from core import queue
+
+logger = logging.getLogger(__name__)
+
+QUEUED_KEY = 'thumbnails_queued:{}'
+
+# Единственное место, где описаны миниатюры постов: по нему рисуют
+# шаблоны (posts/includes/post_image.html) и прогревается кэш.
+POST_THUMBNAILS = {
+    'card': {
+        'geometry': '960x339',
+        'options': {'crop': 'center', 'upscale': True},
+    },
+}
+
+
+def generate(image):
+    """Создаёт все миниатюры картинки, ошибки только логируются.
+
+    Возвращает {миниатюра: имя файла} для созданных миниатюр.
+    """
+    if not image:
+        return {}
+    created = {}
+    for name, spec in POST_THUMBNAILS.items():
+        try:
+            thumbnail = get_thumbnail(
+                image, spec['geometry'], **spec['options']
+            )
+        except Exception:
+            logger.exception('Не удалось создать миниатюру %s для %s',
+                             name, image)
+        else:
+            created[name] = thumbnail.name
+    return created
+
+
+def encode(names):
+    """Значение поля Post.thumbnails для результата generate()."""
+    return json.dumps(names, sort_keys=True) if names else ''
+
+
+def decode(value):
+    return json.loads(value) if value else {}
+
+
+def request_processing(post_id):
+    """Ставит обработку картинки поста в очередь не чаще раза в
+    TASKS_VISIBILITY_TIMEOUT: за это время задачу успеют выполнить."""
+    key = QUEUED_KEY.format(post_id)
+    if cache.add(key, True, settings.TASKS_VISIBILITY_TIMEOUT):
+        queue.enqueue('posts.process_image', post_id=post_id)
+
+
+def thumbnail_urls(images, spec='card'):
+    """{имя картинки: адрес миниатюры} по тройкам (id поста, картинка,
+    thumbnails).
+
+    Имена, записанные фоновой обработкой, превращаются в адреса без
+    обращения к хранилищу ключей sorl. Картинки, которые не
+    обрабатывались (посты из seed_posts и import_posts), получают None,
+    как ещё не готовые, а их обработка ставится в очередь: миниатюры
+    не создаются по одной прямо в запросе.
+    """
+    urls = {}
+    for post_id, image, recorded in images:
+        name = decode(recorded).get(spec)
+        if name:
+            urls[image] = default.storage.url(name)
+        else:
+            urls[image] = None
+            request_processing(post_id)
+    return urls
@@ -0,0 +1,83 @@
+from django.conf import settings
+from django.db import transaction
+
+from .models import FeedEntry, Follow, Post
+
+
+def chunked(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def fan_out(post):
+    """Раздаёт новый пост в ленты всех подписчиков автора пачками."""
+    follower_ids = list(
+        Follow.objects.filter(author_id=post.author_id)
+        .values_list('user_id', flat=True)
+    )
+    with transaction.atomic():
+        for batch in chunked(follower_ids, settings.TIMELINE_BATCH_SIZE):
+            FeedEntry.objects.bulk_create(
+                [
+                    FeedEntry(
+                        user_id=user_id,
+                        post_id=post.pk,
+                        author_id=post.author_id,
+                        pub_date=post.pub_date,
+                    )
+                    for user_id in batch
+                ],
+                ignore_conflicts=True,
+            )
+
+
+def recent_posts(author_id):
+    """(id, pub_date) последних постов автора, попадающих в ленту."""
+    return (
+        Post.objects.filter(author_id=author_id)
+        .order_by('-pub_date', '-id')
+        .values_list('id', 'pub_date')[:settings.TIMELINE_BACKFILL]
+    )
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту читателя последние посты нового автора."""
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for post_id, pub_date in recent_posts(author_id)
+        ],
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def remove(user_id, author_id):
+    """Убирает посты автора из ленты читателя после отписки."""
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def rebuild(user_id, clear=False):
+    """Сверяет ленту читателя с его подписками.
+
+    Лишние записи (от авторов, на которых читатель больше не подписан)
+    удаляются, недостающие — добавляются. С clear=True лента
+    собирается заново.
+    """
+    author_ids = list(
+        Follow.objects.filter(user_id=user_id)
+        .values_list('author_id', flat=True)
+    )
+    with transaction.atomic():
+        entries = FeedEntry.objects.filter(user_id=user_id)
+        if not clear:
+            entries = entries.exclude(author_id__in=author_ids)
+        removed, _ = entries.delete()
+        for author_id in author_ids:
+            backfill(user_id, author_id)
+    return removed
@@ -9,6 +9,10 @@ urlpatterns = [
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
     path('profile/<str:username>/', views.profile, name='profile'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path(
+        'posts/<int:post_id>/comments/', views.comments, name='comments'
+    ),
+    path('search/', views.search, name='search'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:pk>/edit/', views.post_edit, name='post_edit'),
     path(
@@ -25,4 +29,10 @@ urlpatterns = [
         views.profile_unfollow,
         name='profile_unfollow'
     ),
+    path('api/posts/', views.api_index, name='api_index'),
+    path('api/group/<slug:slug>/', views.api_group_posts, name='api_group'),
+    path(
+        'api/profile/<str:username>/', views.api_profile, name='api_profile'
+    ),
+    path('api/follow/', views.api_follow_index, name='api_follow'),
 ]
@@ -1,79 +1,176 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.core.paginator import Paginator
 from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
 from django.conf import settings
+from django.http import Http404, JsonResponse
+from django.urls import reverse
 
-from .models import Post, Group, User, Follow
+from core import page_cache
+from core.replicas import pin_to_primary, read_from_replica
+from core.sqlite import save_with_retries, write_transaction
+from .models import Comment, Post, Group, User, Follow
 from .forms import PostForm, CommentForm
+from . import api, feed_cache, follows, suggestions
+from .conditional import (
+    conditional_page, group_state, post_state, profile_state,
+)
+from .counters import get_stats
+from .paginator import TimelinePaginator, get_comments_page, get_page_obj
+from .search import SearchResults
 
 
+@read_from_replica
 def index(request):
     template = 'posts/index.html'
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, settings.LIMIT_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    post_list = Post.objects.select_related('author', 'group')
+    count, estimated = feed_cache.get_index_count(post_list)
+    page_obj = get_page_obj(
+        request, post_list, count=count, estimated=estimated
+    )
     context = {
         'page_obj': page_obj,
+        'feed_version': feed_cache.get_version('index'),
     }
-    return render(request, template, context)
+    return page_cache.tag(render(request, template, context), 'index')
 
 
+@read_from_replica
+@conditional_page(group_state)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
     template = 'posts/group_list.html'
-    posts = group.posts.all()
-    paginator = Paginator(posts, settings.LIMIT_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = group.posts.select_related('author')
+    page_obj = get_page_obj(
+        request, posts,
+        count=feed_cache.get_count(f'group:{group.pk}', posts),
+    )
     context = {
         'group': group,
         'posts': posts,
         'page_obj': page_obj,
+        'feed_version': feed_cache.get_version(f'group:{group.pk}'),
     }
-    return render(request, template, context)
+    return page_cache.tag(
+        render(request, template, context), f'group:{group.pk}'
+    )
 
 
+@read_from_replica
+@conditional_page(profile_state)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    stats = get_stats(author)
     template = 'posts/profile.html'
-    post_list = Post.objects.filter(author__username=username)
-    paginator = Paginator(post_list, settings.LIMIT_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    following = Follow.objects.filter(
-        author=author, user__username=request.user
-    ).exists()
+    post_list = author.posts.select_related('group')
+    page_obj = get_page_obj(request, post_list, count=stats.posts_count)
+    following = follows.is_following(request.user, author.pk)
     context = {
         'author': author,
         'page_obj': page_obj,
         'author_name': username,
-        'count_user_post': post_list.count(),
+        'count_user_post': stats.posts_count,
+        'stats': stats,
         'following': following,
+        'suggested': (
+            suggestions.for_user(request.user)
+            if author == request.user else []
+        ),
+        'feed_version': feed_cache.get_version(f'author:{author.pk}'),
         'user': request.user,
     }
-    return render(request, template, context)
+    return page_cache.tag(
+        render(request, template, context), f'author:{author.pk}'
+    )
 
 
+@read_from_replica
+@conditional_page(post_state)
 def post_detail(request, post_id):
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=post_id
+    )
     group = post.group
     author = post.author
     form = CommentForm()
-    comments = post.comments.all()
+    comments, next_cursor = get_comments_page(post.comments.all())
     context = {
         'post': post,
         'group': group,
         'author': author,
         'form': form,
-        'count_user_post': Post.objects.filter(author_id=post.author).count(),
+        'count_user_post': get_stats(author).posts_count,
         'comments': comments,
+        'comments_next': comments_url(post.pk, next_cursor),
+    }
+    response = page_cache.tag(
+        render(request, template, context),
+        f'post:{post.pk}', f'author:{author.pk}',
+    )
+    if group is not None:
+        page_cache.tag(response, f'group:{group.pk}')
+    return response
+
+
+def comments_url(post_id, cursor, fmt=None):
+    if cursor is None:
+        return None
+    url = reverse('posts:comments', kwargs={'post_id': post_id})
+    return f'{url}?after={cursor}' + (f'&format={fmt}' if fmt else '')
+
+
+@read_from_replica
+def comments(request, post_id):
+    """Следующая пачка комментариев: HTML-фрагмент или JSON.
+
+    Формат выбирается параметром ?format=json, а не заголовком Accept:
+    кэш страниц различает ответы только по адресу.
+    """
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    comment_list, next_cursor = get_comments_page(
+        Comment.objects.filter(post_id=post_id), request.GET.get('after')
+    )
+    if request.GET.get('format') == 'json':
+        response = JsonResponse({
+            'results': [
+                {
+                    'id': comment.pk,
+                    'author': comment.author.username,
+                    'text': comment.text,
+                    'created': comment.created,
+                }
+                for comment in comment_list
+            ],
+            'next': comments_url(post_id, next_cursor, 'json'),
+        }, json_dumps_params={'ensure_ascii': False})
+    else:
+        response = render(request, 'posts/includes/comment_list.html', {
+            'comments': comment_list,
+            'comments_next': comments_url(post_id, next_cursor),
+        })
+    return page_cache.tag(response, f'post:{post_id}')
+
+
+@read_from_replica
+def search(request):
+    template = 'posts/search.html'
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        paginator = Paginator(SearchResults(query), settings.LIMIT_POSTS)
+        page_obj = paginator.get_page(request.GET.get('page'))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
     }
     return render(request, template, context)
 
 
 @login_required
+@pin_to_primary
 def post_create(request):
     template = 'posts/create_post.html'
     form = PostForm(
@@ -82,8 +179,9 @@ def post_create(request):
     )
     is_edit = False
     if form.is_valid():
-        form.instance.author = request.user
-        form.save()
+        post = form.save(commit=False)
+        post.author = request.user
+        save_with_retries(post)
         return redirect('posts:profile', username=request.user.username)
     context = {
         'form': form,
@@ -93,6 +191,7 @@ def post_create(request):
 
 
 @login_required
+@pin_to_primary
 def post_edit(request, pk):
     post = get_object_or_404(Post, pk=pk)
     if post.author == request.user:
@@ -103,7 +202,7 @@ def post_edit(request, pk):
             files=request.FILES or None,
         )
         if form.is_valid():
-            form.save()
+            save_with_retries(form.save(commit=False))
             return redirect('posts:post_detail', pk)
         context = {
             'form': form,
@@ -115,6 +214,7 @@ def post_edit(request, pk):
 
 
 @login_required
+@pin_to_primary
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
@@ -122,33 +222,72 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        save_with_retries(comment)
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
+@read_from_replica
 def follow_index(request):
     template = 'posts/follow.html'
-    post_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(post_list, settings.LIMIT_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    feed = request.user.feed.select_related('post__author', 'post__group')
+    page_obj = get_page_obj(request, feed, TimelinePaginator)
     context = {
         'page_obj': page_obj,
+        'suggested': suggestions.for_user(request.user),
     }
     return render(request, template, context)
 
 
 @login_required
+@pin_to_primary
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
-    if author != request.user:
-        Follow.objects.get_or_create(user=request.user, author=author)
+    following = Follow.objects.filter(user=request.user, author=author)
+    # Повторный клик не берёт блокировку записи; гонку между проверкой
+    # и записью разрешает INSERT ... ON CONFLICT DO NOTHING.
+    if author != request.user and not following.exists():
+        write_transaction(follows.follow)(request.user.pk, author.pk)
     return redirect('posts:profile', username=username)
 
 
 @login_required
+@pin_to_primary
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    Follow.objects.filter(user=request.user, author=author).delete()
+    following = Follow.objects.filter(user=request.user, author=author)
+    if following.exists():
+        write_transaction(following.delete)()
     return redirect('posts:profile', username=username)
+
+
+@read_from_replica
+def api_index(request):
+    return page_cache.tag(
+        api.feed_response(request, Post.objects.all()), 'index'
+    )
+
+
+@read_from_replica
+def api_group_posts(request, slug):
+    group = get_object_or_404(Group.objects.only('pk'), slug=slug)
+    return page_cache.tag(
+        api.feed_response(request, Post.objects.filter(group=group)),
+        f'group:{group.pk}',
+    )
+
+
+@read_from_replica
+def api_profile(request, username):
+    author = get_object_or_404(User.objects.only('pk'), username=username)
+    return page_cache.tag(
+        api.feed_response(request, Post.objects.filter(author=author)),
+        f'author:{author.pk}',
+    )
+
+
+@read_from_replica
+def api_follow_index(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Нужно войти.'}, status=401)
+    return api.feed_response(request, request.user.feed.all(), api.TIMELINE)
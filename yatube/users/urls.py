@@ -1,11 +1,13 @@
 from django.contrib.auth.views import LogoutView, LoginView, PasswordResetView
 from django.urls import path
+
+from core.replicas import pin_to_primary
 from . import views
 
 app_name = 'users'
 
 urlpatterns = [
-    path('signup/', views.SignUp.as_view(), name='signup'),
+    path('signup/', pin_to_primary(views.SignUp.as_view()), name='signup'),
     path(
         'logout/',
         LogoutView.as_view(template_name='users/logged_out.html'),
@@ -13,7 +15,7 @@ urlpatterns = [
     ),
     path(
         'login/',
-        LoginView.as_view(template_name='users/login.html'),
+        pin_to_primary(LoginView.as_view(template_name='users/login.html')),
         name='login'
     ),
     path(
@@ -10,7 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
+import atexit
 import os
+import shutil
+import sys
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -49,22 +53,37 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.AnonymousPageCacheMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
 
+# manage.py test и pytest: тестовый прогон выключает DEBUG уже после
+# импорта настроек.
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+
+# Без DEBUG разобранные шаблоны хранятся в памяти процесса (cached
+# loader), а wsgi.py компилирует их все при старте воркера. С DEBUG
+# шаблоны перечитываются, чтобы правки были видны сразу. Тесты идут
+# без DEBUG и с тем же загрузчиком, что и боевые воркеры.
+TEMPLATE_CACHE = not DEBUG or TESTING
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -72,7 +91,12 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'core.context_processors.cache.fragment_timeout',
             ],
+            'loaders': (
+                [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)]
+                if TEMPLATE_CACHE else TEMPLATE_LOADERS
+            ),
         },
     },
 ]
@@ -86,8 +110,38 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+    },
+    # Реплика только для чтения. Локально это копия основной базы,
+    # которую обновляет manage.py sync_replicas --interval 5. В тестах
+    # она смотрит в тестовую базу default.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db_replica.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+# Алиасы баз, с которых читают вьюхи posts (пусто — всё из default),
+# и сколько секунд после записи пользователь читает из default.
+DATABASE_REPLICAS = []
+REPLICA_STICKY_SECONDS = 10
+# Сколько секунд живут в кэше страницы, фрагменты и выборки, прочитанные
+# с реплики: она может отставать, а ключи уже несут новую версию.
+REPLICA_CACHE_TIMEOUT = 5
+# PRAGMA для каждого нового соединения с SQLite (core.sqlite.configure).
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    # Отрицательное значение — размер в КБ, а не в страницах.
+    'cache_size': -64 * 1024,
+    'busy_timeout': 5000,
 }
+# Повторы транзакций записи, которые не дождались блокировки базы:
+# число повторов и пределы паузы между ними в секундах.
+SQLITE_WRITE_RETRIES = 5
+SQLITE_RETRY_DELAY = 0.05
+SQLITE_RETRY_MAX_DELAY = 1.0
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -130,6 +184,46 @@ STATICFILES_DIRS = [
 ]
 
 LIMIT_POSTS = 10
+# Комментариев на странице поста и в каждой догружаемой пачке.
+LIMIT_COMMENTS = 20
+# Лента подписок: сколько последних постов автора попадает в ленту
+# при подписке и каким размером пачки посты раздаются подписчикам.
+TIMELINE_BACKFILL = 200
+TIMELINE_BATCH_SIZE = 500
+
+# Число страниц в навигации: счётчик ленты кэшируется до смены её версии,
+# а у таблиц больше FEED_COUNT_EXACT_LIMIT строк берётся оценка по max(id).
+FEED_COUNT_TIMEOUT = 60 * 60
+FEED_COUNT_EXACT_LIMIT = 1_000_000
+# Сколько секунд хранится в кэше множество подписок пользователя.
+FOLLOWING_TIMEOUT = 60 * 60
+# Рекомендации авторов (manage.py suggest_authors): сколько кандидатов
+# хранится и показывается читателю и сколько подписчиков одного автора
+# учитывается при расчёте. Строка читателя кэшируется на
+# SUGGESTIONS_TIMEOUT секунд или до следующего пересчёта.
+SUGGESTIONS_STORED = 20
+SUGGESTIONS_SHOWN = 5
+SUGGESTIONS_FOLLOWERS_LIMIT = 1000
+SUGGESTIONS_TIMEOUT = 60 * 60
+
+# Очередь фоновых задач (core.queue): сколько задача может выполняться,
+# прежде чем её заберёт другой обработчик, число попыток и базовая
+# задержка между ними (удваивается с каждой попыткой), в секундах.
+TASKS_VISIBILITY_TIMEOUT = 5 * 60
+TASKS_MAX_ATTEMPTS = 5
+TASKS_RETRY_DELAY = 30
+
+# Картинки постов больше этого размера уменьшаются при обработке.
+POST_IMAGE_MAX_SIZE = (1920, 1920)
+# Кэш целых страниц для гостей, секунд; 0 — отключить.
+PAGE_CACHE_TIMEOUT = 600
+# Срок {% cache %} для лент в шаблонах, секунд.
+FRAGMENT_CACHE_TIMEOUT = 600
+# Заголовок Server-Timing и журнал запросов дольше SERVER_TIMING_SLOW_MS
+# (логгер core.timing). Выключено — middleware не участвует в запросах.
+SERVER_TIMING = False
+SERVER_TIMING_SLOW_MS = 500
+
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts:index'
@@ -143,8 +237,20 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Кэш общий для всех воркеров на машине: файл SQLite в режиме WAL
+# (core.cache). Чистка оставляет MAX_ENTRIES недавно читавшихся записей.
+CACHE_DIR = BASE_DIR
+# Тесты чистят кэш, поэтому каждый прогон получает свой временный файл,
+# а не делит его с dev-сервером и соседними прогонами.
+if TESTING:
+    CACHE_DIR = tempfile.mkdtemp(prefix='yatube-cache-')
+    atexit.register(shutil.rmtree, CACHE_DIR, True)
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.path.join(CACHE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100_000,
+        },
     }
 }